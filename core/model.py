@@ -90,18 +90,28 @@ class ModelBase(object):
 
         dataset_class = envs.get_global_env(name + "type")
         if dataset_class == "DataLoader":
-            self._init_dataloader()
+            self._init_dataloader(dataset_name=dataset["name"])
 
-    def _init_dataloader(self, is_infer=False):
+    def _init_dataloader(self, is_infer=False, dataset_name=None):
         if is_infer:
             data = self._infer_data_var
         else:
             data = self._data_var
+        capacity = 64
+        use_double_buffer = False
+        iterable = False
+        if dataset_name is not None:
+            name = "dataset." + dataset_name + "."
+            capacity = int(
+                envs.get_global_env(name + "prefetch_capacity", capacity))
+            use_double_buffer = envs.get_global_env(name + "double_buffer",
+                                                    use_double_buffer)
+            iterable = envs.get_global_env(name + "iterable", iterable)
         self._data_loader = fluid.io.DataLoader.from_generator(
             feed_list=data,
-            capacity=64,
-            use_double_buffer=False,
-            iterable=False)
+            capacity=capacity,
+            use_double_buffer=use_double_buffer,
+            iterable=iterable)
 
     def get_inputs(self):
         return self._data_var
@@ -18,6 +18,7 @@ import os
 from functools import reduce
 import paddle.fluid.incubate.data_generator as dg
 from paddlerec.core.utils import envs
+from paddlerec.core.utils.feature_hash import FeatureHasher
 
 
 class ReaderBase(dg.MultiSlotDataGenerator):
@@ -46,7 +47,13 @@ class SlotReader(dg.MultiSlotDataGenerator):
         _config = envs.load_yaml(config)
         envs.set_global_envs(_config)
 
-    def init(self, sparse_slots, dense_slots, padding=0):
+    def init(self, sparse_slots, dense_slots, padding=0, hash_slots=None):
+        """
+        Args:
+            hash_slots(string): sparse slots with raw categorical values,
+                "slot[:bucket[:salt]]" separated by spaces, hashed to ids
+                by paddlerec.core.utils.feature_hash
+        """
         from operator import mul
         self.sparse_slots = []
         if sparse_slots.strip() != "#" and sparse_slots.strip(
@@ -69,17 +76,37 @@ class SlotReader(dg.MultiSlotDataGenerator):
             self.slot2index[self.slots[i]] = i
             self.visit[self.slots[i]] = False
         self.padding = padding
+        self.hasher = None
+        if hash_slots:
+            self.hasher = FeatureHasher(hash_slots)
+            self.hash_sparse = set(self.sparse_slots) & set(self.hasher.slots)
+
+    def _hash_line(self, line):
+        """
+        ids of all hashed feasigns of a line, computed in one call
+        """
+        slots = []
+        values = []
+        for i in line:
+            slot, _, value = i.partition(":")
+            if slot in self.hash_sparse:
+                slots.append(slot)
+                values.append(value)
+        return iter(self.hasher.hash_mixed(slots, values).tolist())
 
     def generate_sample(self, l):
         def reader():
             line = l.strip().split(" ")
             output = [(i, []) for i in self.slots]
+            hashed = self._hash_line(line) if self.hasher else None
             for i in line:
                 slot_feasign = i.split(":")
                 slot = slot_feasign[0]
                 if slot not in self.slots:
                     continue
-                if slot in self.sparse_slots:
+                if hashed is not None and slot in self.hash_sparse:
+                    feasign = next(hashed)
+                elif slot in self.sparse_slots:
                     feasign = int(slot_feasign[1])
                 else:
                     feasign = float(slot_feasign[1])
@@ -14,12 +14,16 @@
 
 from __future__ import print_function
 
+import atexit
 import os
+import tempfile
 import warnings
 
 import paddle.fluid as fluid
 from paddlerec.core.utils import envs
+from paddlerec.core.utils import data_meta
 from paddlerec.core.utils import dataloader_instance
+from paddlerec.core.utils import file_shard
 from paddlerec.core.reader import SlotReader
 from paddlerec.core.trainer import EngineMode
 
@@ -46,6 +50,9 @@ class DataLoader(DatasetBase):
         sparse_slots = envs.get_global_env(name + "sparse_slots", "").strip()
         dense_slots = envs.get_global_env(name + "dense_slots", "").strip()
         batch_size = envs.get_global_env(name + "batch_size")
+        places = None
+        if envs.get_global_env(name + "iterable", False):
+            places = self._places(context, dataset_name)
 
         reader_class = envs.get_global_env(name + "data_converter")
         reader_class_name = envs.get_global_env(name + "reader_class_name",
@@ -62,16 +69,67 @@ class DataLoader(DatasetBase):
             reader_class = envs.lazy_instance_by_fliename(reader_class,
                                                           reader_class_name)
             reader_ins = reader_class(context["config_yaml"])
+        elif envs.get_global_env(name + "slot_cache", False):
+            reader = dataloader_instance.slotdataloader_cache_by_name(
+                dataset_name, context)
+            dataloader.set_batch_generator(
+                self._to_lod_batch(reader), places=places)
+            return dataloader
+        elif envs.get_global_env(name + "batch_parse", False):
+            reader = dataloader_instance.slotdataloader_batch_by_name(
+                dataset_name, context)
+            dataloader.set_batch_generator(
+                self._to_lod_batch(reader), places=places)
+            return dataloader
         else:
             reader = dataloader_instance.slotdataloader_by_name(
                 "", dataset_name, context["config_yaml"], context)
             reader_ins = SlotReader(context["config_yaml"])
         if hasattr(reader_ins, 'generate_batch_from_trainfiles'):
-            dataloader.set_sample_list_generator(reader)
+            dataloader.set_sample_list_generator(reader, places=places)
+        elif dataloader_instance.length_bucket_enabled(dataset_name):
+            dataloader.set_batch_generator(
+                self._to_lod_batch(reader), places=places)
         else:
-            dataloader.set_sample_generator(reader, batch_size)
+            dataloader.set_sample_generator(reader, batch_size, places=places)
         return dataloader
 
+    def _places(self, context, dataset_name):
+        """
+        places an iterable DataLoader feeds, matching the program the
+        runner executes: one per CPU thread of a data parallel CPU program,
+        otherwise the trainer place
+        """
+        if context["device"].upper() != "CPU" or context["is_infer"]:
+            return [context["place"]]
+        for model_dict in context["phases"]:
+            if model_dict["dataset_name"] == dataset_name:
+                thread_num = int(model_dict.get("thread_num", 1))
+                if thread_num > 1:
+                    return fluid.cpu_places(thread_num)
+                break
+        return fluid.cpu_places()
+
+    def _to_lod_batch(self, reader):
+        place = fluid.CPUPlace()
+
+        def gen_batch():
+            for batch in reader():
+                feed = []
+                for column in batch:
+                    if isinstance(column, tuple):
+                        values, lengths = column
+                        tensor = fluid.core.LoDTensor()
+                        tensor.set(values, place)
+                        tensor.set_recursive_sequence_lengths(
+                            [lengths.tolist()])
+                        feed.append(tensor)
+                    else:
+                        feed.append(column)
+                yield feed
+
+        return gen_batch
+
 
 class QueueDataset(DatasetBase):
     def __init__(self, context):
@@ -89,7 +147,10 @@ class QueueDataset(DatasetBase):
         else:
             return self._get_dataset(dataset_name, context)
 
-    def _get_dataset(self, dataset_name, context):
+    def pipe_command(self, dataset_name, context):
+        """
+        pipe command converting the lines of a dataset into slots
+        """
         name = "dataset." + dataset_name + "."
         reader_class = envs.get_global_env(name + "data_converter")
         reader_class_name = envs.get_global_env(name + "reader_class_name",
@@ -108,11 +169,25 @@ class QueueDataset(DatasetBase):
             if dense_slots == "":
                 dense_slots = "?"
             padding = envs.get_global_env(name + "padding", 0)
-            pipe_cmd = "python {} {} {} {} {} {} {} {}".format(
-                reader, "slot", "slot", context["config_yaml"], "fake",
-                sparse_slots.replace(" ", "?"),
-                dense_slots.replace(" ", "?"), str(padding))
+            sparse_slots = sparse_slots.replace(" ", "?")
+            dense_slots = dense_slots.replace(" ", "?")
+            if envs.get_global_env(name + "pipe_mode", "default") == "fast":
+                fast_pipe = os.path.join(abs_dir, '../../utils',
+                                         'fast_slot_pipe.py')
+                pipe_cmd = "python {} {} {} {}".format(
+                    fast_pipe, sparse_slots, dense_slots, str(padding))
+            else:
+                pipe_cmd = "python {} {} {} {} {} {} {} {}".format(
+                    reader, "slot", "slot", context["config_yaml"], "fake",
+                    sparse_slots, dense_slots, str(padding))
+            hash_slots = envs.get_global_env(name + "hash_slots", "").strip()
+            if hash_slots != "":
+                pipe_cmd += " " + "?".join(hash_slots.split())
+        return pipe_cmd
 
+    def _get_dataset(self, dataset_name, context):
+        name = "dataset." + dataset_name + "."
+        pipe_cmd = self.pipe_command(dataset_name, context)
         batch_size = envs.get_global_env(name + "batch_size")
         dataset = fluid.DatasetFactory().create_dataset()
         dataset.set_batch_size(batch_size)
@@ -123,7 +198,14 @@ class QueueDataset(DatasetBase):
             for x in os.listdir(train_data_path)
         ]
         if context["engine"] == EngineMode.LOCAL_CLUSTER:
-            file_list = context["fleet"].split_files(file_list)
+            shard_mode = envs.get_global_env(name + "shard_mode", "file")
+            if shard_mode in ("byte", "line"):
+                file_list, pipe_cmd = self._byte_shard(
+                    sorted(file_list), pipe_cmd, dataset_name, context,
+                    shard_mode == "line")
+                dataset.set_pipe_command(pipe_cmd)
+            else:
+                file_list = context["fleet"].split_files(file_list)
 
         dataset.set_filelist(file_list)
         for model_dict in context["phases"]:
@@ -138,3 +220,44 @@ class QueueDataset(DatasetBase):
                 dataset.set_use_var(inputs)
                 break
         return dataset
+
+    def _byte_shard(self,
+                    file_list,
+                    pipe_cmd,
+                    dataset_name,
+                    context,
+                    by_lines=False):
+        """
+        give this worker an equal share of the bytes, or of the lines of
+        the dataset meta with by_lines. The data feed still opens whole
+        files, so the pipe command is told the ranges through an index
+        file and skips everything outside them.
+        """
+        worker_num = context["fleet"].worker_num()
+        worker_index = context["fleet"].worker_index()
+        if by_lines:
+            data_path = envs.get_global_env("dataset." + dataset_name +
+                                            ".data_path")
+            meta = data_meta.load_meta(data_path, file_list)
+            plans = data_meta.split_by_lines(meta, file_list, worker_num)
+        else:
+            plans = file_shard.split_by_bytes(file_list, worker_num)
+        file_shard.print_plans(plans, worker_index)
+        plan = plans[worker_index]
+        fd, index_path = tempfile.mkstemp(
+            prefix="{}_shard_{}_".format(dataset_name, worker_index),
+            suffix=".json")
+        os.close(fd)
+        # the data feed reads it until the end of training
+        atexit.register(_remove_file, index_path)
+        file_shard.write_range_index(plan, index_path)
+        pipe_cmd = "{}={} {}".format(file_shard.SHARD_RANGES_ENV, index_path,
+                                     pipe_cmd)
+        return [file_shard.shard_path(s) for s in plan], pipe_cmd
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
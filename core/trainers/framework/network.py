@@ -74,7 +74,8 @@ class SingleNetwork(NetworkBase):
                         if envs.get_global_env("dataset." + dataset_name +
                                                ".type") == "DataLoader":
                             model._init_dataloader(
-                                is_infer=context["is_infer"])
+                                is_infer=context["is_infer"],
+                                dataset_name=dataset_name)
                             data_loader = DataLoader(context)
                             data_loader.get_dataloader(context, dataset_name,
                                                        model._data_loader)
@@ -131,7 +132,7 @@ class PSNetwork(NetworkBase):
             dataset_name=model_dict["dataset_name"])
         if envs.get_global_env("dataset." + dataset_name +
                                ".type") == "DataLoader":
-            model._init_dataloader(is_infer=False)
+            model._init_dataloader(is_infer=False, dataset_name=dataset_name)
             data_loader = DataLoader(context)
             data_loader.get_dataloader(context, dataset_name,
                                        model._data_loader)
@@ -226,7 +227,8 @@ class PslibNetwork(NetworkBase):
                         dataset_name=model_dict["dataset_name"])
                     if envs.get_global_env("dataset." + dataset_name +
                                            ".type") == "DataLoader":
-                        model._init_dataloader(is_infer=False)
+                        model._init_dataloader(
+                            is_infer=False, dataset_name=dataset_name)
                         data_loader = DataLoader(context)
                         data_loader.get_dataloader(context, dataset_name,
                                                    model._data_loader)
@@ -295,7 +297,8 @@ class CollectiveNetwork(NetworkBase):
                     dataset_name=model_dict["dataset_name"])
                 if envs.get_global_env("dataset." + dataset_name +
                                        ".type") == "DataLoader":
-                    model._init_dataloader(is_infer=False)
+                    model._init_dataloader(
+                        is_infer=False, dataset_name=dataset_name)
                     data_loader = DataLoader(context)
                     data_loader.get_dataloader(context, dataset_name,
                                                model._data_loader)
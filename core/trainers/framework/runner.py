@@ -17,10 +17,23 @@ from __future__ import print_function
 import os
 import time
 import warnings
-import datetime
 
+import numpy as np
 import paddle.fluid as fluid
+from paddlerec.core.trainers.framework.dataset import QueueDataset
+from paddlerec.core.utils import dataloader_instance
+from paddlerec.core.utils.async_save import AsyncSaver
+from paddlerec.core.utils.async_save import can_snapshot
+from paddlerec.core.utils.async_save import remove_old_saves
 from paddlerec.core.utils import envs
+from paddlerec.core.utils.dataset_holder import DatasetPipeline
+from paddlerec.core.utils.dataset_holder import TimeSplitDatasetHolder
+from paddlerec.core.utils.dataset_holder import time_windows
+from paddlerec.core.utils.metric_accumulator import MetricAccumulator
+from paddlerec.core.utils.metric_accumulator import is_checkpointed
+from paddlerec.core.utils.online import OnlineCheckpoints
+from paddlerec.core.utils.train_stats import TrainStats
+from paddlerec.core.utils.train_stats import format_summary
 
 __all__ = [
     "RunnerBase", "SingleRunner", "PSRunner", "CollectiveRunner", "PslibRunner"
@@ -46,6 +59,39 @@ class RunnerBase(object):
         else:
             self._executor_dataset_train(model_dict, context)
 
+    def _train_stats(self, context, model_dict):
+        """
+        TrainStats of a phase, writing to
+        <stats_path>/<phase>.<worker index>.jsonl when stats_path is set
+        """
+        all_stats = context.setdefault("train_stats", {})
+        name = model_dict["name"]
+        if name not in all_stats:
+            stats_path = envs.get_global_env(
+                "runner." + context["runner_name"] + ".stats_path", None)
+            output_path = None
+            if stats_path:
+                worker = context["fleet"].worker_index() if context.get(
+                    "is_fleet") else 0
+                output_path = os.path.join(stats_path, "{}.{}.jsonl".format(
+                    name, worker))
+            batch_size = envs.get_global_env(
+                "dataset." + model_dict["dataset_name"] + ".batch_size", None)
+            all_stats[name] = TrainStats(output_path, name, batch_size)
+        return all_stats[name]
+
+    def _dataset_stats(self, reader):
+        """
+        instances and threads of a fluid Dataset, where it tells them
+        """
+        extra = {"threads": getattr(reader, "thread_num", None)}
+        if hasattr(reader, "get_memory_data_size"):
+            try:
+                extra["samples"] = int(reader.get_memory_data_size())
+            except Exception:
+                pass
+        return extra
+
     def _executor_dataset_train(self, model_dict, context):
         reader_name = model_dict["dataset_name"]
         model_name = model_dict["name"]
@@ -58,6 +104,8 @@ class RunnerBase(object):
         scope = context["model"][model_name]["scope"]
         program = context["model"][model_name]["main_program"]
         reader = context["dataset"][reader_name]
+        stats = self._train_stats(context, model_dict)
+        stats.begin_epoch()
 
         with fluid.scope_guard(scope):
             if context["is_infer"]:
@@ -85,38 +133,24 @@ class RunnerBase(object):
                         fetch_info=fetch_alias,
                         print_period=fetch_period,
                         debug=envs.get_global_env("debug", False))
+        # the per-batch loop runs in the data feed threads, only the epoch
+        # is timed here
+        print(format_summary(stats.end_epoch(**self._dataset_stats(reader))))
 
     def _executor_dataloader_train(self, model_dict, context):
         model_name = model_dict["name"]
-        model_class = context["model"][model_dict["name"]]["model"]
-
-        if context["is_infer"]:
-            program = context["model"][model_name]["main_program"]
-        elif context["is_fleet"]:
-            if context["fleet_mode"].upper() == "PS":
-                program = self._get_ps_program(model_dict, context)
-            elif context["fleet_mode"].upper() == "COLLECTIVE":
-                program = context["model"][model_name]["main_program"]
-        elif not context["is_fleet"]:
-            if context["device"].upper() == "CPU":
-                program = self._get_single_cpu_program(model_dict, context)
-            elif context["device"].upper() == "GPU":
-                program = self._get_single_gpu_program(model_dict, context)
-
         reader_name = model_dict["dataset_name"]
-        fetch_vars = []
-        fetch_alias = []
         fetch_period = int(
             envs.get_global_env("runner." + context["runner_name"] +
                                 ".print_interval", 20))
-        if context["is_infer"]:
-            metrics = model_class.get_infer_results()
-        else:
-            metrics = model_class.get_metrics()
+        metrics = self._phase_metrics(model_dict, context)
+        scope = context["model"][model_name]["scope"]
+        program = self._get_program(model_dict, context)
+        accumulator = self._metric_accumulator(model_dict, context)
+        if accumulator is not None:
+            metrics = dict((name, var) for name, var in metrics.items()
+                           if name not in accumulator.names)
 
-        if metrics:
-            fetch_vars = metrics.values()
-            fetch_alias = metrics.keys()
         metrics_varnames = []
         metrics_format = []
         metrics_format.append("{}: {{}}".format("batch"))
@@ -126,22 +160,183 @@ class RunnerBase(object):
         metrics_format = ", ".join(metrics_format)
 
         reader = context["model"][model_dict["name"]]["model"]._data_loader
+        total_batches = dataloader_instance.planned_batches(
+            reader_name, context)
+        stats = self._train_stats(context, model_dict)
+        stats.begin_epoch()
+        if envs.get_global_env("dataset." + reader_name + ".iterable", False):
+            with fluid.scope_guard(scope):
+                self._executor_iterable_train(
+                    reader, program, metrics_varnames, metrics_format,
+                    fetch_period, context, total_batches, stats, accumulator)
+            print(format_summary(stats.end_epoch()))
+            return
+
+        # batches waiting in the queue the program reads from, 0 before a
+        # batch means exe.run waited for the reader
+        queue = getattr(reader, "_queue", None)
         reader.start()
         batch_id = 0
-        scope = context["model"][model_name]["scope"]
         with fluid.scope_guard(scope):
             try:
                 while True:
+                    queue_size = queue.size() if queue is not None else None
+                    # fetching syncs with the device and converts to numpy,
+                    # only the printed batches pay for it. Global metrics
+                    # such as auc are kept up to date by their ops anyway
+                    report = batch_id % fetch_period == 0 and batch_id != 0
+                    run_begin = time.time()
                     metrics_rets = context["exe"].run(
-                        program=program, fetch_list=metrics_varnames)
-                    metrics = [batch_id]
+                        program=program,
+                        fetch_list=metrics_varnames if report else [],
+                        return_numpy=False)
+                    fetch_begin = time.time()
+                    if not report:
+                        stats.record(
+                            queue_size=queue_size, run=fetch_begin - run_begin)
+                        batch_id += 1
+                        continue
+                    metrics_rets = [np.array(ret) for ret in metrics_rets]
+                    stats.record(
+                        queue_size=queue_size,
+                        run=fetch_begin - run_begin,
+                        fetch=time.time() - fetch_begin)
+                    metrics = [self._batch_label(batch_id, total_batches)]
                     metrics.extend(metrics_rets)
-
-                    if batch_id % fetch_period == 0 and batch_id != 0:
-                        print(metrics_format.format(*metrics))
+                    print(metrics_format.format(*metrics))
+                    if accumulator is not None:
+                        accumulator.pull(metrics[0], program)
+                    stats.interval(batch_id)
                     batch_id += 1
             except fluid.core.EOFException:
                 reader.reset()
+        self._end_accumulation(accumulator, program, batch_id, total_batches)
+        print(format_summary(stats.end_epoch()))
+
+    def _phase_metrics(self, model_dict, context):
+        model_class = context["model"][model_dict["name"]]["model"]
+        if context["is_infer"]:
+            return model_class.get_infer_results()
+        return model_class.get_metrics()
+
+    def _metric_accumulator(self, model_dict, context):
+        """
+        MetricAccumulator of the metrics named in accumulate_metrics, created
+        once per phase
+        """
+        names = envs.get_global_env(
+            "runner." + context["runner_name"] + ".accumulate_metrics", None)
+        if not names:
+            return None
+        if isinstance(names, str):
+            names = names.split()
+        model = context["model"][model_dict["name"]]
+        if "metric_accumulator" not in model and \
+                self._shares_persistables(model_dict, context):
+            warnings.warn("accumulate_metrics: the places of phase {} share "
+                          "the sums with thread_num > 1, the metrics are "
+                          "fetched instead".format(model_dict["name"]))
+            model["metric_accumulator"] = None
+        if "metric_accumulator" not in model:
+            metrics = self._phase_metrics(model_dict, context)
+            unknown = [name for name in names if name not in metrics]
+            if unknown:
+                raise ValueError("accumulate_metrics: no metrics {} in {}".
+                                 format(unknown, sorted(metrics.keys())))
+            accumulated = dict((name, metrics[name]) for name in names)
+            model["metric_accumulator"] = MetricAccumulator(
+                model["main_program"], accumulated, context["exe"],
+                model["scope"])
+        return model["metric_accumulator"]
+
+    def _shares_persistables(self, model_dict, context):
+        """
+        whether the program of a phase runs on CPU places sharing one
+        buffer per persistable. thread_num > 1 compiles it with
+        ReduceStrategy.Reduce, under which the ParallelExecutor shares the
+        persistables of the first place instead of copying them, so the
+        in-place sums of every place would race on one tensor
+        """
+        if context["is_infer"] or context["device"].upper() != "CPU":
+            return False
+        if context["is_fleet"] and context["fleet_mode"].upper() != "PS":
+            return False
+        return int(model_dict.get("thread_num", 1)) > 1
+
+    def _end_accumulation(self, accumulator, program, batch_id, total_batches):
+        if accumulator is not None:
+            accumulator.pull(
+                self._batch_label(batch_id, total_batches), program)
+
+    def _batch_label(self, batch_id, total_batches):
+        if total_batches is None:
+            return batch_id
+        return "{}/{} ({:.1f}%)".format(
+            batch_id, total_batches, 100.0 * batch_id / max(total_batches, 1))
+
+    def _executor_iterable_train(self,
+                                 reader,
+                                 program,
+                                 metrics_varnames,
+                                 metrics_format,
+                                 fetch_period,
+                                 context,
+                                 total_batches=None,
+                                 stats=None,
+                                 accumulator=None):
+        """
+        feed the batches an iterable DataLoader prepares in its background
+        thread and measure how long the executor waits for them
+        """
+        batch_id = 0
+        wait_time = 0.0
+        interval_wait = 0.0
+        begin = time.time()
+        data_iter = iter(reader())
+        while True:
+            wait_begin = time.time()
+            try:
+                data = next(data_iter)
+            except StopIteration:
+                break
+            wait = time.time() - wait_begin
+            wait_time += wait
+            interval_wait += wait
+
+            report = batch_id % fetch_period == 0 and batch_id != 0
+            run_begin = time.time()
+            metrics_rets = context["exe"].run(
+                program=program,
+                feed=data,
+                fetch_list=metrics_varnames if report else [],
+                return_numpy=False)
+            fetch_begin = time.time()
+            if not report:
+                if stats is not None:
+                    stats.record(reader_wait=wait, run=fetch_begin - run_begin)
+                batch_id += 1
+                continue
+            metrics_rets = [np.array(ret) for ret in metrics_rets]
+            if stats is not None:
+                stats.record(
+                    reader_wait=wait,
+                    run=fetch_begin - run_begin,
+                    fetch=time.time() - fetch_begin)
+            metrics = [self._batch_label(batch_id, total_batches)]
+            metrics.extend(metrics_rets)
+            print("{}, reader_wait: {:.3f}s".format(
+                metrics_format.format(*metrics), interval_wait))
+            if accumulator is not None:
+                accumulator.pull(metrics[0], program)
+            interval_wait = 0.0
+            if stats is not None:
+                stats.interval(batch_id)
+            batch_id += 1
+        self._end_accumulation(accumulator, program, batch_id, total_batches)
+        total_time = time.time() - begin
+        print("batches: {}, reader wait: {:.2f}s of {:.2f}s ({:.1f}%)".format(
+            batch_id, wait_time, total_time, 100.0 * wait_time / total_time
+            if total_time > 0 else 0.0))
 
     def _get_strategy(self, model_dict, context):
         _build_strategy = fluid.BuildStrategy()
@@ -168,6 +363,74 @@ class RunnerBase(object):
 
         return _exe_strategy, _build_strategy
 
+    def _program_key(self, model_dict, context):
+        """
+        what the program of a phase is built for. The DataLoader of the
+        phase feeds the program through variables of the program itself,
+        it is keyed by dataset_name in case a phase is pointed at another
+        """
+        fleet_mode = context["fleet_mode"].upper() if context[
+            "is_fleet"] else None
+        return (model_dict["name"], model_dict["dataset_name"],
+                context["device"].upper(), fleet_mode, context["is_infer"],
+                int(model_dict.get("thread_num", 1)), model_dict.get(
+                    "gradient_scale_strategy", 0))
+
+    def _build_program(self, model_dict, context):
+        model_name = model_dict["name"]
+        if context["is_infer"]:
+            program = context["model"][model_name]["main_program"]
+        elif context["is_fleet"]:
+            if context["fleet_mode"].upper() == "PS":
+                program = self._get_ps_program(model_dict, context)
+            elif context["fleet_mode"].upper() == "COLLECTIVE":
+                program = context["model"][model_name]["main_program"]
+        elif not context["is_fleet"]:
+            if context["device"].upper() == "CPU":
+                program = self._get_single_cpu_program(model_dict, context)
+            elif context["device"].upper() == "GPU":
+                program = self._get_single_gpu_program(model_dict, context)
+        return program
+
+    def _get_program(self, model_dict, context):
+        """
+        the program a DataLoader phase runs. Cloning and compiling a big
+        graph takes seconds, so it is built once per phase, device and
+        strategy and reused by every epoch
+        """
+        model = context["model"][model_dict["name"]]
+        programs = model.setdefault("programs", {})
+        key = self._program_key(model_dict, context)
+        if key not in programs:
+            # the accumulation ops have to be in the program before it is
+            # cloned
+            self._metric_accumulator(model_dict, context)
+            begin = time.time()
+            program = self._build_program(model_dict, context)
+            if isinstance(program, fluid.compiler.CompiledProgram):
+                # with_data_parallel only records the strategies, the graph
+                # of the ParallelExecutor is built here instead of in the
+                # first exe.run, with the scope and place that run uses
+                program._compile(model["scope"], context["exe"].place)
+            programs[key] = program
+            print("phase {}: program built in {:.3f}s".format(
+                model_dict["name"], time.time() - begin))
+        return programs[key]
+
+    def build_programs(self, context, phases):
+        """
+        build the programs of the DataLoader phases ahead of the first epoch
+        Return:
+            seconds spent
+        """
+        begin = time.time()
+        for model_dict in phases:
+            dataset_type = envs.get_global_env(
+                "dataset." + model_dict["dataset_name"] + ".type")
+            if dataset_type == "DataLoader":
+                self._get_program(model_dict, context)
+        return time.time() - begin
+
     def _get_single_gpu_program(self, model_dict, context):
         model_name = model_dict["name"]
         return context["model"][model_name]["main_program"].clone()
@@ -216,6 +479,101 @@ class RunnerBase(object):
             exec_strategy=_exe_strategy)
         return program
 
+    def _is_online(self, context):
+        return envs.get_global_env(
+            "runner." + context["runner_name"] + ".online", False)
+
+    def _online_holder(self, context, model_dict, window_min):
+        """
+        TimeSplitDatasetHolder over the time split directories of the
+        phase dataset, data_path/<online_path_format>
+        """
+        dataset_name = model_dict["dataset_name"]
+        name = "dataset." + dataset_name + "."
+        if envs.get_global_env(name + "type") == "DataLoader":
+            raise ValueError(
+                "online training loads every window into an "
+                "InMemoryDataset, dataset {} can not be a DataLoader".format(
+                    dataset_name))
+        thread_num = int(model_dict.get("thread_num", 1))
+        data_path = os.path.join(
+            envs.get_global_env(name + "data_path"),
+            envs.get_global_env(name + "online_path_format", "%Y%m%d/%H"))
+        pipe_command = QueueDataset(context).pipe_command(
+            dataset_name, context)
+        model = context["model"][model_dict["name"]]["model"]
+        config = {
+            "data_path": data_path,
+            "data_donefile": envs.get_global_env(name + "data_donefile"),
+            "split_interval": window_min,
+            "filename_prefix": envs.get_global_env(name + "filename_prefix",
+                                                   ""),
+            "dataset_type": "InMemoryDataset",
+            "batch_size": envs.get_global_env(name + "batch_size"),
+            "load_thread": thread_num,
+            "preload_thread": thread_num,
+            "data_converter": pipe_command,
+            "data_vars": model._data_var
+        }
+        fs_name = envs.get_global_env(name + "fs_name", None)
+        if fs_name:
+            config["fs_name"] = fs_name
+            config["fs_ugi"] = envs.get_global_env(name + "fs_ugi", "")
+        return TimeSplitDatasetHolder(config)
+
+    def _run_online(self, context, model_dict, is_fleet=False):
+        """
+        train the time windows from online_begin_time one after the other,
+        the next window loading while the current one trains, save a
+        checkpoint after every window and resume after the last completed
+        one
+        """
+        name = "runner." + context["runner_name"] + "."
+        model_name = model_dict["name"]
+        scope = context["model"][model_name]["scope"]
+        program = context["model"][model_name]["main_program"]
+        window_min = int(envs.get_global_env(name + "online_window_min", 60))
+        count = envs.get_global_env(name + "online_windows", None)
+        windows = time_windows(
+            str(envs.get_global_env(name + "online_begin_time")), window_min,
+            None if count is None else int(count))
+
+        checkpoints = None
+        save_path = envs.get_global_env(name + "save_checkpoint_path", None)
+        if save_path:
+            checkpoints = OnlineCheckpoints(
+                save_path,
+                int(envs.get_global_env(name + "online_base_interval", 24)))
+        if checkpoints is not None and checkpoints.last_done is not None:
+            print("online: resuming after window {}".format(
+                checkpoints.last_done))
+            with fluid.scope_guard(scope):
+                checkpoints.restore(context, program, is_fleet)
+            last_done = checkpoints.last_done
+            windows = (w for w in windows if w > last_done)
+
+        params = {"time_window_min": window_min, "node_num": 1, "node_idx": 0}
+        if is_fleet:
+            params["node_num"] = context["fleet"].worker_num()
+            params["node_idx"] = context["fleet"].worker_index()
+        pipeline = DatasetPipeline(
+            self._online_holder(context, model_dict, window_min),
+            windows,
+            params,
+            prefetch=int(envs.get_global_env(name + "online_prefetch", 1)))
+        for begin_time, dataset in pipeline:
+            begin = time.time()
+            context["dataset"][model_dict["dataset_name"]] = dataset
+            self._run(context, model_dict)
+            print("window {} done, use time: {}".format(
+                begin_time, time.time() - begin))
+            if checkpoints is not None:
+                with fluid.scope_guard(scope):
+                    checkpoints.save(context, begin_time, program, is_fleet)
+        print("online: {} windows, {} preloaded, waited {:.1f}s for data".
+              format(pipeline.stats["windows"], pipeline.stats["preloaded"],
+                     pipeline.stats["stall_seconds"]))
+
     def save(self, epoch_id, context, is_fleet=False):
         def need_save(epoch_id, epoch_interval, is_last=False):
             if is_last:
@@ -225,6 +583,18 @@ class RunnerBase(object):
 
             return epoch_id % epoch_interval == 0
 
+        saver = self._async_saver(context, is_fleet)
+        program = fluid.default_main_program()
+        if saver is not None and not can_snapshot(program):
+            print("save_async: program has persistables other than dense "
+                  "tensors and selected rows, saving synchronously")
+            saver = None
+        keep = envs.get_global_env(
+            "runner." + context["runner_name"] + ".save_checkpoint_max", None)
+        keep = int(keep) if keep else None
+        # saves of the async saver, written from one snapshot
+        jobs = []
+
         def save_inference_model():
             name = "runner." + context["runner_name"] + "."
             save_interval = int(
@@ -239,7 +609,7 @@ class RunnerBase(object):
                len(feed_varnames) == 0 or len(fetch_varnames) == 0:
                 return
             fetch_vars = [
-                fluid.default_main_program().global_block().vars[varname]
+                program.global_block().vars[varname]
                 for varname in fetch_varnames
             ]
             dirname = envs.get_global_env(name + "save_inference_path", None)
@@ -250,6 +620,24 @@ class RunnerBase(object):
             if is_fleet:
                 context["fleet"].save_inference_model(
                     context["exe"], dirname, feed_varnames, fetch_vars)
+            elif saver is not None:
+                # save_inference_model adds ops to the program it is given,
+                # the writing thread gets a clone training does not use
+                infer_program = program.clone()
+                infer_fetch_vars = [
+                    infer_program.global_block().vars[varname]
+                    for varname in fetch_varnames
+                ]
+
+                def write(exe, path):
+                    fluid.io.save_inference_model(
+                        path,
+                        feed_varnames,
+                        infer_fetch_vars,
+                        exe,
+                        main_program=infer_program)
+
+                jobs.append((dirname, write, None))
             else:
                 fluid.io.save_inference_model(dirname, feed_varnames,
                                               fetch_vars, context["exe"])
@@ -265,12 +653,65 @@ class RunnerBase(object):
                 return
             dirname = os.path.join(dirname, str(epoch_id))
             if is_fleet:
+                # the fleet saves the program as it was before minimize,
+                # without the sums of a MetricAccumulator
                 context["fleet"].save_persistables(context["exe"], dirname)
+            elif saver is not None:
+
+                def write(exe, path):
+                    fluid.io.save_vars(
+                        exe,
+                        path,
+                        main_program=program,
+                        predicate=is_checkpointed)
+
+                jobs.append((dirname, write, keep))
             else:
-                fluid.io.save_persistables(context["exe"], dirname)
+                fluid.io.save_vars(
+                    context["exe"],
+                    dirname,
+                    main_program=program,
+                    predicate=is_checkpointed)
+                remove_old_saves(os.path.dirname(dirname), keep)
 
         save_persistables()
         save_inference_model()
+        if jobs:
+            label = "of epoch {}".format(epoch_id)
+            saver.save(program, fluid.global_scope(), jobs, label)
+
+    def _async_saver(self, context, is_fleet=False):
+        """
+        AsyncSaver of the runner when save_async is set, None otherwise.
+        Fleet saves go through the fleet and stay synchronous
+        """
+        name = "runner." + context["runner_name"] + "."
+        if not envs.get_global_env(name + "save_async", False):
+            return None
+        if is_fleet:
+            if not context.get("async_save_warned"):
+                warnings.warn("save_async: fleet saves are synchronous")
+                context["async_save_warned"] = True
+            return None
+        if "async_saver" not in context:
+            context["async_saver"] = AsyncSaver(
+                int(envs.get_global_env(name + "save_async_max_pending", 1)))
+        return context["async_saver"]
+
+    def _wait_saves(self, context):
+        """
+        wait for the pending async saves and report the time training was
+        blocked by them against the time spent writing, a failed save is
+        raised
+        """
+        saver = context.get("async_saver")
+        if saver is None:
+            return
+        stats = saver.wait()
+        print("async save: {} saves, {} failed, training blocked {:.3f}s, "
+              "written in {:.3f}s".format(stats["saves"], stats["failed"],
+                                          stats["blocked_seconds"],
+                                          stats["write_seconds"]))
 
 
 class SingleRunner(RunnerBase):
@@ -282,6 +723,10 @@ class SingleRunner(RunnerBase):
         pass
 
     def run(self, context):
+        if self._is_online(context):
+            self._run_online(context, context["phases"][0])
+            context["status"] = "terminal_pass"
+            return
         epochs = int(
             envs.get_global_env("runner." + context["runner_name"] +
                                 ".epochs"))
@@ -300,6 +745,7 @@ class SingleRunner(RunnerBase):
                         "startup_program"]
                     with fluid.program_guard(train_prog, startup_prog):
                         self.save(epoch, context)
+        self._wait_saves(context)
         context["status"] = "terminal_pass"
 
 
@@ -309,10 +755,14 @@ class PSRunner(RunnerBase):
         pass
 
     def run(self, context):
+        model_dict = context["env"]["phase"][0]
+        if self._is_online(context):
+            self._run_online(context, model_dict, True)
+            context["status"] = "terminal_pass"
+            return
         epochs = int(
             envs.get_global_env("runner." + context["runner_name"] +
                                 ".epochs"))
-        model_dict = context["env"]["phase"][0]
         for epoch in range(epochs):
             begin_time = time.time()
             self._run(context, model_dict)
@@ -327,6 +777,7 @@ class PSRunner(RunnerBase):
                     "startup_program"]
                 with fluid.program_guard(train_prog, startup_prog):
                     self.save(epoch, context, True)
+        self._wait_saves(context)
         context["status"] = "terminal_pass"
 
 
@@ -354,6 +805,7 @@ class CollectiveRunner(RunnerBase):
                     "startup_program"]
                 with fluid.program_guard(train_prog, startup_prog):
                     self.save(epoch, context, True)
+        self._wait_saves(context)
         context["status"] = "terminal_pass"
 
 
@@ -365,6 +817,10 @@ class PslibRunner(RunnerBase):
     def run(self, context):
         context["fleet"].init_worker()
         model_dict = context["env"]["phase"][0]
+        if self._is_online(context):
+            self._run_online(context, model_dict, True)
+            context["status"] = "terminal_pass"
+            return
         epochs = int(
             envs.get_global_env("runner." + context["runner_name"] +
                                 ".epochs"))
@@ -374,44 +830,4 @@ class PslibRunner(RunnerBase):
             end_time = time.time()
             seconds = end_time - begin_time
             print("epoch {} done, use time: {}".format(epoch, seconds))
-        """
-        # online Training Can do more, As shown below:
-
-        begin_day = datetime.datetime.strptime("begin_day_d", '%Y%m%d')
-        days = int(
-            envs.get_global_env("runner." + context["runner_name"] + ".days"))
-        for day in range(days):
-            for hour in range(24):
-                day = begin_day + datetime.timedelta(days=day, hours=hour)
-                day_s = day.strftime('%Y%m%d/%H')
-
-                for dataset in envs.get_global_env("dataset"):
-                    if dataset["type"] != "DataLoader":
-                        name = dataset["name"]
-                        train_data_path = envs.get_global_env(name +
-                                                              "data_path")
-                        train_data_path = os.path.join(train_data_path, day_s)
-
-                        file_list = [
-                            os.path.join(train_data_path, x)
-                            for x in os.listdir(train_data_path)
-                        ]
-                        context["dataset"][name].set_filelist(file_list)
-
-                for epoch in range(epochs):
-                    begin_time = time.time()
-                    self._run(context, model_dict)
-                    end_time = time.time()
-                    seconds = end_time - begin_time
-                    print("epoch {} done, use time: {}".format(epoch, seconds))
-                    with fluid.scope_guard(context["model"][model_dict["name"]]
-                                           ["scope"]):
-                        train_prog = context["model"][model_dict["name"]][
-                            "default_main_program"]
-                        startup_prog = context["model"][model_dict["name"]][
-                            "startup_program"]
-                        with fluid.program_guard(train_prog, startup_prog):
-                            self.save(epoch, context, True)
-
-        """
         context["status"] = "terminal_pass"
@@ -14,9 +14,11 @@
 
 from __future__ import print_function
 
+import time
 import warnings
 
 import paddle.fluid as fluid
+from paddlerec.core.trainers.framework.runner import RunnerBase
 from paddlerec.core.utils import envs
 
 __all__ = ["StartupBase", "SingleStartup", "PSStartup", "CollectiveStartup"]
@@ -44,6 +46,22 @@ class StartupBase(object):
             fluid.io.load_persistables(
                 context["exe"], dirname, main_program=main_program)
 
+    def _report(self, context, begin, loaded, phases):
+        """
+        build the programs of phases and print the time spent on the
+        startup programs, the loading and the builds
+        Args:
+            begin(float): time the startup programs began
+            loaded(float): time the loading ended
+        """
+        build = RunnerBase(context).build_programs(context, phases)
+        context["startup_seconds"] = {
+            "startup_and_load": loaded - begin,
+            "build_programs": build
+        }
+        print("startup: startup programs and load {:.3f}s, "
+              "build programs {:.3f}s".format(loaded - begin, build))
+
 
 class SingleStartup(StartupBase):
     """R
@@ -54,6 +72,7 @@ class SingleStartup(StartupBase):
         pass
 
     def startup(self, context):
+        begin = time.time()
         for model_dict in context["phases"]:
             with fluid.scope_guard(context["model"][model_dict["name"]][
                     "scope"]):
@@ -64,6 +83,7 @@ class SingleStartup(StartupBase):
                 with fluid.program_guard(train_prog, startup_prog):
                     context["exe"].run(startup_prog)
                     self.load(context, main_program=train_prog)
+        self._report(context, begin, time.time(), context["phases"])
         context["status"] = "train_pass"
 
 
@@ -73,6 +93,7 @@ class PSStartup(StartupBase):
         pass
 
     def startup(self, context):
+        begin = time.time()
         model_dict = context["env"]["phase"][0]
         with fluid.scope_guard(context["model"][model_dict["name"]]["scope"]):
 
@@ -82,6 +103,7 @@ class PSStartup(StartupBase):
             with fluid.program_guard(train_prog, startup_prog):
                 context["exe"].run(startup_prog)
                 self.load(context, True)
+        self._report(context, begin, time.time(), [model_dict])
         context["status"] = "train_pass"
 
 
@@ -91,6 +113,7 @@ class CollectiveStartup(StartupBase):
         pass
 
     def startup(self, context):
+        begin = time.time()
         model_dict = context["env"]["phase"][0]
         with fluid.scope_guard(context["model"][model_dict["name"]]["scope"]):
             train_prog = context["model"][model_dict["name"]][
@@ -100,4 +123,5 @@ class CollectiveStartup(StartupBase):
             with fluid.program_guard(train_prog, startup_prog):
                 context["exe"].run(startup_prog)
                 self.load(context, True)
+        self._report(context, begin, time.time(), [model_dict])
         context["status"] = "train_pass"
@@ -0,0 +1,228 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Checkpoint and inference model saving off the training thread.
+
+AsyncSaver copies the persistable tensors of the program from the
+training scope into host memory, a snapshot scope, which is all the
+training waits for. A background thread then writes the snapshot with
+the usual fluid.io functions, given an executor bound to the snapshot
+scope, into <dirname>.tmp.<pid> and renames it to dirname when it is
+complete, so a directory that exists is always a whole save. At most
+max_pending snapshots are held, a save beyond that waits for the oldest
+one to be written. A failed write is raised by wait.
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import paddle.fluid as fluid
+
+
+def _snapshot_vars(program):
+    # RAW variables are skipped by fluid.io.save_vars as well
+    return [
+        var for var in program.list_vars()
+        if fluid.io.is_persistable(var) and
+        var.type != fluid.core.VarDesc.VarType.RAW
+    ]
+
+
+def can_snapshot(program):
+    """
+    whether snapshot_scope copies every persistable of program that a
+    synchronous save writes, dense tensors and selected rows
+    """
+    types = (fluid.core.VarDesc.VarType.LOD_TENSOR,
+             fluid.core.VarDesc.VarType.SELECTED_ROWS)
+    return all(var.type in types for var in _snapshot_vars(program))
+
+
+def snapshot_scope(program, scope):
+    """
+    a new scope with a host copy of the persistable dense tensors and
+    selected rows of program found in scope
+    """
+    snapshot = fluid.Scope()
+    place = fluid.CPUPlace()
+    for var in _snapshot_vars(program):
+        found = scope.find_var(var.name)
+        if found is None:
+            continue
+        try:
+            if var.type == fluid.core.VarDesc.VarType.SELECTED_ROWS:
+                rows = found.get_selected_rows()
+                value = np.array(rows.get_tensor())
+                copy = snapshot.var(var.name).get_selected_rows()
+                copy.set_height(rows.height())
+                copy.set_rows(list(rows.rows()))
+                copy.get_tensor().set(value, place)
+            else:
+                value = np.array(found.get_tensor())
+                snapshot.var(var.name).get_tensor().set(value, place)
+        except Exception:
+            # created but never initialized, not saved either
+            continue
+    return snapshot
+
+
+class ScopedExecutor(object):
+    """
+    an Executor running every program in one scope, for the fluid.io
+    functions, which run their save programs in the global scope
+    """
+
+    def __init__(self, scope, place=None):
+        self._exe = fluid.Executor(place or fluid.CPUPlace())
+        self._scope = scope
+
+    def run(self, program=None, *args, **kwargs):
+        kwargs["scope"] = self._scope
+        return self._exe.run(program, *args, **kwargs)
+
+
+def publish(tmp_dir, dirname):
+    """
+    replace dirname by the completed tmp_dir
+    """
+    if os.path.isdir(dirname):
+        shutil.rmtree(dirname)
+    parent = os.path.dirname(dirname)
+    if parent and not os.path.isdir(parent):
+        os.makedirs(parent)
+    os.rename(tmp_dir, dirname)
+
+
+def remove_old_saves(root, keep):
+    """
+    keep the keep newest of the epoch directories 0, 1, ... under root
+    Return:
+        removed directories
+    """
+    if not keep or not os.path.isdir(root):
+        return []
+    epochs = sorted(int(name) for name in os.listdir(root) if name.isdigit())
+    removed = []
+    for epoch in epochs[:-keep]:
+        path = os.path.join(root, str(epoch))
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path)
+    return removed
+
+
+class AsyncSaver(object):
+    """
+    saves of snapshots in background threads
+    """
+
+    def __init__(self, max_pending=1):
+        """
+        Args:
+            max_pending(int): snapshots held or being written at once
+        """
+        self._slots = threading.BoundedSemaphore(max(int(max_pending), 1))
+        self._threads = []
+        self._lock = threading.Lock()
+        self.stats = {
+            "saves": 0,
+            "failed": 0,
+            "errors": [],
+            "blocked_seconds": 0.0,
+            "write_seconds": 0.0
+        }
+
+    def save(self, program, scope, jobs, label=""):
+        """
+        snapshot scope and write it in the background
+        Args:
+            program(Program): the persistables of program are copied
+            scope(Scope): training scope
+            jobs(list): (dirname, write, keep) tuples, write(executor,
+                dirname) saves to dirname, the keep newest epoch
+                directories next to dirname are kept if keep is set
+            label(string): name of the save in the log
+        Return:
+            seconds the caller was blocked
+        """
+        begin = time.time()
+        self._slots.acquire()
+        try:
+            snapshot = snapshot_scope(program, scope)
+        except Exception:
+            self._slots.release()
+            raise
+        blocked = time.time() - begin
+        with self._lock:
+            self.stats["blocked_seconds"] += blocked
+            self._threads = [t for t in self._threads if t.is_alive()]
+        thread = threading.Thread(
+            target=self._write, args=(snapshot, jobs, label, blocked))
+        thread.daemon = True
+        thread.start()
+        with self._lock:
+            self._threads.append(thread)
+        return blocked
+
+    def _write(self, snapshot, jobs, label, blocked):
+        begin = time.time()
+        failed = False
+        try:
+            exe = ScopedExecutor(snapshot)
+            for dirname, write, keep in jobs:
+                dirname = os.path.normpath(dirname)
+                tmp_dir = "{}.tmp.{}".format(dirname, os.getpid())
+                try:
+                    write(exe, tmp_dir)
+                    with self._lock:
+                        publish(tmp_dir, dirname)
+                        remove_old_saves(os.path.dirname(dirname), keep)
+                except Exception as e:
+                    failed = True
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    print("async save to {} failed: {}".format(dirname, e))
+                    with self._lock:
+                        self.stats["errors"].append(
+                            "{}: {}".format(dirname, e))
+        finally:
+            self._slots.release()
+        seconds = time.time() - begin
+        with self._lock:
+            self.stats["saves"] += 1
+            self.stats["failed"] += int(failed)
+            self.stats["write_seconds"] += seconds
+        print("async save {}: blocked {:.3f}s, written in {:.3f}s".format(
+            label, blocked, seconds))
+
+    def wait(self):
+        """
+        block until every pending save is written, raise RuntimeError if
+        any of the saves failed
+        Return:
+            stats
+        """
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join()
+        with self._lock:
+            self._threads = []
+            stats = dict(self.stats)
+        if stats["errors"]:
+            raise RuntimeError("{} of {} async saves failed: {}".format(
+                stats["failed"], stats["saves"], "; ".join(stats["errors"])))
+        return stats
@@ -0,0 +1,230 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Read gzip/bz2/xz compressed text files as if they were plain ones.
+
+The compression is taken from the file extension, or from the magic bytes
+when the extension says nothing. Decompression runs in one of three modes:
+
+    inline   decompress in the reading thread
+    thread   decompress in a background thread, zlib/bz2/lzma release the
+             GIL so inflating overlaps with parsing
+    process  pipe the file through gzip/bzip2/xz -dc
+
+Run as a script it copies the decompressed stdin to stdout, a filter for
+QueueDataset pipe commands.
+"""
+from __future__ import print_function
+
+import bz2
+import gzip
+import io
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+PY3 = sys.version_info[0] >= 3
+
+EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".lzma": "xz"}
+MAGICS = [(b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz")]
+COMMANDS = {"gzip": "gzip", "bz2": "bzip2", "xz": "xz"}
+MODES = ["inline", "thread", "process"]
+
+
+def compression_of_name(path):
+    """
+    compression implied by the extension of path, None for plain files
+    """
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def compression_of_bytes(head):
+    """
+    compression identified by the first bytes of a file
+    """
+    for magic, name in MAGICS:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def detect_compression(path):
+    """
+    compression of a local file by extension, then by magic bytes
+    """
+    name = compression_of_name(path)
+    if name is not None:
+        return name
+    with open(path, "rb") as f:
+        return compression_of_bytes(f.read(6))
+
+
+def _decompressor(compression, source):
+    """
+    binary file object of the decompressed data, source is a path or, on
+    python3, a readable binary file object
+    """
+    if compression == "gzip":
+        if isinstance(source, str):
+            return gzip.GzipFile(source, mode="rb")
+        return gzip.GzipFile(fileobj=source, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(source, mode="rb")
+    if compression == "xz":
+        if lzma is None:
+            raise ImportError(
+                "reading xz files needs the lzma module (python3 or "
+                "backports.lzma)")
+        return lzma.LZMAFile(source, mode="rb")
+    raise ValueError("unknown compression: {}".format(compression))
+
+
+def _text_lines(binary):
+    reader = io.TextIOWrapper(binary, "utf-8") if PY3 else binary
+    try:
+        for line in reader:
+            yield line
+    finally:
+        reader.close()
+
+
+def _process_lines(compression, path):
+    proc = subprocess.Popen(
+        [COMMANDS[compression], "-dc", path], stdout=subprocess.PIPE)
+    finished = False
+    try:
+        for line in _text_lines(proc.stdout):
+            yield line
+        finished = True
+    finally:
+        if not finished and proc.poll() is None:
+            proc.terminate()
+        proc.wait()
+    if proc.returncode != 0:
+        raise IOError("{} -dc {} failed with code {}".format(
+            COMMANDS[compression], path, proc.returncode))
+
+
+def _threaded(lines, queue_size=256, chunk_size=256):
+    """
+    run the lines generator in a background thread, handing chunks of
+    lines over a bounded queue
+    """
+    chunks = queue.Queue(queue_size)
+    stop = threading.Event()
+
+    def _produce():
+        try:
+            chunk = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) == chunk_size:
+                    chunks.put(chunk)
+                    chunk = []
+                    if stop.is_set():
+                        return
+            chunks.put(chunk)
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+
+    thread = threading.Thread(target=_produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            for line in chunk:
+                yield line
+    finally:
+        stop.set()
+        # unblock a producer waiting on the full queue
+        while thread.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        lines.close()
+
+
+def open_lines(path, mode="inline"):
+    """
+    iterate the text lines of a file, decompressing it when needed
+    Args:
+        path(string): local file
+        mode(string): inline, thread or process, see the module doc
+    """
+    if mode not in MODES:
+        raise ValueError("decompress mode {} not in {}".format(mode, MODES))
+    compression = detect_compression(path)
+    if compression is None:
+        return _plain_lines(path)
+    if mode == "process":
+        return _process_lines(compression, path)
+    lines = _text_lines(_decompressor(compression, path))
+    if mode == "thread":
+        return _threaded(lines)
+    return lines
+
+
+def _plain_lines(path):
+    with open(path, "r") as f:
+        for line in f:
+            yield line
+
+
+def stdin_lines():
+    """
+    lines of stdin, decompressed when it starts with a known magic
+    """
+    if not PY3:
+        return sys.stdin
+    stdin = sys.stdin.buffer
+    compression = compression_of_bytes(stdin.peek(6)[:6])
+    if compression is None:
+        return sys.stdin
+    return _text_lines(_decompressor(compression, stdin))
+
+
+def filter_command(pipe_command):
+    """
+    prefix a QueueDataset pipe command with the decompression filter
+    """
+    return "python {} | {}".format(os.path.abspath(__file__), pipe_command)
+
+
+if __name__ == "__main__":
+    source = sys.stdin.buffer if PY3 else sys.stdin
+    sink = sys.stdout.buffer if PY3 else sys.stdout
+    compression = compression_of_bytes(source.peek(6)[:6]) if hasattr(
+        source, "peek") else None
+    if compression is not None:
+        source = _decompressor(compression, source)
+    shutil.copyfileobj(source, sink, 1 << 20)
@@ -0,0 +1,147 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming re-split of a text corpus into N shard files.
+
+Lines are read one at a time and appended to per-shard buffers, which are
+flushed once all of them together hold buffer_bytes, so memory does not
+grow with the corpus and at most one output file is open at a time.
+
+    round_robin  line i goes to shard i % N, equal line counts
+    bytes        contiguous runs of about total_bytes / N bytes per shard,
+                 in input order
+"""
+from __future__ import print_function
+
+import os
+import random
+import time
+
+from paddlerec.core.utils.compressed_io import detect_compression
+from paddlerec.core.utils.file_shard import iter_shards
+from paddlerec.core.utils.shuffle_buffer import buffered_shuffle
+
+MODES = ["round_robin", "bytes"]
+REPORT_LINES = 1000000
+
+
+def _byte_len(line):
+    # budgets come from file sizes, so lines are counted encoded
+    if isinstance(line, bytes):
+        return len(line)
+    return len(line.encode("utf-8"))
+
+
+class ShardWriter(object):
+    """
+    buffered appends to a fixed list of output files
+    """
+
+    def __init__(self, paths, buffer_bytes=64 << 20):
+        self.paths = list(paths)
+        self.buffer_bytes = buffer_bytes
+        self._buffers = [[] for _ in self.paths]
+        self._buffered = 0
+        for path in self.paths:
+            open(path, "wb").close()
+
+    def write(self, shard, line):
+        self._buffers[shard].append(line)
+        self._buffered += _byte_len(line)
+        if self._buffered >= self.buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        for path, buf in zip(self.paths, self._buffers):
+            if not buf:
+                continue
+            data = "".join(buf)
+            if not isinstance(data, bytes):
+                data = data.encode("utf-8")
+            with open(path, "ab") as f:
+                f.write(data)
+            del buf[:]
+        self._buffered = 0
+
+
+class _Meter(object):
+    def __init__(self):
+        self.begin = time.time()
+        self.lines = 0
+        self.bytes = 0
+
+    def report(self, tag):
+        cost = max(time.time() - self.begin, 1e-6)
+        print("resplit {}: {} lines, {:.1f} MB in {:.1f}s, {:.0f} lines/s, "
+              "{:.2f} MB/s".format(tag, self.lines, self.bytes / 1e6, cost,
+                                   self.lines / cost, self.bytes / 1e6 / cost))
+
+
+def resplit(files,
+            output_dir,
+            num_shards,
+            mode="round_robin",
+            shuffle_window=0,
+            rng=random,
+            prefix="part_",
+            buffer_bytes=64 << 20,
+            decompress="inline"):
+    """
+    write the lines of files into num_shards files of output_dir
+    Args:
+        files(list): input text files, gzip/bz2/xz ones are decompressed
+        num_shards(int): number of output files, prefix + 1..num_shards
+        mode(string): round_robin or bytes, see the module doc
+        shuffle_window(int): lines shuffled together before writing, 0 to
+            keep the input order
+        buffer_bytes(int): bytes buffered before the shards are written
+    Return:
+        list of the output paths
+    """
+    if mode not in MODES:
+        raise ValueError("resplit mode {} not in {}".format(mode, MODES))
+    num_shards = int(num_shards)
+    budget = None
+    if mode == "bytes":
+        if any(detect_compression(f) is not None for f in files):
+            raise ValueError("bytes mode budgets the shards by file size, "
+                             "use round_robin for compressed input")
+        total = sum(os.path.getsize(f) for f in files)
+        budget = max(float(total) / num_shards, 1.0)
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    paths = [
+        os.path.join(output_dir, "{}{}".format(prefix, i))
+        for i in range(1, num_shards + 1)
+    ]
+    writer = ShardWriter(paths, buffer_bytes)
+    meter = _Meter()
+    lines = buffered_shuffle(
+        iter_shards(files, decompress), shuffle_window, rng=rng)
+    for line in lines:
+        if not line.endswith("\n"):
+            line += "\n"
+        if budget is None:
+            shard = meter.lines % num_shards
+        else:
+            shard = min(int(meter.bytes / budget), num_shards - 1)
+        writer.write(shard, line)
+        meter.lines += 1
+        meter.bytes += _byte_len(line)
+        if meter.lines % REPORT_LINES == 0:
+            meter.report("progress")
+    writer.flush()
+    meter.report("done")
+    return paths
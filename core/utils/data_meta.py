@@ -0,0 +1,349 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Metadata sidecar of a dataset directory.
+
+The first use of a data_path reads its files once and records, for every
+file, the line count and the byte offset of every index_every-th line and,
+given a field parser, the length histogram and value range of every slot.
+They are stored in <data_path>.meta.json next to the directory, one entry
+per file keyed by its size and mtime, so later uses only read new or
+changed files.
+
+A field parser maps a line to {slot: list of values} and is stored under
+its name, several parsers can share one sidecar.
+"""
+from __future__ import print_function
+
+import json
+import os
+import sys
+import time
+
+from paddlerec.core.utils.compressed_io import detect_compression
+from paddlerec.core.utils.compressed_io import open_lines
+
+PY3 = sys.version_info[0] >= 3
+
+VERSION = 1
+INDEX_EVERY = 10000
+SUFFIX = ".meta.json"
+
+
+def meta_path(data_path):
+    """
+    sidecar path of a data directory
+    """
+    return os.path.normpath(data_path) + SUFFIX
+
+
+def slot_fields(line):
+    """
+    values of the "slot:value" tokens of a slot format line, by slot
+    """
+    fields = {}
+    for token in line.split():
+        slot, _, value = token.partition(":")
+        fields.setdefault(slot, []).append(value)
+    return fields
+
+
+def _new_slot():
+    return {"lengths": {}, "min": None, "max": None, "numeric": True}
+
+
+def _update_slot(stat, values):
+    key = str(len(values))
+    stat["lengths"][key] = stat["lengths"].get(key, 0) + 1
+    if not stat["numeric"] or not values:
+        return
+    try:
+        numbers = [float(v) for v in values]
+    except ValueError:
+        stat["numeric"] = False
+        stat["min"] = stat["max"] = None
+        return
+    low, high = min(numbers), max(numbers)
+    if stat["min"] is None or low < stat["min"]:
+        stat["min"] = low
+    if stat["max"] is None or high > stat["max"]:
+        stat["max"] = high
+
+
+def _merge_slot(total, stat):
+    for key, count in stat["lengths"].items():
+        total["lengths"][key] = total["lengths"].get(key, 0) + count
+    if not stat["numeric"]:
+        total["numeric"] = False
+    if not total["numeric"]:
+        total["min"] = total["max"] = None
+        return
+    for key, pick in (("min", min), ("max", max)):
+        if stat[key] is not None:
+            total[key] = stat[key] if total[key] is None else \
+                pick(total[key], stat[key])
+
+
+def _indexed_lines(path, offsets, index_every):
+    pos = 0
+    with open(path, "rb") as f:
+        for i, line in enumerate(f):
+            if i % index_every == 0:
+                offsets.append(pos)
+            pos += len(line)
+            yield line.decode("utf-8") if PY3 else line
+
+
+def index_file(path, parse=None, index_every=INDEX_EVERY):
+    """
+    metadata entry of one file
+    Args:
+        parse: line -> {slot: list of values}, no slot statistics if None
+    Return:
+        dict of size, mtime, lines, offsets (None for compressed files)
+        and slots
+    """
+    st = os.stat(path)
+    offsets = None
+    if detect_compression(path) is None:
+        offsets = []
+        source = _indexed_lines(path, offsets, index_every)
+    else:
+        source = open_lines(path)
+    slots = {}
+    lines = 0
+    for line in source:
+        lines += 1
+        if parse is None:
+            continue
+        for slot, values in parse(line).items():
+            if slot not in slots:
+                slots[slot] = _new_slot()
+            _update_slot(slots[slot], values)
+    return {
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "lines": lines,
+        "offsets": offsets,
+        "slots": slots
+    }
+
+
+class DatasetMeta(object):
+    """
+    metadata of the files of a dataset
+    """
+
+    def __init__(self, entries, index_every=INDEX_EVERY, parser="lines"):
+        """
+        Args:
+            entries(dict): file path -> entry of index_file
+        """
+        self.entries = entries
+        self.index_every = index_every
+        self.parser = parser
+
+    @property
+    def total_lines(self):
+        return sum(e["lines"] for e in self.entries.values())
+
+    def lines(self, path):
+        return self.entries[path]["lines"]
+
+    def line_offset(self, path, line):
+        """
+        byte offset of the indexed line at or before line, the file size
+        past the last line, None for compressed files
+        """
+        entry = self.entries[path]
+        if entry["offsets"] is None:
+            return None
+        if line >= entry["lines"]:
+            return entry["size"]
+        return entry["offsets"][line // self.index_every]
+
+    def slot_stat(self, slot):
+        total = _new_slot()
+        found = False
+        for entry in self.entries.values():
+            stat = entry["slots"].get(slot)
+            if stat is not None:
+                _merge_slot(total, stat)
+                found = True
+        if not found:
+            raise KeyError("slot {} not in the dataset meta of parser {}".
+                           format(slot, self.parser))
+        return total
+
+    def max_len(self, slot):
+        return max(int(k) for k in self.slot_stat(slot)["lengths"])
+
+    def length_percentile(self, slot, q):
+        """
+        smallest length at least q percent of the lines do not exceed
+        """
+        lengths = sorted((int(k), c)
+                         for k, c in self.slot_stat(slot)["lengths"].items())
+        total = sum(c for _, c in lengths)
+        seen = 0
+        for length, count in lengths:
+            seen += count
+            if seen * 100.0 >= q * total:
+                return length
+        return lengths[-1][0]
+
+    def value_range(self, slot):
+        """
+        (min, max) of the values of a slot, None for non-numeric ones
+        """
+        stat = self.slot_stat(slot)
+        if not stat["numeric"] or stat["min"] is None:
+            return None
+        return stat["min"], stat["max"]
+
+
+def _read_sidecar(path):
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except ValueError:
+        print("dataset meta {} unreadable, rebuilding it".format(path))
+        return None
+    if data.get("version") != VERSION:
+        return None
+    return data
+
+
+def _write_sidecar(path, data):
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.rename(tmp, path)
+    except (IOError, OSError) as e:
+        print("dataset meta {} not written: {}".format(path, e))
+
+
+def _fresh(entry, path, parser, index_every):
+    if entry is None or entry.get("index_every") != index_every:
+        return False
+    st = os.stat(path)
+    if entry["size"] != st.st_size or entry["mtime"] != st.st_mtime:
+        return False
+    return parser in entry["slots"]
+
+
+def load_meta(data_path,
+              files=None,
+              parse=None,
+              parser="lines",
+              index_every=INDEX_EVERY,
+              sidecar=None):
+    """
+    metadata of the files of data_path, read from the sidecar and updated
+    for new or changed files
+    Args:
+        files(list): the files to describe, all files of data_path by
+            default
+        parse: line -> {slot: list of values}, stored under parser
+        parser(string): name of the parse function
+        sidecar(string): sidecar path, <data_path>.meta.json by default
+    Return:
+        DatasetMeta keyed by the given file paths
+    """
+    if files is None:
+        files = [
+            os.path.join(data_path, f) for f in sorted(os.listdir(data_path))
+        ]
+    sidecar = sidecar or meta_path(data_path)
+    data = _read_sidecar(sidecar) or {"version": VERSION, "files": {}}
+    stored = data["files"]
+    entries = {}
+    changed = 0
+    begin = time.time()
+    for path in files:
+        name = os.path.basename(path)
+        entry = stored.get(name)
+        if not _fresh(entry, path, parser, index_every):
+            fresh = index_file(path, parse, index_every)
+            slots = {}
+            if entry is not None and \
+                    entry.get("index_every") == index_every and \
+                    entry["size"] == fresh["size"] and \
+                    entry["mtime"] == fresh["mtime"]:
+                # same file, keep the statistics of the other parsers
+                slots.update(entry["slots"])
+            slots[parser] = fresh["slots"]
+            fresh["slots"] = slots
+            fresh["index_every"] = index_every
+            stored[name] = entry = fresh
+            changed += 1
+        entries[path] = dict(entry, slots=entry["slots"][parser])
+    if changed:
+        _write_sidecar(sidecar, data)
+        print("dataset meta {}: indexed {} of {} files in {:.1f}s".format(
+            sidecar, changed, len(files), time.time() - begin))
+    return DatasetMeta(entries, index_every, parser)
+
+
+def split_by_lines(meta, files, worker_num):
+    """
+    cut the concatenation of files into worker_num ranges of about equal
+    line counts, aligned to the indexed lines
+    Return:
+        list of worker_num lists of (path, start, end), a compressed file
+        is given whole to the worker owning its middle line
+    """
+    total = sum(meta.lines(f) for f in files)
+    bounds = [total * i // worker_num for i in range(worker_num + 1)]
+    plans = [[] for _ in range(worker_num)]
+    file_begin = 0
+    for path in files:
+        file_end = file_begin + meta.lines(path)
+        if meta.line_offset(path, 0) is None:
+            if file_end > file_begin:
+                middle = (file_begin + file_end) // 2
+                worker = max(
+                    w for w in range(worker_num) if bounds[w] <= middle)
+                plans[worker].append(path)
+            file_begin = file_end
+            continue
+        for worker in range(worker_num):
+            start = max(bounds[worker], file_begin) - file_begin
+            end = min(bounds[worker + 1], file_end) - file_begin
+            if start >= end:
+                continue
+            start = meta.line_offset(path, start)
+            end = meta.line_offset(path, end)
+            if start < end:
+                plans[worker].append((path, start, end))
+        file_begin = file_end
+    return plans
+
+
+def balance_by_lines(meta, files, worker_num):
+    """
+    assign whole files to workers, most lines first to the least loaded one
+    Return:
+        list of worker_num file lists
+    """
+    loads = [0] * worker_num
+    plans = [[] for _ in range(worker_num)]
+    for path in sorted(files, key=lambda f: -meta.lines(f)):
+        worker = loads.index(min(loads))
+        plans[worker].append(path)
+        loads[worker] += meta.lines(path)
+    return plans
@@ -14,13 +14,126 @@
 from __future__ import print_function
 
 import os
+import random
 from paddlerec.core.utils.envs import lazy_instance_by_fliename
 from paddlerec.core.utils.envs import get_global_env
 from paddlerec.core.utils.envs import get_runtime_environ
 from paddlerec.core.reader import SlotReader
+from paddlerec.core.utils.slot_parser import SlotBatchParser
+from paddlerec.core.utils.slot_cache import SlotDataCache
+from paddlerec.core.utils.multiprocess_reader import MultiProcessReader
+from paddlerec.core.utils.shuffle_buffer import buffered_shuffle
+from paddlerec.core.utils.shuffle_buffer import epoch_rng
+from paddlerec.core.utils.shuffle_buffer import shuffle_enabled
+from paddlerec.core.utils.shuffle_buffer import shuffle_files
+from paddlerec.core.utils.data_meta import balance_by_lines
+from paddlerec.core.utils.data_meta import load_meta
+from paddlerec.core.utils.data_meta import split_by_lines
+from paddlerec.core.utils.file_shard import balance_by_bytes
+from paddlerec.core.utils.file_shard import iter_shards
+from paddlerec.core.utils.file_shard import print_plans
+from paddlerec.core.utils.file_shard import split_by_bytes
+from paddlerec.core.utils.length_bucket import LengthBucketBatcher
 from paddlerec.core.trainer import EngineMode
 
 
+def _reader_workers(dataset_name):
+    name = "dataset." + dataset_name + "."
+    return int(get_global_env(name + "reader_workers", 1))
+
+
+def _shuffle_buffer_size(dataset_name):
+    name = "dataset." + dataset_name + "."
+    return int(get_global_env(name + "shuffle_buffer_size", 0))
+
+
+def _need_wrap(dataset_name):
+    name = "dataset." + dataset_name + "."
+    return _reader_workers(dataset_name) > 1 or \
+        get_global_env(name + "shuffle_files", False) or \
+        shuffle_enabled(_shuffle_buffer_size(dataset_name))
+
+
+def _multiprocess_reader(shard_reader,
+                         files,
+                         dataset_name,
+                         shuffle_in_shard=False):
+    """
+    wrap shard_reader(files, rng) into a per-epoch reader callable. It fans
+    the files out to `reader_workers` processes, shuffles the file order
+    when `shuffle_files` is set and passes the merged stream through a
+    shuffle buffer of `shuffle_buffer_size` items, all repeatable with
+    `seed`. With shuffle_in_shard, shard_reader applies the shuffle buffer
+    itself and the merged stream is left as is.
+    """
+    name = "dataset." + dataset_name + "."
+    workers = _reader_workers(dataset_name)
+    seed = get_global_env(name + "seed", None)
+    queue_size = int(get_global_env(name + "reader_queue_size", 64))
+    file_shuffle = get_global_env(name + "shuffle_files", False)
+    buffer_size = _shuffle_buffer_size(dataset_name)
+    if workers > 1:
+        print("dataset {} reads {} files with {} processes".format(
+            dataset_name, len(files), workers))
+    epoch = [0]
+
+    def reader():
+        rng = epoch_rng(seed, epoch[0])
+        epoch_seed = None if seed is None else rng.randint(0, 2**31 - 1)
+        epoch[0] += 1
+        epoch_files = shuffle_files(files, rng) if file_shuffle else files
+        if workers > 1:
+            # workers draw from the random module, seeded per worker
+            items = MultiProcessReader(
+                shard_reader,
+                epoch_files,
+                workers,
+                queue_size=queue_size,
+                seed=epoch_seed)()
+        else:
+            items = shard_reader(epoch_files, rng)
+        if shuffle_in_shard:
+            return items
+        return buffered_shuffle(items, buffer_size, rng)
+
+    return reader
+
+
+def _int_list(value):
+    if isinstance(value, (list, tuple)):
+        return [int(v) for v in value]
+    return [int(v) for v in str(value).split()]
+
+
+def length_bucket_enabled(dataset_name):
+    name = "dataset." + dataset_name + "."
+    return bool(get_global_env(name + "length_bucket", False))
+
+
+def _length_bucket(reader, dataset_name):
+    """
+    turn a sample reader into a reader of length-bucketed, padded batches
+    when `length_bucket` is set for the dataset
+    """
+    if not length_bucket_enabled(dataset_name):
+        return reader
+    name = "dataset." + dataset_name + "."
+    boundaries = get_global_env(name + "bucket_boundaries", None)
+    batcher = LengthBucketBatcher(
+        int(get_global_env(name + "batch_size")),
+        boundaries=_int_list(boundaries) if boundaries else None,
+        group_size=int(get_global_env(name + "bucket_group_size", 0)),
+        seq_fields=_int_list(get_global_env(name + "bucket_seq_fields", 0)),
+        pad_value=get_global_env(name + "bucket_pad_value", 0),
+        output=get_global_env(name + "bucket_output", "padded"),
+        with_mask=get_global_env(name + "bucket_with_mask", False))
+
+    def bucket_reader():
+        return batcher.generate(reader())
+
+    return bucket_reader
+
+
 def dataloader_by_name(readerclass,
                        dataset_name,
                        yaml_file,
@@ -29,48 +142,81 @@ def dataloader_by_name(readerclass,
 
     reader_class = lazy_instance_by_fliename(readerclass, reader_class_name)
 
-    name = "dataset." + dataset_name + "."
-    data_path = get_global_env(name + "data_path")
-
-    if data_path.startswith("paddlerec::"):
-        package_base = get_runtime_environ("PACKAGE_BASE")
-        assert package_base is not None
-        data_path = os.path.join(package_base, data_path.split("::")[1])
-
-    files = [str(data_path) + "/%s" % x for x in os.listdir(data_path)]
-    if context["engine"] == EngineMode.LOCAL_CLUSTER:
-        files = context["fleet"].split_files(files)
-        print("file_list : {}".format(files))
-
     reader = reader_class(yaml_file)
     reader.init()
+    files = _dataset_files(
+        dataset_name,
+        context,
+        byte_ranges=not hasattr(reader, 'generate_batch_from_trainfiles'))
+    decompress = _decompress_mode(dataset_name)
 
-    def gen_reader():
-        for file in files:
-            with open(file, 'r') as f:
-                for line in f:
-                    line = line.rstrip('\n')
-                    iter = reader.generate_sample(line)
-                    for parsed_line in iter():
-                        if parsed_line is None:
-                            continue
-                        else:
-                            values = []
-                            for pased in parsed_line:
-                                values.append(pased[1])
-                            yield values
+    def gen_samples(files, rng=random):
+        for line in iter_shards(files, decompress):
+            line = line.rstrip('\n')
+            iter = reader.generate_sample(line)
+            for parsed_line in iter():
+                if parsed_line is None:
+                    continue
+                else:
+                    values = []
+                    for pased in parsed_line:
+                        values.append(pased[1])
+                    yield values
 
-    def gen_batch_reader():
-        return reader.generate_batch_from_trainfiles(files)
+    def gen_batches(files, rng=random):
+        return reader.generate_batch_from_trainfiles(files)()
 
     if hasattr(reader, 'generate_batch_from_trainfiles'):
-        return gen_batch_reader()
-    return gen_reader
+        if _need_wrap(dataset_name):
+            return _multiprocess_reader(gen_batches, files, dataset_name)
+        return reader.generate_batch_from_trainfiles(files)
+    return _length_bucket(
+        _multiprocess_reader(gen_samples, files, dataset_name), dataset_name)
 
 
 def slotdataloader_by_name(readerclass, dataset_name, yaml_file, context):
+    sparse, dense, padding = _slot_config(dataset_name)
+    reader = SlotReader(yaml_file)
+    reader.init(sparse, dense, padding, _hash_slots(dataset_name))
+    files = _dataset_files(
+        dataset_name,
+        context,
+        byte_ranges=not hasattr(reader, 'generate_batch_from_trainfiles'))
+    decompress = _decompress_mode(dataset_name)
+
+    def gen_samples(files, rng=random):
+        for line in iter_shards(files, decompress):
+            line = line.rstrip('\n')
+            iter = reader.generate_sample(line)
+            for parsed_line in iter():
+                if parsed_line is None:
+                    continue
+                else:
+                    values = []
+                    for pased in parsed_line:
+                        values.append(pased[1])
+                    yield values
+
+    def gen_batches(files, rng=random):
+        return reader.generate_batch_from_trainfiles(files)()
+
+    if hasattr(reader, 'generate_batch_from_trainfiles'):
+        if _need_wrap(dataset_name):
+            return _multiprocess_reader(gen_batches, files, dataset_name)
+        return reader.generate_batch_from_trainfiles(files)
+    return _length_bucket(
+        _multiprocess_reader(gen_samples, files, dataset_name), dataset_name)
+
+
+def _dataset_files(dataset_name, context, byte_ranges=True):
+    """
+    input files of this worker. With `shard_mode: byte` the local cluster
+    workers get equal byte volumes instead of whole files, as
+    (path, start, end) ranges or, when the reader needs complete files,
+    as whole files balanced by size. `shard_mode: line` does the same with
+    the line counts and offsets of the dataset meta sidecar.
+    """
     name = "dataset." + dataset_name + "."
-    reader_name = "SlotReader"
     data_path = get_global_env(name + "data_path")
 
     if data_path.startswith("paddlerec::"):
@@ -80,9 +226,56 @@ def slotdataloader_by_name(readerclass, dataset_name, yaml_file, context):
 
     files = [str(data_path) + "/%s" % x for x in os.listdir(data_path)]
     if context["engine"] == EngineMode.LOCAL_CLUSTER:
-        files = context["fleet"].split_files(files)
+        shard_mode = get_global_env(name + "shard_mode", "file")
+        if shard_mode in ("byte", "line"):
+            worker_num = context["fleet"].worker_num()
+            worker_index = context["fleet"].worker_index()
+            files = sorted(files)
+            if shard_mode == "line":
+                meta = load_meta(data_path, files)
+                if byte_ranges:
+                    plans = split_by_lines(meta, files, worker_num)
+                else:
+                    plans = balance_by_lines(meta, files, worker_num)
+            elif byte_ranges:
+                plans = split_by_bytes(files, worker_num)
+            else:
+                plans = balance_by_bytes(files, worker_num)
+            print_plans(plans, worker_index)
+            files = plans[worker_index]
+        else:
+            files = context["fleet"].split_files(files)
         print("file_list: {}".format(files))
+    return files
+
 
+def planned_batches(dataset_name, context):
+    """
+    batches of one epoch of this worker when `progress` is set, counting
+    one sample per line of the dataset meta, None otherwise
+    """
+    name = "dataset." + dataset_name + "."
+    if not get_global_env(name + "progress", False):
+        return None
+    data_path = get_global_env(name + "data_path")
+    if data_path.startswith("paddlerec::"):
+        package_base = get_runtime_environ("PACKAGE_BASE")
+        assert package_base is not None
+        data_path = os.path.join(package_base, data_path.split("::")[1])
+    lines = load_meta(data_path).total_lines
+    if context["engine"] == EngineMode.LOCAL_CLUSTER:
+        lines = -(-lines // context["fleet"].worker_num())
+    batch_size = int(get_global_env(name + "batch_size"))
+    return -(-lines // batch_size)
+
+
+def _decompress_mode(dataset_name):
+    name = "dataset." + dataset_name + "."
+    return get_global_env(name + "decompress", "inline")
+
+
+def _slot_config(dataset_name):
+    name = "dataset." + dataset_name + "."
     sparse = get_global_env(name + "sparse_slots", "#")
     if sparse == "":
         sparse = "#"
@@ -90,30 +283,66 @@ def slotdataloader_by_name(readerclass, dataset_name, yaml_file, context):
     if dense == "":
         dense = "#"
     padding = get_global_env(name + "padding", 0)
-    reader = SlotReader(yaml_file)
-    reader.init(sparse, dense, int(padding))
+    return sparse, dense, int(padding)
 
-    def gen_reader():
-        for file in files:
-            with open(file, 'r') as f:
-                for line in f:
-                    line = line.rstrip('\n')
-                    iter = reader.generate_sample(line)
-                    for parsed_line in iter():
-                        if parsed_line is None:
-                            continue
-                        else:
-                            values = []
-                            for pased in parsed_line:
-                                values.append(pased[1])
-                            yield values
 
-    def gen_batch_reader():
-        return reader.generate_batch_from_trainfiles(files)
+def _hash_slots(dataset_name):
+    name = "dataset." + dataset_name + "."
+    return get_global_env(name + "hash_slots", "").strip()
 
-    if hasattr(reader, 'generate_batch_from_trainfiles'):
-        return gen_batch_reader()
-    return gen_reader
+
+def slotdataloader_batch_by_name(dataset_name, context):
+    """
+    columnar version of slotdataloader_by_name, yields whole batches of
+    NumPy arrays parsed by SlotBatchParser
+    """
+    name = "dataset." + dataset_name + "."
+    files = _dataset_files(dataset_name, context)
+    sparse, dense, padding = _slot_config(dataset_name)
+    batch_size = int(get_global_env(name + "batch_size"))
+    block_size = int(get_global_env(name + "parse_block_size", 1024))
+    buffer_size = _shuffle_buffer_size(dataset_name)
+    decompress = _decompress_mode(dataset_name)
+    parser = SlotBatchParser(sparse, dense, padding, _hash_slots(dataset_name))
+
+    def gen_batches(files, rng=random):
+        # shuffle lines before parsing rather than whole batches
+        return parser.generate_batches(
+            files,
+            batch_size,
+            block_size,
+            shuffle_buffer_size=buffer_size,
+            rng=rng,
+            decompress=decompress)()
+
+    return _multiprocess_reader(
+        gen_batches, files, dataset_name, shuffle_in_shard=True)
+
+
+def slotdataloader_cache_by_name(dataset_name, context):
+    """
+    batches sliced from the memory-mapped binary cache of the dataset,
+    the cache is compiled from the text files on first use and rebuilt
+    when the files or the slot config change
+    """
+    name = "dataset." + dataset_name + "."
+    files = _dataset_files(dataset_name, context)
+    sparse, dense, padding = _slot_config(dataset_name)
+    batch_size = int(get_global_env(name + "batch_size"))
+    cache_path = get_global_env(name + "slot_cache_path", "slot_cache")
+    cache = SlotDataCache(
+        cache_path,
+        files,
+        sparse,
+        dense,
+        padding,
+        hash_slots=_hash_slots(dataset_name))
+    cache.build()
+    rng = None
+    if shuffle_enabled(_shuffle_buffer_size(dataset_name)):
+        # random access is cheap here, so shuffle globally per epoch
+        rng = epoch_rng(get_global_env(name + "seed", None), 0)
+    return cache.generate_batches(batch_size, rng=rng)
 
 
 def slotdataloader(readerclass, train, yaml_file, context):
@@ -14,10 +14,14 @@
 
 import abc
 import datetime
+import os
+import threading
 import time
 
 import paddle.fluid as fluid
 
+from paddlerec.core.utils import compressed_io
+from paddlerec.core.utils import feature_hash
 from paddlerec.core.utils import fs as fs
 from paddlerec.core.utils import util as util
 
@@ -103,6 +107,22 @@ class TimeSplitDatasetHolder(DatasetHolder):
             time_window_mins = time_window_mins - skip_mins
         return data_time, time_window_mins
 
+    def _window_paths(self, template_name, daytime_str, time_window_mins):
+        """
+        path of every split interval in the time window
+        """
+        paths = []
+        data_time, windows_mins = self._format_data_time(daytime_str,
+                                                         time_window_mins)
+        while time_window_mins > 0:
+            paths.append(
+                self._path_generator.generate_path(template_name,
+                                                   {'time_format': data_time}))
+            time_window_mins = time_window_mins - self._split_interval
+            data_time = data_time + datetime.timedelta(
+                minutes=self._split_interval)
+        return paths
+
     def check_ready(self, daytime_str, time_window_mins):
         """
         data in [daytime_str, daytime_str + time_window_mins] is ready or not
@@ -112,19 +132,9 @@ class TimeSplitDatasetHolder(DatasetHolder):
         Return:
             True/False
         """
-        is_ready = True
-        data_time, windows_mins = self._format_data_time(daytime_str,
-                                                         time_window_mins)
-        while time_window_mins > 0:
-            file_path = self._path_generator.generate_path(
-                'donefile_path', {'time_format': data_time})
-            if not self._data_file_handler.is_exist(file_path):
-                is_ready = False
-                break
-            time_window_mins = time_window_mins - self._split_interval
-            data_time = data_time + datetime.timedelta(
-                minutes=self._split_interval)
-        return is_ready
+        donefiles = self._window_paths('donefile_path', daytime_str,
+                                       time_window_mins)
+        return all(self._data_file_handler.exists_many(donefiles))
 
     def get_file_list(self,
                       daytime_str,
@@ -142,39 +152,57 @@ class TimeSplitDatasetHolder(DatasetHolder):
             list, data_shard[node_idx]
         """
         data_file_list = []
-        data_time, windows_mins = self._format_data_time(daytime_str,
-                                                         time_window_mins)
-        while time_window_mins > 0:
-            file_path = self._path_generator.generate_path(
-                'data_path', {'time_format': data_time})
-            sub_file_list = self._data_file_handler.ls(file_path)
+        prefix = self._config['filename_prefix']
+        data_paths = self._window_paths('data_path', daytime_str,
+                                        time_window_mins)
+        donefiles = self._window_paths('donefile_path', daytime_str,
+                                       time_window_mins)
+        for sub_file_list, donefile in zip(
+                self._data_file_handler.ls_many(data_paths), donefiles):
             for sub_file in sub_file_list:
                 sub_file_name = self._data_file_handler.get_file_name(sub_file)
-                if not sub_file_name.startswith(self._config[
-                        'filename_prefix']):
+                if not sub_file_name.startswith(prefix):
                     continue
-                postfix = sub_file_name.split(self._config['filename_prefix'])[
-                    1]
+                # the donefile may sit among the data files
+                if sub_file_name == self._data_file_handler.get_file_name(
+                        donefile):
+                    continue
+                postfix = sub_file_name[len(prefix):]
                 if postfix.isdigit():
                     if int(postfix) % node_num == node_idx:
                         data_file_list.append(sub_file)
                 else:
-                    if hash(sub_file_name) % node_num == node_idx:
+                    # every node must compute the same owner of a file
+                    if feature_hash.hash_ids(
+                        [sub_file_name], bucket=node_num)[0] == node_idx:
                         data_file_list.append(sub_file)
-            time_window_mins = time_window_mins - self._split_interval
-            data_time = data_time + datetime.timedelta(
-                minutes=self._split_interval)
         return data_file_list
 
+    def _pipe_command(self, file_list):
+        """
+        data_converter, behind a decompression filter when the files need
+        one. The data feed inflates .gz files itself, bz2/xz files and
+        compressed files without an extension (config 'decompress') are
+        left to the filter.
+        """
+        pipe_command = self._config['data_converter']
+        need_filter = self._config.get('decompress', False) or any(
+            compressed_io.compression_of_name(f) in ("bz2", "xz")
+            for f in file_list)
+        if need_filter:
+            pipe_command = compressed_io.filter_command(pipe_command)
+        return pipe_command
+
     def _alloc_dataset(self, file_list):
         """ """
         dataset = fluid.DatasetFactory().create_dataset(self._config[
             'dataset_type'])
         dataset.set_batch_size(self._config['batch_size'])
         dataset.set_thread(self._config['load_thread'])
-        dataset.set_hdfs_config(self._config['fs_name'],
-                                self._config['fs_ugi'])
-        dataset.set_pipe_command(self._config['data_converter'])
+        if self._config.get('fs_name'):
+            dataset.set_hdfs_config(self._config['fs_name'],
+                                    self._config['fs_ugi'])
+        dataset.set_pipe_command(self._pipe_command(file_list))
         dataset.set_filelist(file_list)
         dataset.set_use_var(self._config['data_vars'])
         # dataset.set_fleet_send_sleep_seconds(2)
@@ -182,16 +210,20 @@ class TimeSplitDatasetHolder(DatasetHolder):
         return dataset
 
     def load_dataset(self, params):
-        """ """
+        """
+        params may carry the file_list of a window already checked ready
+        """
         begin_time = params['begin_time']
         windown_min = params['time_window_min']
         if begin_time not in self._datasets:
-            while self.check_ready(begin_time, windown_min) == False:
-                print("dataset not ready, time:" + begin_time)
-                time.sleep(30)
-            file_list = self.get_file_list(begin_time, windown_min,
-                                           params['node_num'],
-                                           params['node_idx'])
+            file_list = params.get('file_list')
+            if file_list is None:
+                while self.check_ready(begin_time, windown_min) == False:
+                    print("dataset not ready, time:" + begin_time)
+                    time.sleep(30)
+                file_list = self.get_file_list(begin_time, windown_min,
+                                               params['node_num'],
+                                               params['node_idx'])
             self._datasets[begin_time] = self._alloc_dataset(file_list)
             self._datasets[begin_time].load_into_memory()
         else:
@@ -199,14 +231,18 @@ class TimeSplitDatasetHolder(DatasetHolder):
         return self._datasets[begin_time]
 
     def preload_dataset(self, params):
-        """ """
+        """
+        params may carry the file_list of a window already checked ready
+        """
         begin_time = params['begin_time']
         windown_min = params['time_window_min']
         if begin_time not in self._datasets:
-            if self.check_ready(begin_time, windown_min):
+            file_list = params.get('file_list')
+            if file_list is None and self.check_ready(begin_time, windown_min):
                 file_list = self.get_file_list(begin_time, windown_min,
                                                params['node_num'],
                                                params['node_idx'])
+            if file_list is not None:
                 self._datasets[begin_time] = self._alloc_dataset(file_list)
                 self._datasets[begin_time].preload_into_memory(self._config[
                     'preload_thread'])
@@ -218,4 +254,221 @@ class TimeSplitDatasetHolder(DatasetHolder):
         begin_time = params['begin_time']
         windown_min = params['time_window_min']
         if begin_time in self._datasets:
-            self._datasets[begin_time].release_memory()
+            self._datasets.pop(begin_time).release_memory()
+
+
+def time_windows(begin_time, time_window_min, count=None):
+    """
+    begin_time of count consecutive windows of time_window_min minutes,
+    endless when count is None
+    """
+    data_time = util.make_datetime(begin_time)
+    index = 0
+    while count is None or index < count:
+        window_time = data_time + datetime.timedelta(
+            minutes=index * time_window_min)
+        yield window_time.strftime("%Y%m%d%H%M")
+        index += 1
+
+
+class DatasetPipeline(object):
+    """
+    Train on the windows of a TimeSplitDatasetHolder in order while a
+    background thread polls the readiness of the next prefetch windows
+    and preloads them. A window is released as soon as its training ends,
+    and the resident windows are capped by max_resident and memory_budget.
+
+        pipeline = DatasetPipeline(holder, time_windows(day, 60), params)
+        for begin_time, dataset in pipeline:
+            train(dataset)
+
+    stats counts the windows, the preloaded ones and the seconds training
+    waited for data.
+    """
+
+    def __init__(self,
+                 holder,
+                 windows,
+                 params,
+                 prefetch=2,
+                 max_resident=None,
+                 memory_budget=None,
+                 window_bytes=None,
+                 poll_interval=30):
+        """
+        Args:
+            windows: iterable of begin_time strings, see time_windows
+            params(dict): time_window_min, node_num and node_idx
+            prefetch(int): windows after the training one to preload
+            max_resident(int): windows in memory at once, prefetch + 1 by
+                default
+            memory_budget(int): bytes of the resident windows, no limit if
+                None
+            window_bytes(int): bytes of a window, the size of its local
+                files by default
+            poll_interval(float): seconds between readiness checks
+        """
+        self._holder = holder
+        self._windows = iter(windows)
+        self._params = params
+        self._prefetch = prefetch
+        self._max_resident = max_resident or prefetch + 1
+        self._memory_budget = memory_budget
+        self._window_bytes = window_bytes
+        self._poll_interval = poll_interval
+        # the training window first, then the ones to preload
+        self._schedule = []
+        # begin_time -> bytes of the windows loaded or preloading
+        self._resident = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            "windows": 0,
+            "preloaded": 0,
+            "stall_seconds": 0.0,
+            "max_stall_seconds": 0.0,
+            "last_stall_seconds": 0.0
+        }
+
+    def _params_of(self, begin_time, file_list=None):
+        params = dict(self._params, begin_time=begin_time)
+        params['file_list'] = file_list
+        return params
+
+    def _ready_files(self, begin_time):
+        """
+        file list of a ready window, None when it is not ready
+        """
+        window = self._params['time_window_min']
+        if not self._holder.check_ready(begin_time, window):
+            return None
+        return self._holder.get_file_list(begin_time, window,
+                                          self._params['node_num'],
+                                          self._params['node_idx'])
+
+    def _footprint(self, file_list):
+        if self._window_bytes is not None:
+            return self._window_bytes
+        return sum(
+            os.path.getsize(f) for f in file_list
+            if not fs.is_afs_path(f) and os.path.isfile(f))
+
+    def _fits(self, size):
+        if len(self._resident) >= self._max_resident:
+            return False
+        return self._memory_budget is None or \
+            sum(self._resident.values()) + size <= self._memory_budget
+
+    def _preload_next(self):
+        with self._lock:
+            upcoming = self._schedule[1:1 + self._prefetch]
+        for begin_time in upcoming:
+            if begin_time in self._resident:
+                continue
+            # later windows wait for this one
+            file_list = self._ready_files(begin_time)
+            if file_list is None:
+                return
+            size = self._footprint(file_list)
+            with self._lock:
+                if begin_time not in self._schedule[1:]:
+                    return
+                if begin_time in self._resident:
+                    continue
+                if not self._fits(size):
+                    return
+                self._holder.preload_dataset(
+                    self._params_of(begin_time, file_list))
+                self._resident[begin_time] = size
+            print("dataset pipeline: preloading {}".format(begin_time))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self._preload_next()
+            except Exception as e:
+                print("dataset pipeline: preload failed: {}".format(e))
+            self._wake.wait(self._poll_interval)
+
+    def _advance(self):
+        """
+        begin_time of the next training window, None after the last one
+        """
+        with self._lock:
+            if self._schedule:
+                self._schedule.pop(0)
+            while len(self._schedule) < self._prefetch + 1:
+                begin_time = next(self._windows, None)
+                if begin_time is None:
+                    break
+                self._schedule.append(begin_time)
+            begin_time = self._schedule[0] if self._schedule else None
+        self._wake.set()
+        return begin_time
+
+    def _load(self, begin_time):
+        begin = time.time()
+        with self._lock:
+            preloaded = begin_time in self._resident
+            if not preloaded:
+                # the background thread leaves this window to us
+                self._resident[begin_time] = 0
+        file_list = None
+        if not preloaded:
+            file_list = self._ready_files(begin_time)
+            while file_list is None:
+                print("dataset not ready, time:" + begin_time)
+                time.sleep(self._poll_interval)
+                file_list = self._ready_files(begin_time)
+            with self._lock:
+                self._resident[begin_time] = self._footprint(file_list)
+        dataset = self._holder.load_dataset(
+            self._params_of(begin_time, file_list))
+        stall = time.time() - begin
+        self.stats["windows"] += 1
+        self.stats["preloaded"] += int(preloaded)
+        self.stats["stall_seconds"] += stall
+        self.stats["last_stall_seconds"] = stall
+        self.stats["max_stall_seconds"] = max(self.stats["max_stall_seconds"],
+                                              stall)
+        print("dataset pipeline: {} {}, waited {:.1f}s for data".format(
+            "preloaded" if preloaded else "loaded", begin_time, stall))
+        return dataset
+
+    def _release(self, begin_time):
+        with self._lock:
+            self._resident.pop(begin_time, None)
+            self._holder.release_dataset(self._params_of(begin_time))
+        self._wake.set()
+
+    def __iter__(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        try:
+            begin_time = self._advance()
+            while begin_time is not None:
+                dataset = self._load(begin_time)
+                yield begin_time, dataset
+                self._release(begin_time)
+                begin_time = self._advance()
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        stop preloading and release the resident windows
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            resident = list(self._resident)
+        for begin_time in resident:
+            self._release(begin_time)
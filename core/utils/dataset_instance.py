@@ -17,6 +17,7 @@ import sys
 
 from paddlerec.core.utils.envs import lazy_instance_by_fliename
 from paddlerec.core.reader import SlotReader
+from paddlerec.core.utils.file_shard import stdin_lines
 
 if len(sys.argv) < 4:
     raise ValueError(
@@ -31,11 +32,15 @@ if sys.argv[1].upper() == "SLOT":
     sparse_slots = sys.argv[5].replace("?", " ")
     dense_slots = sys.argv[6].replace("?", " ")
     padding = int(sys.argv[7])
+    hash_slots = sys.argv[8].replace("?", " ") if len(sys.argv) > 8 else ""
 else:
     reader_name = sys.argv[2]
 
 yaml_abs_path = sys.argv[3]
 
+# keep to this worker's byte range when the dataset is sharded by bytes
+sys.stdin = stdin_lines()
+
 if reader_name != "SlotReader":
     reader_class = lazy_instance_by_fliename(reader_package, reader_name)
     reader = reader_class(yaml_abs_path)
@@ -43,5 +48,5 @@ if reader_name != "SlotReader":
     reader.run_from_stdin()
 else:
     reader = SlotReader(yaml_abs_path)
-    reader.init(sparse_slots, dense_slots, padding)
+    reader.init(sparse_slots, dense_slots, padding, hash_slots)
     reader.run_from_stdin()
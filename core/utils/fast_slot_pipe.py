@@ -0,0 +1,143 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Standalone `slot:feasign` to MultiSlot converter for QueueDataset pipes.
+
+It writes the same text protocol as SlotReader.run_from_stdin but neither
+imports paddle nor loads the yaml, the slot schema comes from the command
+line, and feasigns are copied as the original strings instead of going
+through int/float and back.
+
+python fast_slot_pipe.py <sparse_slots> <dense_slots> <padding> [hash_slots]
+
+slots are separated by "?" like in dataset_instance.py, "?" alone means
+no slot of that kind. Values of the hash_slots are hashed to ids by
+feature_hash, the only case where feasigns are not copied verbatim.
+"""
+from __future__ import print_function
+
+import sys
+
+from paddlerec.core.utils.file_shard import stdin_lines
+
+FLUSH_LINES = 1024
+
+
+def parse_schema(sparse_slots, dense_slots):
+    """
+    Return:
+        sparse slot names, dense slot names, flattened dense dims
+    """
+    sparse = [s for s in sparse_slots.split("?") if s not in ("", "#")]
+    dense = []
+    dims = []
+    for slot in dense_slots.split("?"):
+        if slot in ("", "#"):
+            continue
+        name, shape = slot.split(":")
+        dim = 1
+        for d in shape.strip("[]").split(","):
+            dim *= int(d)
+        dense.append(name)
+        dims.append(dim)
+    return sparse, dense, dims
+
+
+def convert(lines, out, sparse, dense, dims, padding="0", hasher=None):
+    """
+    write one MultiSlot line per input line, dense slots first, a missing
+    slot is filled with padding like SlotReader does
+    """
+    if hasher is not None and len(hasher):
+        lines = _hash_lines(lines, hasher, set(sparse))
+    slots = dense + sparse
+    index = dict((slot, i) for i, slot in enumerate(slots))
+    pads = ["{} {}".format(dim, " ".join([padding] * dim)) for dim in dims]
+    pads.extend("1 " + padding for _ in sparse)
+    num_slots = len(slots)
+    lookup = index.get
+    buf = []
+    for line in lines:
+        values = [None] * num_slots
+        for token in line.split():
+            slot, _, value = token.partition(":")
+            i = lookup(slot)
+            if i is None:
+                continue
+            if values[i] is None:
+                values[i] = [value]
+            else:
+                values[i].append(value)
+        fields = pads[:]
+        for i in range(num_slots):
+            if values[i] is not None:
+                fields[i] = "%d %s" % (len(values[i]), " ".join(values[i]))
+        buf.append(" ".join(fields))
+        if len(buf) == FLUSH_LINES:
+            buf.append("")
+            out.write("\n".join(buf))
+            buf = []
+    if buf:
+        buf.append("")
+        out.write("\n".join(buf))
+    out.flush()
+
+
+def _hash_lines(lines, hasher, sparse):
+    """
+    rewrite the hashed feasigns of every line as ids, one hash call per
+    block of lines
+    """
+    hashed = set(hasher.slots) & sparse
+    block = []
+    for line in lines:
+        block.append(line.split())
+        if len(block) == FLUSH_LINES:
+            for tokens in _hash_block(block, hasher, hashed):
+                yield " ".join(tokens)
+            block = []
+    for tokens in _hash_block(block, hasher, hashed):
+        yield " ".join(tokens)
+
+
+def _hash_block(block, hasher, hashed):
+    positions = []
+    slots = []
+    values = []
+    for row, tokens in enumerate(block):
+        for col, token in enumerate(tokens):
+            slot, _, value = token.partition(":")
+            if slot in hashed:
+                positions.append((row, col))
+                slots.append(slot)
+                values.append(value)
+    if values:
+        ids = hasher.hash_mixed(slots, values).tolist()
+        for (row, col), slot, feasign in zip(positions, slots, ids):
+            block[row][col] = "%s:%d" % (slot, feasign)
+    return block
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        raise ValueError("fast slot pipe accepts 3 arguments: 1. sparse_slots "
+                         "2. dense_slots 3. padding")
+    sparse, dense, dims = parse_schema(sys.argv[1], sys.argv[2])
+    padding = sys.argv[3] if len(sys.argv) > 3 else "0"
+    hasher = None
+    if len(sys.argv) > 4:
+        # numpy is only needed when hashing
+        from paddlerec.core.utils.feature_hash import FeatureHasher
+        hasher = FeatureHasher(sys.argv[4])
+    convert(stdin_lines(), sys.stdout, sparse, dense, dims, padding, hasher)
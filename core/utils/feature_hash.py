@@ -0,0 +1,206 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Stable 64-bit feature hashing over NumPy.
+
+Python's hash() of str is randomized per process under python3, so ids it
+produces differ between pipe processes and between training and serving.
+This module implements MurmurHash64A on whole columns at once: the values
+are packed into a zero padded byte matrix and mixed 8 bytes at a time for
+all rows together. The result only depends on the bytes, the seed and
+nothing else, on every platform and python version.
+"""
+from __future__ import print_function
+
+import sys
+
+import numpy as np
+
+PY3 = sys.version_info[0] >= 3
+
+_M = np.uint64(0xc6a4a7935bd1e995)
+_R = np.uint64(47)
+_CHUNK_ROWS = 1 << 16
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    if not PY3 and isinstance(value, unicode):
+        return value.encode("utf-8")
+    return str(value).encode("utf-8")
+
+
+def _seeds(seed, n):
+    seeds = np.asarray(seed, dtype=np.uint64)
+    if seeds.ndim == 0:
+        return np.full(n, seeds, dtype=np.uint64)
+    return seeds
+
+
+def _mix(words, nblocks, tails, lengths, seeds):
+    """
+    MurmurHash64A over rows of little-endian 8 byte words
+    """
+    h = seeds ^ (lengths.astype(np.uint64) * _M)
+    for j in range(words.shape[1]):
+        k = words[:, j] * _M
+        k ^= k >> _R
+        k *= _M
+        h = np.where(nblocks > j, (h ^ k) * _M, h)
+    h = np.where(lengths & 7 != 0, (h ^ tails) * _M, h)
+    h ^= h >> _R
+    h *= _M
+    h ^= h >> _R
+    return h
+
+
+def _hash_chunk(encoded, seeds):
+    n = len(encoded)
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=n)
+    width = max(1, (int(lengths.max()) + 7) // 8) if n else 1
+    padded = np.zeros((n, width * 8), dtype=np.uint8)
+    padded[np.arange(width * 8) < lengths[:, None]] = np.frombuffer(
+        b"".join(encoded), dtype=np.uint8)
+    words = padded.view("<u8").astype(np.uint64)
+    nblocks = lengths // 8
+    tails = words[np.arange(n), np.minimum(nblocks, width - 1)]
+    return _mix(words, nblocks, tails, lengths, seeds)
+
+
+def hash64(values, seed=0):
+    """
+    MurmurHash64A of every value's utf-8 bytes
+    Args:
+        values: iterable of str/bytes, other values are hashed as str()
+        seed(int or array): one seed, or one per value for per-slot salts
+    Return:
+        uint64 ndarray
+    """
+    encoded = [_to_bytes(v) for v in values]
+    seeds = _seeds(seed, len(encoded))
+    if len(encoded) <= _CHUNK_ROWS:
+        return _hash_chunk(encoded, seeds)
+    # bound the padded matrix when a few values are very long
+    return np.concatenate([
+        _hash_chunk(encoded[i:i + _CHUNK_ROWS], seeds[i:i + _CHUNK_ROWS])
+        for i in range(0, len(encoded), _CHUNK_ROWS)
+    ])
+
+
+def hash_int64(values, seed=0):
+    """
+    MurmurHash64A of the 8 byte little-endian form of integer values,
+    without going through strings
+    """
+    words = np.asarray(
+        values, dtype=np.int64).astype(np.uint64).reshape([-1, 1])
+    n = len(words)
+    lengths = np.full(n, 8, dtype=np.int64)
+    return _mix(words,
+                np.ones(n, dtype=np.int64),
+                np.zeros(n, dtype=np.uint64), lengths, _seeds(seed, n))
+
+
+def to_ids(hashes, bucket=None):
+    """
+    non-negative int64 ids: hash % bucket, or the top 63 bits
+    """
+    if bucket:
+        return (hashes % np.uint64(bucket)).astype(np.int64)
+    return (hashes >> np.uint64(1)).astype(np.int64)
+
+
+def slot_seed(name):
+    """
+    salt of a slot, derived from its name
+    """
+    return int(hash64([name])[0])
+
+
+def hash_ids(values, seed=0, bucket=None):
+    """
+    hash a column of values to int64 ids in [0, bucket)
+    """
+    return to_ids(hash64(values, seed), bucket)
+
+
+def stable_hash(value, bucket=None, seed=0):
+    """
+    id of a single value, the same in every process unlike hash()
+    """
+    return int(hash_ids([value], seed, bucket)[0])
+
+
+def parse_hash_slots(hash_slots):
+    """
+    parse the `hash_slots` option, "slot[:bucket[:salt]]" separated by
+    spaces (or "?" on pipe command lines)
+    Return:
+        dict, slot -> (seed, bucket)
+    """
+    if not hash_slots:
+        return {}
+    if isinstance(hash_slots, (list, tuple)):
+        items = hash_slots
+    else:
+        items = hash_slots.replace("?", " ").split()
+    config = {}
+    for item in items:
+        parts = str(item).split(":")
+        bucket = int(parts[1]) if len(parts) > 1 and parts[1] else None
+        seed = int(parts[2]) if len(parts) > 2 else slot_seed(parts[0])
+        config[parts[0]] = (seed, bucket)
+    return config
+
+
+class FeatureHasher(object):
+    """
+    hash the raw values of configured slots, each slot with its own salt
+    and bucket size
+    """
+
+    def __init__(self, hash_slots):
+        self.slots = parse_hash_slots(hash_slots)
+
+    def __contains__(self, slot):
+        return slot in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def hash_slot(self, slot, values):
+        seed, bucket = self.slots[slot]
+        return hash_ids(values, seed, bucket)
+
+    def hash_mixed(self, slots, values):
+        """
+        hash values of different slots in one pass
+        Args:
+            slots(list): slot of every value, all in this hasher
+            values(list): raw values
+        """
+        seeds = np.fromiter(
+            (self.slots[s][0] for s in slots),
+            dtype=np.uint64,
+            count=len(slots))
+        buckets = np.fromiter(
+            (self.slots[s][1] or 0 for s in slots),
+            dtype=np.uint64,
+            count=len(slots))
+        hashes = hash64(values, seeds)
+        ids = (hashes >> np.uint64(1)).astype(np.int64)
+        bounded = buckets > 0
+        ids[bounded] = (hashes[bounded] % buckets[bounded]).astype(np.int64)
+        return ids
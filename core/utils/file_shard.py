@@ -0,0 +1,210 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Split input files between workers by byte volume.
+
+A shard is either a file path, read whole, or a (path, start, end) tuple.
+A line belongs to the byte range its first byte falls in, so adjacent
+ranges of one file never share or lose a line. Compressed files cannot be
+cut and always stay whole shards.
+"""
+from __future__ import print_function
+
+import json
+import os
+import sys
+
+from paddlerec.core.utils.compressed_io import detect_compression
+from paddlerec.core.utils.compressed_io import open_lines
+from paddlerec.core.utils.compressed_io import stdin_lines as raw_stdin_lines
+
+PY3 = sys.version_info[0] >= 3
+
+SHARD_RANGES_ENV = "PADDLEREC_SHARD_RANGES"
+
+
+def shard_path(shard):
+    """
+    file path of a shard
+    """
+    if isinstance(shard, (tuple, list)):
+        return shard[0]
+    return shard
+
+
+def split_by_bytes(files, worker_num):
+    """
+    cut the concatenation of files into worker_num equal byte ranges
+    Args:
+        files(list): local file paths
+        worker_num(int): number of workers
+    Return:
+        list of worker_num lists of (path, start, end), a compressed file
+        is given whole, as its path, to the worker owning its middle byte
+    """
+    sizes = [os.path.getsize(f) for f in files]
+    total = sum(sizes)
+    bounds = [total * i // worker_num for i in range(worker_num + 1)]
+    plans = [[] for _ in range(worker_num)]
+    file_begin = 0
+    for path, size in zip(files, sizes):
+        file_end = file_begin + size
+        if size > 0 and detect_compression(path) is not None:
+            middle = (file_begin + file_end) // 2
+            worker = max(w for w in range(worker_num) if bounds[w] <= middle)
+            plans[worker].append(path)
+            file_begin = file_end
+            continue
+        for worker in range(worker_num):
+            start = max(bounds[worker], file_begin)
+            end = min(bounds[worker + 1], file_end)
+            if start < end:
+                plans[worker].append((path, start - file_begin,
+                                      end - file_begin))
+        file_begin = file_end
+    return plans
+
+
+def balance_by_bytes(files, worker_num):
+    """
+    assign whole files to workers, largest first to the least loaded one,
+    for readers that can only consume complete files
+    Return:
+        list of worker_num file lists
+    """
+    sizes = dict((f, os.path.getsize(f)) for f in files)
+    loads = [0] * worker_num
+    plans = [[] for _ in range(worker_num)]
+    for path in sorted(files, key=lambda f: -sizes[f]):
+        worker = loads.index(min(loads))
+        plans[worker].append(path)
+        loads[worker] += sizes[path]
+    return plans
+
+
+def shard_bytes(shard):
+    if isinstance(shard, (tuple, list)):
+        return shard[2] - shard[1]
+    return os.path.getsize(shard)
+
+
+def print_plans(plans, worker_index=None):
+    """
+    log the byte volume per worker
+    """
+    for worker, plan in enumerate(plans):
+        if worker_index is not None and worker != worker_index:
+            continue
+        print("shard worker {}: {} bytes in {} pieces".format(
+            worker, sum(shard_bytes(s) for s in plan), len(plan)))
+
+
+def _range_lines(path, start, end):
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b"\n":
+                f.readline()
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line.decode("utf-8") if PY3 else line
+
+
+def iter_lines(shard, decompress="inline"):
+    """
+    iterate the lines (with their newline) of a shard
+    Args:
+        shard: path or (path, start, end)
+        decompress(string): how whole compressed files are inflated,
+            inline, thread or process
+    """
+    if isinstance(shard, (tuple, list)):
+        return _range_lines(*shard)
+    return open_lines(shard, decompress)
+
+
+def iter_shards(shards, decompress="inline"):
+    """
+    lines of all shards in order, the line and char counts are logged at
+    the end when any shard is a byte range
+    """
+    if not any(isinstance(s, (tuple, list)) for s in shards):
+        for shard in shards:
+            for line in iter_lines(shard, decompress):
+                yield line
+        return
+
+    lines = 0
+    chars = 0
+    for shard in shards:
+        for line in iter_lines(shard, decompress):
+            lines += 1
+            chars += len(line)
+            yield line
+    print("shard reader {}: {} lines, {} chars from {} pieces".format(
+        os.getpid(), lines, chars, len(shards)))
+
+
+def write_range_index(plan, path):
+    """
+    store the ranges of one worker for the QueueDataset pipe command,
+    keyed by device and inode since the pipe only sees the file as stdin
+    """
+    index = {}
+    for shard in plan:
+        if isinstance(shard, (tuple, list)):
+            st = os.stat(shard[0])
+            index["{}:{}".format(st.st_dev, st.st_ino)] = [shard[1], shard[2]]
+    with open(path, "w") as f:
+        json.dump(index, f)
+
+
+def stdin_lines():
+    """
+    lines of stdin, restricted to this worker's byte range when the pipe
+    command runs with SHARD_RANGES_ENV and stdin is one of the split files,
+    decompressed when stdin is a compressed file
+    """
+    index_path = os.environ.get(SHARD_RANGES_ENV)
+    if index_path:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        st = os.fstat(sys.stdin.fileno())
+        key = "{}:{}".format(st.st_dev, st.st_ino)
+        if key in index:
+            start, end = index[key]
+            return _stdin_range_lines(start, end)
+    return raw_stdin_lines()
+
+
+def _stdin_range_lines(start, end):
+    stdin = os.fdopen(os.dup(sys.stdin.fileno()), "rb")
+    try:
+        if start > 0:
+            stdin.seek(start - 1)
+            if stdin.read(1) != b"\n":
+                stdin.readline()
+        pos = stdin.tell()
+        while pos < end:
+            line = stdin.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line.decode("utf-8") if PY3 else line
+    finally:
+        stdin.close()
@@ -12,10 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import glob
 import os
+import shutil
+import time
 
 from paddle.fluid.incubate.fleet.utils.hdfs import HDFSClient
 
+LIST_CACHE_TTL = 5
+
 
 def is_afs_path(path):
     """is_afs_path
@@ -27,13 +32,47 @@ def is_afs_path(path):
 
 class LocalFSClient(object):
     """
-    Util for local disk file_system io 
+    Util for local disk file_system io, on os and shutil without shell
+    commands. exists_many and ls_many list every directory once and keep
+    the listing for cache_ttl seconds, the writes of this client drop the
+    listings they change.
     """
 
-    def __init__(self):
+    def __init__(self, cache_ttl=LIST_CACHE_TTL):
         """R
         """
-        pass
+        self._cache_ttl = cache_ttl
+        self._listings = {}
+
+    def _forget(self, path):
+        path = os.path.normpath(path)
+        self._listings.pop(path, None)
+        self._listings.pop(os.path.dirname(path), None)
+
+    def _listing(self, dir_name, refresh=False):
+        """
+        names in dir_name as a list and a set, None, None when it is not
+        a directory
+        """
+        dir_name = os.path.normpath(dir_name)
+        now = time.time()
+        cached = self._listings.get(dir_name)
+        if not refresh and cached is not None and \
+                now - cached[0] < self._cache_ttl:
+            return cached[1:]
+        try:
+            names = os.listdir(dir_name)
+            name_set = set(names)
+        except OSError:
+            names = name_set = None
+        self._listings[dir_name] = (now, names, name_set)
+        return names, name_set
+
+    def _expand(self, path):
+        # the shell commands this client ran expanded wildcards
+        if glob.has_magic(path):
+            return glob.glob(path)
+        return [path]
 
     def write(self, content, path, mode):
         """
@@ -44,20 +83,44 @@ class LocalFSClient(object):
             mode(string): w/a  w:clear_write a:append_write
         """
         temp_dir = os.path.dirname(path)
-        if not os.path.exists(temp_dir):
+        if temp_dir and not os.path.exists(temp_dir):
             os.makedirs(temp_dir)
         f = open(path, mode)
         f.write(content)
         f.flush()
         f.close()
+        self._forget(path)
 
     def cp(self, org_path, dest_path):
-        """R
+        """
+        copy like cp -r
+        Return:
+            0 on success, 1 on failure
         """
         temp_dir = os.path.dirname(dest_path)
-        if not os.path.exists(temp_dir):
+        if temp_dir and not os.path.exists(temp_dir):
             os.makedirs(temp_dir)
-        return os.system("cp -r " + org_path + " " + dest_path)
+        sources = self._expand(org_path)
+        if not sources:
+            print("cp: {} not found".format(org_path))
+            return 1
+        try:
+            for source in sources:
+                if os.path.isdir(source):
+                    target = dest_path
+                    if os.path.isdir(dest_path):
+                        target = os.path.join(
+                            dest_path,
+                            os.path.basename(os.path.normpath(source)))
+                    shutil.copytree(source, target)
+                else:
+                    shutil.copy(source, dest_path)
+        except (IOError, OSError, shutil.Error) as e:
+            print("cp {} {} failed: {}".format(org_path, dest_path, e))
+            return 1
+        finally:
+            self._forget(dest_path)
+        return 0
 
     def cat(self, file_path):
         """R
@@ -71,18 +134,25 @@ class LocalFSClient(object):
         """R
         """
         os.makedirs(dir_name)
+        self._forget(dir_name)
 
     def remove(self, path):
-        """R
         """
-        os.system("rm -rf " + path)
+        remove files or directories like rm -rf, missing paths are ignored
+        """
+        for target in self._expand(path):
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target, ignore_errors=True)
+            elif os.path.lexists(target):
+                os.remove(target)
+            self._forget(target)
 
     def is_exist(self, path):
         """R
         """
-        if os.system("ls " + path) == 0:
-            return True
-        return False
+        if glob.has_magic(path):
+            return len(glob.glob(path)) > 0
+        return os.path.exists(path)
 
     def ls(self, path):
         """R
@@ -90,6 +160,39 @@ class LocalFSClient(object):
         files = os.listdir(path)
         return files
 
+    def exists_many(self, paths):
+        """
+        is_exist of every path, from one cached listing per directory. A
+        path missing from a cached listing is looked up in a new one, so
+        files appearing while being polled are seen at once.
+        Return:
+            list of True/False in the order of paths
+        """
+        res = []
+        refreshed = set()
+        for path in paths:
+            name = os.path.basename(os.path.normpath(path))
+            if glob.has_magic(path) or name in ("", ".", ".."):
+                res.append(self.is_exist(path))
+                continue
+            dir_name = os.path.dirname(os.path.normpath(path))
+            _, names = self._listing(dir_name)
+            if (names is None or name not in names) and \
+                    dir_name not in refreshed:
+                refreshed.add(dir_name)
+                _, names = self._listing(dir_name, refresh=True)
+            res.append(names is not None and name in names)
+        return res
+
+    def ls_many(self, paths):
+        """
+        ls of every directory of paths from the cached listings, an empty
+        list for missing directories
+        Return:
+            list of file name lists in the order of paths
+        """
+        return [list(self._listing(path)[0] or []) for path in paths]
+
 
 class FileHandler(object):
     """
@@ -166,6 +269,30 @@ class FileHandler(object):
             files = [path + '/' + fi for fi in files]  # absulte path
         return files
 
+    def exists_many(self, paths):
+        """
+        is_exist of every path, local paths from cached directory listings
+        Return:
+            list of True/False in the order of paths
+        """
+        local = [p for p in paths if not is_afs_path(p)]
+        found = dict(zip(local, self._local_fs_client.exists_many(local)))
+        return [
+            found[p] if p in found else self._hdfs_client.is_exist(p)
+            for p in paths
+        ]
+
+    def ls_many(self, paths):
+        """
+        ls of every path, local paths from cached directory listings
+        Return:
+            list of absolute path lists in the order of paths
+        """
+        local = [p for p in paths if not is_afs_path(p)]
+        names = dict(zip(local, self._local_fs_client.ls_many(local)))
+        return [[path + '/' + fi for fi in names[path]]
+                if path in names else self.ls(path) for path in paths]
+
     def cp(self, org_path, dest_path):
         """R
         """
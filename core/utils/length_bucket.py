@@ -0,0 +1,196 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Length bucketing for variable-length sequence samples.
+
+Samples of similar length are batched together so that padding, and the
+compute spent on it, stays small. Two ways to form the batches:
+
+    group_size   buffer group_size samples, sort them by length and cut
+                 the sorted group into batches
+    boundaries   route every sample to the bucket of its length, a batch
+                 is emitted as soon as a bucket holds batch_size samples
+"""
+from __future__ import print_function
+
+import bisect
+from itertools import chain
+
+import numpy as np
+
+
+class LengthBucketBatcher(object):
+    """
+    batch samples (lists of fields) by the length of their sequences
+    """
+
+    def __init__(self,
+                 batch_size,
+                 boundaries=None,
+                 group_size=None,
+                 seq_fields=(0, ),
+                 length_fn=None,
+                 pad_value=0,
+                 output="padded",
+                 with_mask=False,
+                 drop_last=True,
+                 descending=False):
+        """
+        Args:
+            batch_size(int): samples per batch
+            boundaries(list): increasing length upper bounds of the buckets,
+                takes precedence over group_size
+            group_size(int): samples sorted together, batch_size * 20 when
+                neither boundaries nor group_size is given
+            seq_fields(list): indices of the variable-length fields
+            length_fn: sample -> length, len(sample[seq_fields[0]]) default
+            pad_value: value of the padded positions
+            output(string): "padded" for [batch, max_len] arrays, "lod" for
+                (values, lengths) tuples
+            with_mask(bool): append a float32 [batch, max_len] mask and the
+                int64 [batch, 1] lengths of the first seq field, padded only
+            drop_last(bool): drop the last incomplete batch
+            descending(bool): longest samples first inside a group
+        """
+        if output not in ("padded", "lod"):
+            raise ValueError(
+                "bucket output must be padded or lod, got {}".format(output))
+        self.batch_size = batch_size
+        self.boundaries = sorted(boundaries) if boundaries else None
+        self.group_size = group_size or batch_size * 20
+        self.seq_fields = list(seq_fields)
+        self.pad_value = pad_value
+        self.output = output
+        self.with_mask = with_mask
+        self.drop_last = drop_last
+        self.descending = descending
+        if length_fn is None:
+            field = self.seq_fields[0]
+
+            def length_fn(sample):
+                return len(sample[field])
+
+        self.length_fn = length_fn
+
+    def bucket(self, samples):
+        """
+        yield lists of batch_size samples of similar length
+        """
+        if self.boundaries is None:
+            return self._bucket_by_group(samples)
+        return self._bucket_by_boundaries(samples)
+
+    def _cut(self, group, final):
+        """
+        sort group and split it into batches, an incomplete last batch is
+        returned as the remainder unless final
+        """
+        group.sort(key=self.length_fn, reverse=self.descending)
+        full = len(group) // self.batch_size * self.batch_size
+        batches = [
+            group[begin:begin + self.batch_size]
+            for begin in range(0, full, self.batch_size)
+        ]
+        remain = group[full:]
+        if final and remain and not self.drop_last:
+            batches.append(remain)
+            remain = []
+        return batches, remain
+
+    def _bucket_by_group(self, samples):
+        group = []
+        for sample in samples:
+            group.append(sample)
+            if len(group) >= self.group_size:
+                batches, group = self._cut(group, False)
+                for batch in batches:
+                    yield batch
+        batches, _ = self._cut(group, True)
+        for batch in batches:
+            yield batch
+
+    def _bucket_by_boundaries(self, samples):
+        buckets = [[] for _ in range(len(self.boundaries) + 1)]
+        for sample in samples:
+            index = bisect.bisect_left(self.boundaries, self.length_fn(sample))
+            bucket = buckets[index]
+            bucket.append(sample)
+            if len(bucket) == self.batch_size:
+                yield bucket
+                buckets[index] = []
+        # leftovers of neighbouring buckets are still close in length
+        batches, _ = self._cut(list(chain.from_iterable(buckets)), True)
+        for batch in batches:
+            yield batch
+
+    def pad(self, batch):
+        """
+        stack a list of samples into one array per field, the seq fields
+        padded to the longest sample of the batch
+        """
+        columns = []
+        mask = None
+        lengths = None
+        for field in range(len(batch[0])):
+            if field not in self.seq_fields:
+                columns.append(self._stack([s[field] for s in batch]))
+                continue
+            values, field_lengths = self._flatten([s[field] for s in batch])
+            if self.output == "lod":
+                columns.append((values.reshape([-1, 1]), field_lengths))
+                continue
+            padded, field_mask = self._pad_values(values, field_lengths)
+            columns.append(padded)
+            if mask is None:
+                mask, lengths = field_mask, field_lengths
+        if self.with_mask and mask is not None:
+            columns.append(mask.astype(np.float32))
+            columns.append(lengths.reshape([-1, 1]))
+        return columns
+
+    def _dtype(self, values):
+        for value in values:
+            return np.float32 if isinstance(value, float) else np.int64
+        return np.int64
+
+    def _stack(self, values):
+        first = values[0]
+        if isinstance(first, (list, tuple)):
+            dtype = self._dtype(first)
+        else:
+            dtype = self._dtype(values)
+        return np.array(values, dtype=dtype).reshape([len(values), -1])
+
+    def _flatten(self, seqs):
+        lengths = np.fromiter(
+            (len(seq) for seq in seqs), dtype=np.int64, count=len(seqs))
+        dtype = self._dtype(chain.from_iterable(seqs))
+        values = np.fromiter(
+            chain.from_iterable(seqs), dtype=dtype, count=int(lengths.sum()))
+        return values, lengths
+
+    def _pad_values(self, values, lengths):
+        max_len = max(int(lengths.max()), 1)
+        mask = np.arange(max_len) < lengths[:, None]
+        padded = np.full((len(lengths), max_len), self.pad_value, values.dtype)
+        # boolean assignment fills row by row, the order of values
+        padded[mask] = values
+        return padded, mask
+
+    def generate(self, samples):
+        """
+        yield padded batches of the sample stream
+        """
+        for batch in self.bucket(samples):
+            yield self.pad(batch)
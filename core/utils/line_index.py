@@ -0,0 +1,199 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Random access to the lines of text files through line offset indexes.
+
+The index of a file holds the uint64 start offset of every line followed
+by the file size. It is built with NumPy over blocks of the file and
+cached as .npy in <data dir>.lines/, named after the file size and mtime.
+
+shuffled_samples draws a permutation of all lines of all files every
+epoch, 8 bytes per line, and reads the lines chunk by chunk from mmapped
+files: the ids of a chunk are sorted so every file is read forward, then
+the lines are emitted in permuted order. That is an exact global shuffle
+without holding the parsed samples in memory.
+"""
+from __future__ import print_function
+
+import mmap
+import os
+import sys
+
+import numpy as np
+
+from paddlerec.core.utils.compressed_io import detect_compression
+from paddlerec.core.utils.shuffle_buffer import epoch_rng
+
+PY3 = sys.version_info[0] >= 3
+
+SCAN_BYTES = 64 << 20
+CHUNK_LINES = 65536
+SUFFIX = ".lines"
+
+
+def build_line_index(path, scan_bytes=SCAN_BYTES):
+    """
+    uint64 start offsets of the lines of path followed by its size
+    """
+    size = os.path.getsize(path)
+    parts = [np.zeros(1, dtype=np.uint64)]
+    with open(path, "rb") as f:
+        begin = 0
+        while True:
+            block = f.read(scan_bytes)
+            if not block:
+                break
+            ends = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            parts.append((ends + begin + 1).astype(np.uint64))
+            begin += len(block)
+    offsets = np.concatenate(parts)
+    if offsets[-1] != size:
+        # the last line has no newline
+        offsets = np.append(offsets, np.uint64(size))
+    return offsets
+
+
+def _index_name(path):
+    st = os.stat(path)
+    return "{}.{}.{}.npy".format(
+        os.path.basename(path), st.st_size, int(st.st_mtime * 1e6))
+
+
+def index_dir_of(path):
+    """
+    default index directory of a data file, next to its directory
+    """
+    return os.path.normpath(os.path.dirname(os.path.abspath(path))) + SUFFIX
+
+
+def load_line_index(path, index_dir=None):
+    """
+    the offsets of path, memory-mapped from the cached .npy, which is
+    built first when missing or stale
+    """
+    index_dir = index_dir or index_dir_of(path)
+    name = _index_name(path)
+    cached = os.path.join(index_dir, name)
+    if os.path.isfile(cached):
+        return np.load(cached, mmap_mode="r")
+    offsets = build_line_index(path)
+    try:
+        if not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        base = os.path.basename(path)
+        for old in os.listdir(index_dir):
+            if old.rsplit(".", 3)[0] == base:
+                os.remove(os.path.join(index_dir, old))
+        tmp = "{}.{}.tmp".format(cached, os.getpid())
+        with open(tmp, "wb") as f:
+            np.save(f, offsets)
+        os.rename(tmp, cached)
+    except (IOError, OSError) as e:
+        print("line index of {} not cached: {}".format(path, e))
+    return offsets
+
+
+class LineIndex(object):
+    """
+    lines of several plain text files addressed by one global line id
+    """
+
+    def __init__(self, files, index_dir=None):
+        self.files = list(files)
+        self.offsets = [load_line_index(f, index_dir) for f in self.files]
+        counts = [len(o) - 1 for o in self.offsets]
+        self.starts = np.zeros(len(counts) + 1, dtype=np.int64)
+        self.starts[1:] = np.cumsum(counts)
+        self._maps = [None] * len(self.files)
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def _map(self, i):
+        if self._maps[i] is None:
+            with open(self.files[i], "rb") as f:
+                self._maps[i] = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[i]
+
+    def read(self, ids):
+        """
+        the lines of the global ids, in the order of ids
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind="mergesort")
+        sorted_ids = ids[order]
+        bounds = np.searchsorted(sorted_ids, self.starts).tolist()
+        lines = [None] * len(ids)
+        order = order.tolist()
+        for i in range(len(self.files)):
+            begin, end = bounds[i], bounds[i + 1]
+            if begin == end:
+                continue
+            local = sorted_ids[begin:end] - self.starts[i]
+            starts = self.offsets[i][local].tolist()
+            ends = self.offsets[i][local + 1].tolist()
+            data = self._map(i)
+            for k, (s, e) in enumerate(zip(starts, ends), begin):
+                lines[order[k]] = data[s:e]
+        if PY3:
+            lines = [line.decode("utf-8") for line in lines]
+        return lines
+
+    def close(self):
+        for data in self._maps:
+            if data is not None:
+                data.close()
+        self._maps = [None] * len(self.files)
+
+
+def shuffled_lines(index, rng=np.random, chunk_lines=CHUNK_LINES):
+    """
+    all lines of a LineIndex in the order of one random permutation
+    """
+    perm = rng.permutation(len(index))
+    for begin in range(0, len(perm), chunk_lines):
+        for line in index.read(perm[begin:begin + chunk_lines]):
+            yield line
+
+
+def shuffled_samples(files, parse, seed=None, chunk_lines=CHUNK_LINES):
+    """
+    per-epoch reader of parse(line) over all lines of files, in a new
+    global order every epoch, repeatable with seed. Compressed files
+    cannot be indexed: their samples are parsed into memory once and
+    shuffled in place every epoch.
+    """
+    epoch = [0]
+    if any(detect_compression(f) is not None for f in files):
+        from paddlerec.core.utils.compressed_io import open_lines
+        samples = [parse(line) for f in files for line in open_lines(f)]
+
+        def memory_reader():
+            epoch_rng(seed, epoch[0]).shuffle(samples)
+            epoch[0] += 1
+            return iter(samples)
+
+        return memory_reader
+
+    index = LineIndex(files)
+
+    def index_reader():
+        rng = np.random.RandomState(
+            epoch_rng(seed, epoch[0]).randint(0, 2**31 - 1))
+        epoch[0] += 1
+        for line in shuffled_lines(index, rng, chunk_lines):
+            yield parse(line)
+
+    return index_reader
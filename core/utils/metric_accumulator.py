@@ -0,0 +1,141 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Running sums of scalar metrics kept by the program itself.
+
+Ops appended to the main program add every batch's metric to a float64
+persistable variable, <var name>@SUM, and count the batches in
+batch_count@SUM, so nothing has to be fetched per batch. pull, called
+by the training thread after exe.run, reads the sums from the scope and
+prints the mean of every metric over the batches since the previous
+pull. A data parallel CompiledProgram copies the sums to every place
+and pull adds the copies up. With ReduceStrategy.Reduce on CPU the places
+share one buffer instead and the sums would race, the runner fetches
+the metrics then.
+
+The sums are persistable only to live across batches, checkpoints leave
+them out through is_checkpointed, so a restored job starts from zero.
+"""
+from __future__ import print_function
+
+import numpy as np
+import paddle.fluid as fluid
+
+SUFFIX = "@SUM"
+COUNTER = "batch_count" + SUFFIX
+
+
+def is_checkpointed(var):
+    """
+    predicate of the variables a checkpoint holds, the persistables but
+    the sums of MetricAccumulator
+    """
+    return fluid.io.is_persistable(var) and not var.name.endswith(SUFFIX)
+
+
+class MetricAccumulator(object):
+    """
+    on-device sums of the scalar metrics of one program
+    """
+
+    def __init__(self, program, metrics, exe, scope):
+        """
+        Args:
+            program(Program): main program, the ops are appended to it, so
+                it has to be cloned or compiled afterwards
+            metrics(dict): metric name to scalar Variable
+            exe(Executor): runs the initialization of the sums
+            scope(Scope): scope the program runs in
+        """
+        self.names = list(metrics.keys())
+        self._scope = scope
+        self._sum_names = []
+        init_program = fluid.Program()
+        with fluid.program_guard(program, init_program):
+            for name in self.names:
+                var = metrics[name]
+                if any(d != 1 for d in var.shape):
+                    raise ValueError(
+                        "only scalar metrics can be accumulated, {} has shape "
+                        "{}".format(name, var.shape))
+                total = fluid.layers.create_global_var(
+                    shape=[1],
+                    value=0.0,
+                    dtype="float64",
+                    persistable=True,
+                    name=var.name + SUFFIX)
+                value = fluid.layers.reshape(
+                    fluid.layers.cast(var, "float64"), shape=[1])
+                fluid.layers.sums(input=[total, value], out=total)
+                self._sum_names.append(total.name)
+            counter = fluid.layers.create_global_var(
+                shape=[1],
+                value=0.0,
+                dtype="float64",
+                persistable=True,
+                name=COUNTER)
+            fluid.layers.increment(counter, value=1.0, in_place=True)
+        with fluid.scope_guard(scope):
+            exe.run(init_program)
+        self._last = None
+
+    def _scopes(self, program):
+        # the ParallelExecutor of a data parallel CompiledProgram, built by
+        # its first run, holds the copy of every device in a local scope
+        executor = getattr(program, "_executor", None)
+        if executor is not None:
+            return list(executor.local_scopes())
+        return [self._scope]
+
+    def read(self, program=None):
+        """
+        batch count and the sums in the order of names, added up over the
+        devices of program
+        Args:
+            program(Program|CompiledProgram): the program that ran
+        """
+        values = []
+        for name in [COUNTER] + self._sum_names:
+            values.append(
+                sum(
+                    float(np.array(scope.find_var(name).get_tensor())[0])
+                    for scope in self._scopes(program)))
+        return values[0], values[1:]
+
+    def _means(self, program):
+        count, sums = self.read(program)
+        if self._last is None:
+            last_count, last_sums = 0.0, [0.0] * len(sums)
+        else:
+            last_count, last_sums = self._last
+        self._last = (count, sums)
+        batches = count - last_count
+        if batches <= 0:
+            return 0, []
+        return int(batches), [(s - l) / batches
+                              for s, l in zip(sums, last_sums)]
+
+    def pull(self, label, program=None):
+        """
+        print the means since the last pull, on the thread running program
+        after exe.run returned, so the sums are not being written
+        Args:
+            label: printed as the batch the means end at
+            program(Program|CompiledProgram): the program that ran
+        """
+        batches, means = self._means(program)
+        if batches:
+            print("batch: {}, mean of {} batches: {}".format(
+                label, batches, ", ".join("{}: {}".format(
+                    name, mean) for name, mean in zip(self.names, means))))
@@ -0,0 +1,178 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Fan the files of a DataLoader dataset out to several reader processes.
+"""
+from __future__ import print_function
+
+import multiprocessing
+import random
+import sys
+import traceback
+
+import numpy as np
+
+try:
+    import queue as Queue
+except ImportError:
+    import Queue
+
+# seconds between checks of the workers while waiting for a chunk
+POLL_SECONDS = 5
+
+
+def _get_context():
+    """
+    readers are closures over already initialized Reader instances, so
+    they can only be handed to the workers by fork
+    """
+    if hasattr(multiprocessing, "get_context"):
+        try:
+            return multiprocessing.get_context("fork")
+        except ValueError:
+            return None
+    if sys.platform.startswith("win"):
+        return None
+    return multiprocessing
+
+
+# index of the reader worker this process is, 0 outside of the workers
+_worker_index = 0
+
+
+def worker_index():
+    """
+    index of the current reader worker process, 0 in the trainer
+    """
+    return _worker_index
+
+
+def _worker(shard_reader, files, queue, chunk_size, seed, worker_id):
+    global _worker_index
+    _worker_index = worker_id
+    if seed is not None:
+        random.seed(seed + worker_id)
+        np.random.seed((seed + worker_id) % (2**32))
+    try:
+        chunk = []
+        for item in shard_reader(files):
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                queue.put(chunk)
+                chunk = []
+        if chunk:
+            queue.put(chunk)
+        queue.put(None)
+    except Exception:
+        queue.put(traceback.format_exc())
+
+
+class MultiProcessReader(object):
+    """
+    Run `shard_reader` over disjoint shards of `files` in worker processes
+    and merge their outputs through bounded queues.
+
+    Without a seed, items are taken from a shared queue in arrival order.
+    With a seed, every worker seeds `random`/`np.random` with seed + its
+    index and items are taken from the workers round-robin, so the output
+    order only depends on the files, the seed and the number of workers.
+    """
+
+    def __init__(self,
+                 shard_reader,
+                 files,
+                 workers,
+                 queue_size=64,
+                 chunk_size=64,
+                 seed=None):
+        """
+        Args:
+            shard_reader: callable(files) -> iterable of samples/batches
+            files(list): input files, worker i reads files[i::workers]
+            workers(int): number of processes
+            queue_size(int): chunks buffered between workers and trainer
+            chunk_size(int): items sent per queue put
+            seed(int): makes the order and the worker randomness repeatable
+        """
+        self._shard_reader = shard_reader
+        self._files = list(files)
+        self._workers = max(1, min(int(workers), len(self._files)))
+        self._queue_size = queue_size
+        self._chunk_size = chunk_size
+        self._seed = None if seed is None else int(seed)
+        self._ctx = _get_context()
+
+    def __call__(self):
+        if self._workers <= 1 or self._ctx is None:
+            return iter(self._shard_reader(self._files))
+        return self._read()
+
+    def _get(self, queue, procs):
+        """
+        the next chunk of queue, raising when a worker died before it sent
+        its end marker, which would otherwise block forever
+        """
+        while True:
+            try:
+                return queue.get(timeout=POLL_SECONDS)
+            except Queue.Empty:
+                pass
+            for i, p in enumerate(procs):
+                if p.exitcode is not None and p.exitcode != 0:
+                    raise RuntimeError("reader worker {} exited with code {}".
+                                       format(i, p.exitcode))
+
+    def _read(self):
+        ordered = self._seed is not None
+        if ordered:
+            size = max(1, self._queue_size // self._workers)
+            queues = [self._ctx.Queue(size) for _ in range(self._workers)]
+        else:
+            queues = [self._ctx.Queue(self._queue_size)] * self._workers
+
+        procs = []
+        for i in range(self._workers):
+            p = self._ctx.Process(
+                target=_worker,
+                args=(self._shard_reader, self._files[i::self._workers],
+                      queues[i], self._chunk_size, self._seed, i))
+            p.daemon = True
+            p.start()
+            procs.append(p)
+
+        try:
+            active = list(range(self._workers))
+            index = 0
+            while active:
+                if ordered:
+                    index %= len(active)
+                    chunk = self._get(queues[active[index]], procs)
+                else:
+                    chunk = self._get(queues[0], procs)
+                if chunk is None:
+                    if ordered:
+                        active.pop(index)
+                    else:
+                        active.pop()
+                    continue
+                if not isinstance(chunk, list):
+                    raise RuntimeError("reader worker failed:\n" + chunk)
+                for item in chunk:
+                    yield item
+                index += 1
+        finally:
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+                p.join()
@@ -0,0 +1,272 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Negative sampling for readers and data preparation scripts.
+
+Draws come in whole arrays per call. Non-uniform distributions use an
+alias table (Vose), so one draw costs two random numbers whatever the
+number of items:
+
+    uniform      every item id in [0, num_items) equally
+    unigram      count ** alpha, alpha=0.75 as in word2vec
+    popularity   count itself
+"""
+from __future__ import print_function
+
+import io
+import os
+from itertools import chain
+
+import numpy as np
+
+from paddlerec.core.utils.multiprocess_reader import worker_index
+
+STRATEGIES = ["uniform", "unigram", "popularity"]
+BROADCAST_CELLS = 1 << 16
+
+
+def worker_seed(seed, worker=None, reader=None):
+    """
+    seed of one reader process derived from a base seed, None stays None
+    Args:
+        worker(int): trainer index, PADDLE_TRAINER_ID by default
+        reader(int): reader process index of the trainer, the current
+            MultiProcessReader worker by default
+    """
+    if seed is None:
+        return None
+    if worker is None:
+        worker = int(os.environ.get("PADDLE_TRAINER_ID", 0))
+    if reader is None:
+        reader = worker_index()
+    seed = (int(seed) * 1000003 + int(worker)) * 1009 + int(reader)
+    return seed % (2**32)
+
+
+class ProcessRandomState(object):
+    """
+    np.random.RandomState of the current process. Reader workers are
+    forked from the trainer after the readers are initialized, so a
+    RandomState created in init would be copied into every worker and
+    all of them would draw the same numbers. This one is created again,
+    from worker_seed, the first time it is used in a new process.
+    """
+
+    def __init__(self, seed=None, worker=None):
+        self._seed = seed
+        self._worker = worker
+        self._pid = None
+        self._rng = None
+
+    def get(self):
+        if self._pid != os.getpid():
+            self._rng = np.random.RandomState(
+                worker_seed(self._seed, self._worker))
+            self._pid = os.getpid()
+        return self._rng
+
+
+def load_counts(dict_path):
+    """
+    counts of a "word count" dict file, in id order
+    """
+    counts = []
+    with io.open(dict_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            counts.append(int(line.split()[1]))
+    return np.array(counts, dtype=np.int64)
+
+
+class AliasTable(object):
+    """
+    O(1) sampling from a fixed discrete distribution
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.ndim != 1 or len(weights) == 0:
+            raise ValueError("alias table needs a non-empty 1-D weight array")
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("alias table weights must be >= 0, not all 0")
+        n = len(weights)
+        prob = (weights * n / weights.sum()).tolist()
+        alias = list(range(n))
+        small = [i for i in range(n) if prob[i] < 1.0]
+        large = [i for i in range(n) if prob[i] >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large[-1]
+            alias[s] = l
+            prob[l] -= 1.0 - prob[s]
+            if prob[l] < 1.0:
+                small.append(large.pop())
+        # what is left is 1 up to rounding errors
+        for i in small + large:
+            prob[i] = 1.0
+        self.prob = np.array(prob, dtype=np.float64)
+        self.alias = np.array(alias, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, size, rng=np.random):
+        index = rng.randint(0, len(self.prob), size)
+        keep = rng.random_sample(size) < self.prob[index]
+        return np.where(keep, index, self.alias[index])
+
+
+class NegativeSampler(object):
+    """
+    batched negative draws with optional exclusion of positives
+    """
+
+    def __init__(self,
+                 num_items=None,
+                 counts=None,
+                 strategy="unigram",
+                 alpha=0.75,
+                 seed=None,
+                 worker=None,
+                 max_tries=100):
+        """
+        Args:
+            num_items(int): number of item ids, len(counts) by default
+            counts(array): occurrence count of every id, needed unless
+                strategy is uniform
+            strategy(string): uniform, unigram or popularity
+            alpha(float): exponent of the unigram distribution
+            seed(int): base seed, combined with the trainer and the reader
+                process index so every process draws a different but
+                repeatable sequence
+            max_tries(int): redraw rounds for excluded ids before giving up
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                "sampler strategy {} not in {}".format(strategy, STRATEGIES))
+        self.table = None
+        if strategy != "uniform":
+            if counts is None:
+                raise ValueError("{} sampling needs counts".format(strategy))
+            counts = np.asarray(counts, dtype=np.float64)
+            power = 1.0 if strategy == "popularity" else alpha
+            self.table = AliasTable(np.power(counts, power))
+            num_items = len(counts)
+        elif num_items is None:
+            if counts is None:
+                raise ValueError("uniform sampling needs num_items")
+            num_items = len(counts)
+        self.num_items = int(num_items)
+        self.max_tries = max_tries
+        self._rng = ProcessRandomState(seed, worker)
+
+    @property
+    def rng(self):
+        """
+        RandomState of the current process
+        """
+        return self._rng.get()
+
+    def draw(self, size):
+        """
+        int64 ids of shape size, nothing excluded
+        """
+        if self.table is None:
+            return self.rng.randint(0, self.num_items, size).astype(np.int64)
+        return self.table.sample(size, self.rng)
+
+    def sample(self, size, exclude=None):
+        """
+        Args:
+            size(int or tuple): shape of the result
+            exclude(array): ids no draw may take, or a 2-D array with one
+                row of ids (padded with any id outside [0, num_items)) per
+                row of the result
+        Return:
+            int64 ndarray of shape size
+        """
+        ids = self.draw(size)
+        if exclude is None:
+            return ids
+        exclude = np.asarray(exclude, dtype=np.int64)
+        for _ in range(self.max_tries):
+            masked = self._excluded(ids, exclude)
+            if not masked.any():
+                return ids
+            ids[masked] = self.draw(int(masked.sum()))
+        raise ValueError("no negative outside the excluded ids after {} "
+                         "tries".format(self.max_tries))
+
+    def _excluded(self, ids, exclude):
+        if exclude.ndim <= 1:
+            if exclude.size * ids.size <= BROADCAST_CELLS:
+                # sorting in isin costs more than comparing small sets
+                return (ids[..., None] == exclude).any(axis=-1)
+            return np.isin(ids, exclude)
+        rows = ids.reshape([len(exclude), -1])
+        masked = (rows[:, :, None] == exclude[:, None, :]).any(axis=2)
+        return masked.reshape(ids.shape)
+
+    def sample_rows(self, sizes, excludes):
+        """
+        draws of many rows in one pass, such as the negatives of all users
+        Args:
+            sizes(list): number of ids drawn for every row
+            excludes(list): ids excluded from every row, one list per row
+        Return:
+            flat int64 ndarray of sum(sizes) ids, row after row
+        """
+        sizes = np.asarray(sizes, dtype=np.int64)
+        rows = np.repeat(np.arange(len(sizes), dtype=np.int64), sizes)
+        lengths = np.fromiter(
+            (len(e) for e in excludes), dtype=np.int64, count=len(excludes))
+        ex_rows = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+        ex_ids = np.fromiter(
+            chain.from_iterable(excludes),
+            dtype=np.int64,
+            count=int(lengths.sum()))
+        banned = np.sort(ex_rows * self.num_items + ex_ids)
+        ids = self.draw(len(rows))
+        if len(banned) == 0:
+            return ids
+        for _ in range(self.max_tries):
+            # (row, id) keys test the exclusions of all rows together
+            keys = rows * self.num_items + ids
+            pos = np.minimum(np.searchsorted(banned, keys), len(banned) - 1)
+            masked = banned[pos] == keys
+            if not masked.any():
+                return ids
+            ids[masked] = self.draw(int(masked.sum()))
+        raise ValueError("no negative outside the excluded ids after {} "
+                         "tries".format(self.max_tries))
+
+    def sample_from(self, candidates, size):
+        """
+        uniform draws among candidates, such as the items of one sequence
+        """
+        candidates = np.asarray(candidates)
+        return candidates[self.rng.randint(0, len(candidates), size)]
+
+    def in_batch(self, batch_ids, neg_num):
+        """
+        negatives of every row of a batch taken from the other rows
+        Return:
+            ndarray of shape [len(batch_ids), neg_num]
+        """
+        batch_ids = np.asarray(batch_ids)
+        n = len(batch_ids)
+        if n < 2:
+            raise ValueError("in-batch sampling needs at least 2 rows")
+        index = self.rng.randint(0, n - 1, (n, neg_num))
+        index += index >= np.arange(n)[:, None]
+        return batch_ids[index]
@@ -0,0 +1,210 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Checkpoints of online training, one per trained time window.
+
+A window is saved under save_path/<begin_time>: a full base every
+base_interval windows, and in between a delta.
+
+    single machine  the persistable variables whose value changed since
+                    the previous checkpoint, found by comparing md5
+                    digests of the dense tensors in the training scope,
+                    plus every non-dense variable. Hashing copies every
+                    parameter to host memory once per window on the
+                    training thread
+    PSLib           the server side delta (save_persistables mode 1),
+                    loaded back with load_model mode 1
+    other fleets    no delta: the parameters live on the pservers, which
+                    only fleet.save_persistables reaches, so every
+                    window is a base
+
+save_path/online_state.json records the last completed window and the
+checkpoints since the last base in order, which is what a restarted job
+loads before it goes on with the next window.
+"""
+from __future__ import print_function
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import paddle.fluid as fluid
+
+from paddlerec.core.utils.metric_accumulator import is_checkpointed
+
+STATE_FILE = "online_state.json"
+
+
+class OnlineCheckpoints(object):
+    """
+    base and delta checkpoints of the windows of online training
+    """
+
+    def __init__(self, save_path, base_interval=24):
+        """
+        Args:
+            save_path(string): directory of the checkpoints and the state
+            base_interval(int): windows from one full base to the next
+        """
+        self._save_path = save_path
+        self._base_interval = base_interval
+        self._state_path = os.path.join(save_path, STATE_FILE)
+        self.state = self._read() or {"last_done": None, "checkpoints": []}
+        # digest of every dense variable at the last checkpoint of a
+        # single machine run
+        self._digests = None
+        # the first checkpoint of a process is a base
+        self._saved = False
+
+    @property
+    def last_done(self):
+        """
+        begin_time of the last completed window, None for a new job
+        """
+        return self.state["last_done"]
+
+    def _read(self):
+        if not os.path.isfile(self._state_path):
+            return None
+        with open(self._state_path, "r") as f:
+            return json.load(f)
+
+    def _write(self):
+        if not os.path.isdir(self._save_path):
+            os.makedirs(self._save_path)
+        tmp = "{}.{}.tmp".format(self._state_path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.rename(tmp, self._state_path)
+
+    def _persistables(self, program):
+        return [
+            v for v in program.list_vars()
+            if is_checkpointed(v) and
+            fluid.global_scope().find_var(v.name) is not None
+        ]
+
+    def _digests_of(self, variables):
+        digests = {}
+        scope = fluid.global_scope()
+        for var in variables:
+            try:
+                value = np.array(scope.find_var(var.name).get_tensor())
+            except Exception:
+                # not a dense tensor, always saved with the base
+                continue
+            digests[var.name] = hashlib.md5(value.tobytes()).hexdigest()
+        return digests
+
+    def _is_first_worker(self, context, is_fleet):
+        return not is_fleet or context["fleet"].is_first_worker()
+
+    def _pslib(self, context, is_fleet):
+        return is_fleet and context["fleet_mode"].upper() == "PSLIB"
+
+    def save(self, context, begin_time, program, is_fleet=False):
+        """
+        checkpoint of the window begin_time, within the scope_guard of the
+        training scope
+        """
+        dirname = os.path.join(self._save_path, begin_time)
+        pslib = self._pslib(context, is_fleet)
+        since_base = len(self.state["checkpoints"])
+        is_base = not self._saved or since_base == 0 or \
+            since_base >= self._base_interval or (is_fleet and not pslib)
+        names = None
+        if is_base:
+            if is_fleet:
+                context["fleet"].save_persistables(context["exe"], dirname)
+            else:
+                fluid.io.save_vars(
+                    context["exe"],
+                    dirname,
+                    main_program=program,
+                    predicate=is_checkpointed)
+        elif pslib:
+            context["fleet"].save_persistables(context["exe"], dirname, mode=1)
+        else:
+            variables = self._persistables(program)
+            digests = self._digests_of(variables)
+            # non-dense variables have no digest and are always saved
+            changed = [
+                v for v in variables
+                if digests.get(v.name) is None or
+                digests[v.name] != self._digests.get(v.name)
+            ]
+            names = [v.name for v in changed]
+            if changed:
+                fluid.io.save_vars(
+                    context["exe"],
+                    dirname,
+                    main_program=program,
+                    vars=changed)
+        if not is_fleet:
+            self._digests = digests if names is not None else \
+                self._digests_of(self._persistables(program))
+        self._saved = True
+        if is_base:
+            self.state["checkpoints"] = []
+        self.state["checkpoints"].append({
+            "window": begin_time,
+            "path": dirname,
+            "base": is_base,
+            "pslib": pslib,
+            "vars": names
+        })
+        self.state["last_done"] = begin_time
+        if self._is_first_worker(context, is_fleet):
+            self._write()
+        kind = "base"
+        if not is_base:
+            kind = "server delta" if names is None else \
+                "delta of {} variables".format(len(names))
+        print("online: saved {} of window {} to {}".format(
+            kind, begin_time, dirname))
+
+    def restore(self, context, program, is_fleet=False):
+        """
+        load the base and the deltas after it, within the scope_guard of
+        the training scope
+        """
+        for ckpt in self.state["checkpoints"]:
+            print("online: loading {}".format(ckpt["path"]))
+            if ckpt.get("pslib"):
+                # PSLib loads on the servers, a delta with mode 1
+                context["fleet"].load_model(
+                    ckpt["path"], mode=0 if ckpt["base"] else 1)
+            elif ckpt["base"]:
+                if is_fleet:
+                    context["fleet"].load_persistables(context["exe"],
+                                                       ckpt["path"])
+                else:
+                    fluid.io.load_vars(
+                        context["exe"],
+                        ckpt["path"],
+                        main_program=program,
+                        predicate=is_checkpointed)
+            elif ckpt["vars"]:
+                block = program.global_block()
+                fluid.io.load_vars(
+                    context["exe"],
+                    ckpt["path"],
+                    main_program=program,
+                    vars=[block.var(name) for name in ckpt["vars"]])
+        if not is_fleet:
+            self._digests = self._digests_of(self._persistables(program))
+        # a delta can follow the restored checkpoints of a single machine
+        # run, the servers of PSLib start over with a base
+        self._saved = not is_fleet and bool(self.state["checkpoints"])
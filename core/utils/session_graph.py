@@ -0,0 +1,108 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Session graphs of a batch of click sequences, as fed to SR-GNN.
+
+Every session is padded with 0 to the longest one and its nodes are the
+distinct ids of the padded sequence. One np.unique over (row, id) keys of
+the whole batch gives the node index of every position, the edges of
+consecutive clicks are scattered into one batch tensor and the in/out
+degree normalization is done for all sessions together.
+
+    dense  adj_in, adj_out as [batch, nodes, nodes] float32
+    coo    the non-zero cells only, for long sessions: adj_in and adj_out
+           are each an (index, values) tuple, index [nnz, 3] int64 rows
+           of (session, row, column) and values [nnz] float32
+"""
+from __future__ import print_function
+
+import numpy as np
+
+ADJ_FORMATS = ["dense", "coo"]
+
+
+def pad_sequences(seqs):
+    """
+    [batch, max_len] int64 ids padded with 0 and the length of every row
+    """
+    lengths = np.fromiter((len(s) for s in seqs), dtype=np.int64)
+    padded = np.zeros((len(seqs), lengths.max()), dtype=np.int64)
+    padded[np.arange(padded.shape[1]) < lengths[:, None]] = np.fromiter(
+        (i for s in seqs for i in s), dtype=np.int64, count=lengths.sum())
+    return padded, lengths
+
+
+def session_graphs(seqs, labels, adj_format="dense"):
+    """
+    Args:
+        seqs(list): clicked item ids of every session, ids start from 1
+        labels(list): next clicked item of every session, from 1
+        adj_format(string): dense or coo, see the module doc
+    Return:
+        items, seq_index, last_index, adj_in, adj_out, mask, label arrays
+        of the batch
+    """
+    if adj_format not in ADJ_FORMATS:
+        raise ValueError(
+            "adj format {} not in {}".format(adj_format, ADJ_FORMATS))
+    padded, lengths = pad_sequences(seqs)
+    batch_size, max_len = padded.shape
+    rows = np.arange(batch_size, dtype=np.int64)
+
+    # distinct (session, id) keys are sorted by session, then id
+    width = padded.max() + 1
+    keys, inverse = np.unique(
+        rows[:, None] * width + padded, return_inverse=True)
+    key_rows = keys // width
+    nodes = np.bincount(key_rows, minlength=batch_size)
+    starts = np.cumsum(nodes) - nodes
+    node = inverse.reshape(padded.shape) - starts[:, None]
+    max_nodes = nodes.max()
+    items = np.zeros((batch_size, max_nodes), dtype=np.int64)
+    items[key_rows, np.arange(len(keys)) - starts[key_rows]] = keys % width
+
+    seq_index = np.empty((batch_size, max_len, 2), dtype=np.int32)
+    seq_index[:, :, 0] = rows[:, None]
+    seq_index[:, :, 1] = node
+    last = lengths - 1
+    last_index = np.stack([rows, node[rows, last]], axis=1).astype(np.int32)
+    mask = (np.arange(max_len) <= last[:, None]).astype(np.float32)
+    label = (np.asarray(labels, dtype=np.int64) - 1).reshape([-1, 1])
+
+    # an edge per pair of consecutive clicks, repeated edges count once
+    has_edge = np.arange(max_len - 1) < last[:, None]
+    edge_rows = np.broadcast_to(rows[:, None], has_edge.shape)[has_edge]
+    edges = np.unique((edge_rows * max_nodes + node[:, :-1][has_edge]) *
+                      max_nodes + node[:, 1:][has_edge])
+    # (session, u) and (session, v) cells of every edge
+    out_cell, v = edges // max_nodes, edges % max_nodes
+    b, u = out_cell // max_nodes, out_cell % max_nodes
+    in_cell = b * max_nodes + v
+    cells = batch_size * max_nodes
+    deg_out = np.bincount(out_cell, minlength=cells)
+    deg_in = np.bincount(in_cell, minlength=cells)
+    out_values = (1.0 / deg_out[out_cell]).astype(np.float32)
+    in_values = (1.0 / deg_in[in_cell]).astype(np.float32)
+    if adj_format == "coo":
+        adj_in = (np.stack([b, v, u], axis=1), in_values)
+        adj_out = (np.stack([b, u, v], axis=1), out_values)
+    else:
+        shape = (batch_size, max_nodes, max_nodes)
+        adj_in = np.zeros(shape, dtype=np.float32)
+        adj_in[b, v, u] = in_values
+        adj_out = np.zeros(shape, dtype=np.float32)
+        adj_out[b, u, v] = out_values
+    return [
+        items, seq_index, last_index, adj_in, adj_out, mask[:, :, None], label
+    ]
@@ -0,0 +1,72 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Streaming shuffle for readers that cannot hold a whole dataset in memory.
+"""
+from __future__ import print_function
+
+import random
+
+
+def epoch_rng(seed, epoch):
+    """
+    random.Random for one epoch, repeatable when seed is given
+    """
+    if seed is None:
+        return random.Random()
+    return random.Random(int(seed) * 1000003 + epoch)
+
+
+def shuffle_files(files, rng=random):
+    """
+    return a shuffled copy of files
+    """
+    files = list(files)
+    rng.shuffle(files)
+    return files
+
+
+def shuffle_enabled(buffer_size):
+    """
+    whether a shuffle buffer of buffer_size items shuffles at all
+    """
+    return int(buffer_size or 0) > 1
+
+
+def buffered_shuffle(iterable, buffer_size, rng=random):
+    """
+    shuffle a stream with a fixed-size buffer: once the buffer is full,
+    every new item replaces a uniformly chosen buffered one, which is
+    emitted. Memory stays at buffer_size items however long the stream is.
+    Args:
+        iterable: samples, lines or batches
+        buffer_size(int): items held back, <= 1 disables shuffling
+        rng: random.Random or the random module
+    """
+    if not shuffle_enabled(buffer_size):
+        for item in iterable:
+            yield item
+        return
+
+    buf = []
+    for item in iterable:
+        if len(buf) < buffer_size:
+            buf.append(item)
+            continue
+        index = int(rng.random() * buffer_size)
+        yield buf[index]
+        buf[index] = item
+    rng.shuffle(buf)
+    for item in buf:
+        yield item
@@ -0,0 +1,147 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Skip-gram training pairs built with NumPy for whole blocks of lines.
+
+The ids of a block are one flat array. Every position draws its dynamic
+window, all (center, context) pairs of the block come out of one masked
+offset matrix and their negatives out of one sampler call. Pairs keep the
+order of the per-word readers: by center position, then context position.
+"""
+from __future__ import print_function
+
+import numpy as np
+
+BLOCK_TOKENS = 1 << 16
+
+
+def parse_ids(lines):
+    """
+    flat int64 ids and the number of ids of every line
+    """
+    rows = [line.split() for line in lines]
+    lengths = np.fromiter(
+        (len(row) for row in rows), dtype=np.int64, count=len(rows))
+    ids = np.array([int(i) for row in rows for i in row], dtype=np.int64)
+    return ids, lengths
+
+
+def skip_gram_pairs(ids, window_size, lengths=None, rng=np.random):
+    """
+    (center, context) pairs of a line or of a block of lines
+    Args:
+        ids(array): int64 ids, the lines of a block one after another
+        window_size(int): a window of 1..window_size + 1 words is drawn for
+            every position, like the per-word readers do
+        lengths(array): number of ids of every line, one line by default
+    Return:
+        centers, contexts: int64 ndarrays of equal length
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    n = len(ids)
+    if lengths is None:
+        lengths = [n]
+    lengths = np.asarray(lengths, dtype=np.int64)
+    span = window_size + 1
+    windows = rng.randint(1, span + 1, n)
+    ends = np.cumsum(lengths)
+    # first and past-the-end position of the line of every position
+    end = np.repeat(ends, lengths)
+    begin = end - np.repeat(lengths, lengths)
+    offsets = np.concatenate([np.arange(-span, 0),
+                              np.arange(1, span + 1)]).astype(np.int64)
+    pos = np.arange(n, dtype=np.int64)[:, None]
+    context = pos + offsets
+    valid = (np.abs(offsets) <= windows[:, None]) & \
+        (context >= begin[:, None]) & (context < end[:, None])
+    centers = np.broadcast_to(ids[:, None], context.shape)[valid]
+    return centers, ids[context[valid]]
+
+
+class SkipGramBatcher(object):
+    """
+    fixed size batches of skip-gram pairs and their negatives
+    """
+
+    def __init__(self,
+                 batch_size,
+                 window_size,
+                 sampler=None,
+                 neg_num=0,
+                 block_tokens=BLOCK_TOKENS,
+                 drop_last=True,
+                 rng=np.random):
+        """
+        Args:
+            sampler(NegativeSampler): draws neg_num negatives per pair, no
+                negatives when None
+            block_tokens(int): ids parsed and paired together
+            drop_last(bool): drop the final partial batch, as the sample
+                generator of a DataLoader does
+        """
+        self.batch_size = int(batch_size)
+        self.window_size = int(window_size)
+        self.sampler = sampler
+        self.neg_num = int(neg_num)
+        self.block_tokens = block_tokens
+        self.drop_last = drop_last
+        self.rng = rng
+
+    def blocks(self, lines):
+        """
+        (ids, lengths) of blocks of about block_tokens ids
+        """
+        block = []
+        tokens = 0
+        for line in lines:
+            block.append(line)
+            tokens += line.count(" ") + 1
+            if tokens >= self.block_tokens:
+                yield parse_ids(block)
+                block = []
+                tokens = 0
+        if block:
+            yield parse_ids(block)
+
+    def _columns(self, ids, lengths):
+        centers, contexts = skip_gram_pairs(ids, self.window_size, lengths,
+                                            self.rng)
+        columns = [centers, contexts]
+        if self.sampler is not None:
+            columns.append(self.sampler.sample((len(centers), self.neg_num)))
+        return columns
+
+    def generate(self, lines):
+        """
+        Return:
+            iterator of batches, a list of column arrays each: centers,
+            contexts and, with a sampler, [batch_size, neg_num] negatives
+        """
+        pending = None
+        for ids, lengths in self.blocks(lines):
+            columns = self._columns(ids, lengths)
+            if pending is not None:
+                columns = [
+                    np.concatenate([p, c]) for p, c in zip(pending, columns)
+                ]
+            total = len(columns[0])
+            start = 0
+            while start + self.batch_size <= total:
+                stop = start + self.batch_size
+                yield [c[start:stop] for c in columns]
+                start = stop
+            pending = [c[start:] for c in columns]
+        if pending is not None and len(pending[0]) > 0 and \
+                not self.drop_last:
+            yield pending
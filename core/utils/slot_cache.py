@@ -0,0 +1,286 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Binary cache of `slot:feasign` text data.
+
+The text files are parsed once by SlotBatchParser and written as raw
+column files, later epochs np.memmap them and slice batches without any
+text parsing. Layout of a cache directory:
+
+    meta.json           header: slot schema, sample count, dtypes, sources
+    dense.{i}.bin       float32 [num_samples, dim] of the i-th dense slot
+    sparse.{i}.val.bin  int64 feasigns of the i-th sparse slot
+    sparse.{i}.off.bin  uint32/uint64 [num_samples + 1] sample offsets
+"""
+from __future__ import print_function
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from paddlerec.core.utils.file_shard import iter_shards
+from paddlerec.core.utils.file_shard import shard_path
+from paddlerec.core.utils.slot_parser import SlotBatchParser
+
+CACHE_VERSION = 1
+
+
+def cache_key(files, sparse_slots, dense_slots, padding, hash_slots=None):
+    """
+    key of the cache, changes when any input file or the slot config does
+    """
+    md5 = hashlib.md5()
+    md5.update(str(CACHE_VERSION).encode("utf-8"))
+    md5.update(" ".join(sparse_slots.split()).encode("utf-8"))
+    md5.update(" ".join(dense_slots.split()).encode("utf-8"))
+    md5.update(str(padding).encode("utf-8"))
+    if hash_slots:
+        md5.update(" ".join(hash_slots.split()).encode("utf-8"))
+    for shard in sorted(files):
+        path = shard_path(shard)
+        stat = os.stat(path)
+        md5.update("{}:{}:{}".format(
+            os.path.abspath(path), stat.st_mtime, stat.st_size).encode(
+                "utf-8"))
+        if path != shard:
+            md5.update("{}-{}".format(shard[1], shard[2]).encode("utf-8"))
+    return md5.hexdigest()
+
+
+def _describe(shard):
+    path = os.path.abspath(shard_path(shard))
+    if shard_path(shard) == shard:
+        return path
+    return [path, shard[1], shard[2]]
+
+
+class SlotDataCache(object):
+    """
+    compile slot text files into a memory-mapped binary cache
+    """
+
+    def __init__(self,
+                 cache_path,
+                 files,
+                 sparse_slots,
+                 dense_slots,
+                 padding=0,
+                 block_size=8192,
+                 hash_slots=None):
+        self._files = list(files)
+        self._parser = SlotBatchParser(sparse_slots, dense_slots, padding,
+                                       hash_slots)
+        self._block_size = block_size
+        self._dir = os.path.join(cache_path,
+                                 cache_key(self._files, sparse_slots,
+                                           dense_slots, padding, hash_slots))
+        self._meta = None
+        self._columns = None
+
+    @property
+    def cache_dir(self):
+        return self._dir
+
+    def is_ready(self):
+        return os.path.isfile(os.path.join(self._dir, "meta.json"))
+
+    def build(self):
+        """
+        parse the text files into the cache if it does not exist yet
+        """
+        if self.is_ready():
+            return self._dir
+        begin = time.time()
+        tmp_dir = "{}.tmp.{}".format(self._dir, os.getpid())
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+
+        parser = self._parser
+        dense_num = len(parser.dense_slots)
+        sparse_num = len(parser.sparse_slots)
+        dense_out = [
+            open(os.path.join(tmp_dir, "dense.{}.bin".format(i)), "wb")
+            for i in range(dense_num)
+        ]
+        val_out = [
+            open(os.path.join(tmp_dir, "sparse.{}.val.bin".format(i)), "wb")
+            for i in range(sparse_num)
+        ]
+        lengths_out = [
+            open(os.path.join(tmp_dir, "sparse.{}.len.tmp".format(i)), "wb")
+            for i in range(sparse_num)
+        ]
+        num_samples = 0
+        num_values = [0] * sparse_num
+
+        def _flush(lines):
+            columns = parser.parse(lines)
+            for i in range(dense_num):
+                dense_out[i].write(columns[i].astype(np.float32).tobytes())
+            for i in range(sparse_num):
+                values, lengths = columns[dense_num + i]
+                val_out[i].write(values.astype(np.int64).tobytes())
+                lengths_out[i].write(lengths.astype(np.int64).tobytes())
+                num_values[i] += len(values)
+            return len(lines)
+
+        try:
+            lines = []
+            for line in iter_shards(self._files):
+                lines.append(line.rstrip("\n"))
+                if len(lines) == self._block_size:
+                    num_samples += _flush(lines)
+                    lines = []
+            if lines:
+                num_samples += _flush(lines)
+        finally:
+            for f in dense_out + val_out + lengths_out:
+                f.close()
+
+        offset_dtypes = []
+        for i in range(sparse_num):
+            dtype = np.uint32 if num_values[i] < 2**32 else np.uint64
+            len_file = os.path.join(tmp_dir, "sparse.{}.len.tmp".format(i))
+            lengths = np.fromfile(len_file, dtype=np.int64)
+            offsets = np.zeros(num_samples + 1, dtype=dtype)
+            np.cumsum(lengths, out=offsets[1:])
+            offsets.tofile(
+                os.path.join(tmp_dir, "sparse.{}.off.bin".format(i)))
+            os.remove(len_file)
+            offset_dtypes.append(np.dtype(dtype).name)
+
+        meta = {
+            "version": CACHE_VERSION,
+            "num_samples": num_samples,
+            "padding": parser.padding,
+            "dense_slots": parser.dense_slots,
+            "dense_slots_shape": parser.dense_slots_shape,
+            "sparse_slots": parser.sparse_slots,
+            "sparse_num_values": num_values,
+            "sparse_offset_dtypes": offset_dtypes,
+            "files": [_describe(f) for f in self._files],
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        try:
+            os.rename(tmp_dir, self._dir)
+        except OSError:
+            # another worker finished the same cache first
+            shutil.rmtree(tmp_dir)
+        print("slot cache {} built, {} samples, use time: {}".format(
+            self._dir, num_samples, time.time() - begin))
+        return self._dir
+
+    def load(self):
+        """
+        memory-map the cache files, build() them first if needed
+        """
+        if self._columns is not None:
+            return self._meta
+        self.build()
+        with open(os.path.join(self._dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+        num_samples = meta["num_samples"]
+        columns = []
+        for i, shape in enumerate(meta["dense_slots_shape"]):
+            columns.append(
+                self._memmap("dense.{}.bin".format(i), np.float32,
+                             tuple([num_samples] + shape)))
+        for i, num_values in enumerate(meta["sparse_num_values"]):
+            values = self._memmap("sparse.{}.val.bin".format(i), np.int64,
+                                  (num_values, 1))
+            offsets = self._memmap("sparse.{}.off.bin".format(i),
+                                   meta["sparse_offset_dtypes"][i],
+                                   (num_samples + 1, ))
+            columns.append((values, offsets))
+        self._meta = meta
+        self._columns = columns
+        return meta
+
+    def _memmap(self, name, dtype, shape):
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(
+            os.path.join(self._dir, name), dtype=dtype, mode="r", shape=shape)
+
+    def num_samples(self):
+        return self.load()["num_samples"]
+
+    def get_batch(self, begin, end):
+        """
+        samples [begin, end) in the same layout as SlotBatchParser.parse,
+        dense columns and sparse values are views of the memory maps
+        """
+        self.load()
+        batch = []
+        for column in self._columns:
+            if isinstance(column, tuple):
+                values, offsets = column
+                off = offsets[begin:end + 1].astype(np.int64)
+                batch.append((values[off[0]:off[-1]], np.diff(off)))
+            else:
+                batch.append(column[begin:end])
+        return batch
+
+    def take(self, indices):
+        """
+        gather the samples at `indices` (copies), used for shuffled epochs
+        """
+        self.load()
+        indices = np.asarray(indices, dtype=np.int64)
+        batch = []
+        for column in self._columns:
+            if isinstance(column, tuple):
+                values, offsets = column
+                starts = offsets[indices].astype(np.int64)
+                lengths = offsets[indices + 1].astype(np.int64) - starts
+                out_starts = np.cumsum(lengths) - lengths
+                positions = np.arange(lengths.sum()) + np.repeat(
+                    starts - out_starts, lengths)
+                batch.append((values[positions], lengths))
+            else:
+                batch.append(column[indices])
+        return batch
+
+    def generate_batches(self, batch_size, drop_last=True, rng=None):
+        """
+        Args:
+            batch_size(int): samples per batch
+            drop_last(bool): drop the last incomplete batch
+            rng(random.Random): when given, every epoch visits the samples
+                in a new global permutation drawn from it
+        """
+
+        def reader():
+            num_samples = self.num_samples()
+            order = None
+            if rng is not None:
+                order = np.random.RandomState(rng.randint(
+                    0, 2**31 - 1)).permutation(num_samples)
+            for begin in range(0, num_samples, batch_size):
+                end = min(begin + batch_size, num_samples)
+                if end - begin < batch_size and drop_last:
+                    break
+                if order is None:
+                    yield self.get_batch(begin, end)
+                else:
+                    yield self.take(np.sort(order[begin:end]))
+
+        return reader
@@ -0,0 +1,237 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Columnar parser for `slot:feasign` text data.
+
+Parses a block of lines at once into NumPy arrays instead of building
+per-sample tuple lists. Sparse slots come out as a flat int64 value array
+plus per-sample lengths (LoD), dense slots as a padded float32 matrix.
+"""
+from __future__ import print_function
+
+import random
+from functools import reduce
+from operator import mul
+
+import numpy as np
+
+from paddlerec.core.utils.feature_hash import FeatureHasher
+from paddlerec.core.utils.file_shard import iter_shards
+from paddlerec.core.utils.shuffle_buffer import buffered_shuffle
+
+
+def parse_slots_config(sparse_slots, dense_slots):
+    """
+    split the `sparse_slots`/`dense_slots` strings of a dataset config
+    Args:
+        sparse_slots(string): such as "click 1 2 3", "#"/"?"/"" for none
+        dense_slots(string): such as "dense_var:13 img:[2,3]"
+    Return:
+        sparse names(list), dense names(list), dense shapes(list of list)
+    """
+
+    def _split(slots):
+        slots = slots.strip()
+        if slots in ["#", "?", ""]:
+            return []
+        return slots.split()
+
+    sparse = _split(sparse_slots)
+    dense = _split(dense_slots)
+    dense_shapes = [[int(j) for j in i.split(":")[1].strip("[]").split(",")]
+                    for i in dense]
+    dense = [i.split(":")[0] for i in dense]
+    return sparse, dense, dense_shapes
+
+
+class SlotBatchParser(object):
+    """
+    Batch-mode counterpart of `paddlerec.core.reader.SlotReader`.
+    Output columns follow the same slot order: dense slots first, then
+    sparse slots.
+    """
+
+    def __init__(self, sparse_slots, dense_slots, padding=0, hash_slots=None):
+        """
+        Args:
+            hash_slots(string): sparse slots with raw categorical values,
+                hashed column by column, see SlotReader.init
+        """
+        self.sparse_slots, self.dense_slots, self.dense_slots_shape = \
+            parse_slots_config(sparse_slots, dense_slots)
+        self.dense_slots_dim = [
+            reduce(mul, shape) for shape in self.dense_slots_shape
+        ]
+        self.slots = self.dense_slots + self.sparse_slots
+        self.slot2index = dict((s, i) for i, s in enumerate(self.slots))
+        self.padding = padding
+        self.hasher = FeatureHasher(hash_slots)
+
+    def _split_tokens(self, lines):
+        """
+        flatten a block of lines into (line_ids, slot_ids, raw values),
+        tokens of unknown slots or without a value get slot id -1 and are
+        skipped like SlotReader does
+        """
+        split = [l.split() for l in lines]
+        counts = np.fromiter(map(len, split), dtype=np.int64, count=len(lines))
+        tokens = [token.split(":") for tokens in split for token in tokens]
+        slot_ids = np.fromiter(
+            (self.slot2index.get(t[0], -1) if len(t) > 1 and t[1] else -1
+             for t in tokens),
+            dtype=np.int64,
+            count=len(tokens))
+        values = np.array(
+            [t[1] if len(t) > 1 else "" for t in tokens], dtype=object)
+        line_ids = np.repeat(np.arange(len(lines), dtype=np.int64), counts)
+        return line_ids, slot_ids, values
+
+    def parse(self, lines):
+        """
+        parse a block of lines
+        Args:
+            lines(list): `slot:feasign` strings without trailing newline
+        Return:
+            list, one column per slot. dense slot: float32 ndarray with
+            shape [len(lines)] + slot_shape; sparse slot: tuple of
+            (int64 values with shape [N, 1], int64 lengths with shape
+            [len(lines)]), empty samples are filled with `padding`.
+        """
+        n = len(lines)
+        line_ids, slot_ids, values = self._split_tokens(lines)
+
+        order = np.argsort(slot_ids, kind="mergesort")
+        bounds = np.searchsorted(slot_ids[order],
+                                 np.arange(len(self.slots) + 1))
+
+        columns = []
+        for index, slot in enumerate(self.slots):
+            picked = order[bounds[index]:bounds[index + 1]]
+            slot_lines = line_ids[picked]
+            lengths = np.bincount(slot_lines, minlength=n)
+            if index < len(self.dense_slots):
+                columns.append(
+                    self._dense_column(index, n, slot_lines, lengths, values[
+                        picked]))
+            else:
+                columns.append(
+                    self._sparse_column(n, lengths, values[picked], slot))
+        return columns
+
+    def _dense_column(self, index, n, slot_lines, lengths, values):
+        dim = self.dense_slots_dim[index]
+        dense = np.full((n, dim), self.padding, dtype=np.float32)
+        if len(values):
+            starts = np.cumsum(lengths) - lengths
+            pos = np.arange(len(values)) - starts[slot_lines]
+            keep = pos < dim
+            dense[slot_lines[keep], pos[keep]] = values[keep].astype(
+                np.float32)
+        return dense.reshape([n] + self.dense_slots_shape[index])
+
+    def _sparse_column(self, n, lengths, values, slot=None):
+        if slot in self.hasher:
+            feasigns = self.hasher.hash_slot(slot, values)
+        else:
+            feasigns = values.astype(np.int64)
+        empty = lengths == 0
+        if empty.any():
+            starts = np.cumsum(lengths) - lengths
+            feasigns = np.insert(feasigns, starts[empty], self.padding)
+            lengths = lengths.copy()
+            lengths[empty] = 1
+        return feasigns.reshape([-1, 1]), lengths
+
+    def slice_batch(self, columns, begin, end, offsets):
+        """
+        cut samples [begin, end) out of parsed columns without copying
+        Args:
+            columns(list): output of `parse`
+            offsets(list): output of `column_offsets`
+        """
+        batch = []
+        for index, column in enumerate(columns):
+            if index < len(self.dense_slots):
+                batch.append(column[begin:end])
+            else:
+                values, lengths = column
+                off = offsets[index]
+                batch.append((values[off[begin]:off[end]], lengths[begin:end]))
+        return batch
+
+    def column_offsets(self, columns):
+        offsets = []
+        for index, column in enumerate(columns):
+            if index < len(self.dense_slots):
+                offsets.append(None)
+            else:
+                lengths = column[1]
+                off = np.zeros(len(lengths) + 1, dtype=np.int64)
+                np.cumsum(lengths, out=off[1:])
+                offsets.append(off)
+        return offsets
+
+    def generate_batches(self,
+                         files,
+                         batch_size,
+                         block_size=None,
+                         drop_last=True,
+                         shuffle_buffer_size=0,
+                         rng=random,
+                         decompress="inline"):
+        """
+        read `files` in blocks and yield batches of columns
+        Args:
+            files(list): slot-format text files or (path, start, end)
+                byte ranges of them
+            batch_size(int): samples per batch
+            block_size(int): lines parsed at once, rounded to batch_size
+            drop_last(bool): drop the last incomplete batch, the same as
+                DataLoader.set_sample_generator
+            shuffle_buffer_size(int): shuffle lines through a buffer of
+                this size before parsing, 0 keeps the file order
+            rng: random source of the shuffle buffer
+            decompress(string): inline, thread or process inflating of
+                compressed files
+        """
+        if block_size is None:
+            block_size = 1024
+        block_size = max(batch_size, block_size // batch_size * batch_size)
+
+        def _flush(lines):
+            columns = self.parse(lines)
+            offsets = self.column_offsets(columns)
+            for begin in range(0, len(lines), batch_size):
+                end = min(begin + batch_size, len(lines))
+                if end - begin < batch_size and drop_last:
+                    break
+                yield self.slice_batch(columns, begin, end, offsets)
+
+        def _lines():
+            for line in iter_shards(files, decompress):
+                yield line.rstrip("\n")
+
+        def reader():
+            lines = []
+            for line in buffered_shuffle(_lines(), shuffle_buffer_size, rng):
+                lines.append(line)
+                if len(lines) == block_size:
+                    for batch in _flush(lines):
+                        yield batch
+                    lines = []
+            if lines:
+                for batch in _flush(lines):
+                    yield batch
+
+        return reader
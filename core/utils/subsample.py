@@ -0,0 +1,166 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Frequent word subsampling of a text corpus into id lines, as in word2vec.
+
+A word counted c times in a corpus of T tokens is kept with probability
+(sqrt(c / (s * T)) + 1) * s * T / c for a sample rate s. The probabilities
+are computed once per id, a chunk of lines is mapped to one id array and
+subsampled with one random draw, and the files are converted by a pool of
+processes, one file per task.
+"""
+from __future__ import print_function
+
+import io
+import multiprocessing
+import sys
+from itertools import chain, repeat
+
+import numpy as np
+
+PY3 = sys.version_info[0] >= 3
+
+if not PY3:
+    from itertools import imap as map
+
+CHUNK_LINES = 10000
+
+_STATE = {}
+
+
+def keep_probs(counts, sample):
+    """
+    keep probability of every id, above 1 for rare words that are always
+    kept
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    threshold = sample * counts.sum()
+    with np.errstate(divide="ignore"):
+        return (np.sqrt(counts / threshold) + 1) * threshold / counts
+
+
+def subsample_lines(lines, tokenize, index, probs, unk_id, rng=np.random):
+    """
+    Args:
+        tokenize: line -> list of words
+        index(dict): word -> id, unknown words get unk_id
+        probs(array): keep probability of every id
+    Return:
+        list of the kept ids of every line joined by spaces, lines that
+        keep no word are left out
+        number of words read and number of words kept
+    """
+    rows = [tokenize(line) for line in lines]
+    lengths = np.fromiter(
+        (len(row) for row in rows), dtype=np.int64, count=len(rows))
+    ids = np.fromiter(
+        map(index.get, chain.from_iterable(rows), repeat(unk_id)),
+        dtype=np.int64,
+        count=int(lengths.sum()))
+    keep = rng.random_sample(len(ids)) <= probs[ids]
+    line_of = np.repeat(np.arange(len(rows)), lengths)[keep]
+    ends = np.cumsum(np.bincount(line_of, minlength=len(rows))).tolist()
+    words = list(map(str, ids[keep].tolist()))
+    out = []
+    start = 0
+    for end in ends:
+        if end > start:
+            out.append(u" ".join(words[start:end]))
+        start = end
+    return out, len(ids), len(words)
+
+
+def _init_worker(state):
+    _STATE.update(state)
+
+
+def _subsample_file(task):
+    in_path, out_path, seed = task
+    rng = np.random.RandomState(seed)
+    read = written = 0
+    with io.open(in_path, encoding="utf-8") as rf, \
+            io.open(out_path, "w", encoding="utf-8") as wf:
+        chunk = []
+        for line in rf:
+            chunk.append(line)
+            if len(chunk) < CHUNK_LINES:
+                continue
+            read, written = _write_chunk(chunk, wf, rng, read, written)
+            chunk = []
+        if chunk:
+            read, written = _write_chunk(chunk, wf, rng, read, written)
+    return in_path, read, written
+
+
+def _write_chunk(chunk, wf, rng, read, written):
+    lines, num, kept = subsample_lines(chunk, _STATE["tokenize"],
+                                       _STATE["index"], _STATE["probs"],
+                                       _STATE["unk_id"], rng)
+    if lines:
+        wf.write(u"\n".join(lines) + u"\n")
+    return read + num, written + kept
+
+
+def subsample_files(files,
+                    output_paths,
+                    tokenize,
+                    index,
+                    probs,
+                    unk_id,
+                    workers=None,
+                    seed=None):
+    """
+    subsample every file of files into the id lines of its output path
+    Args:
+        tokenize: line -> list of words, picklable (module level function)
+            when workers > 1
+        workers(int): processes, all cpus by default
+        seed(int): base seed, file i draws with seed + i, None for random
+    Return:
+        total words read, total words written
+    """
+    state = {
+        "tokenize": tokenize,
+        "index": index,
+        "probs": np.asarray(probs, dtype=np.float64),
+        "unk_id": unk_id
+    }
+    tasks = [(f, o, None if seed is None else (seed + i) % (2**32))
+             for i, (f, o) in enumerate(zip(files, output_paths))]
+    workers = min(workers or multiprocessing.cpu_count(), len(tasks))
+    total_read = total_written = 0
+    if workers <= 1:
+        _init_worker(state)
+        results = (_subsample_file(task) for task in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(
+            workers, initializer=_init_worker, initargs=(state, ))
+        results = pool.imap_unordered(_subsample_file, tasks)
+    try:
+        for done, (path, read, written) in enumerate(results, 1):
+            total_read += read
+            total_written += written
+            print("subsample: {}/{} files, {} kept {} of {} words".format(
+                done, len(tasks), path, written, read))
+        if pool is not None:
+            pool.close()
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+    return total_read, total_written
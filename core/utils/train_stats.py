@@ -0,0 +1,191 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Per-batch timings of the training loop by stage.
+
+    reader_wait  waiting for the next batch of an iterable DataLoader
+    run          exe.run, which also waits for data when the DataLoader
+                 feeds the program itself
+    fetch        converting the fetched variables to numpy
+
+The timings are summed up per print interval and per epoch into
+percentiles, batches/sec and samples/sec, and written as one JSON object
+per line when an output path is given.
+"""
+from __future__ import print_function
+
+import json
+import os
+import time
+from array import array
+
+import numpy as np
+
+STAGES = ["reader_wait", "run", "fetch"]
+PERCENTILES = [50, 90, 99]
+
+
+def percentiles(values):
+    """
+    p50/p90/p99, max and total of a list of seconds
+    """
+    values = np.asarray(values, dtype=np.float64)
+    res = dict(
+        ("p{}".format(q), float(v))
+        for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)))
+    res["max"] = float(values.max())
+    res["total"] = float(values.sum())
+    return res
+
+
+class TrainStats(object):
+    """
+    stage timings of the batches of one phase
+    """
+
+    def __init__(self, output_path=None, phase="phase", batch_size=None):
+        """
+        Args:
+            output_path(string): JSON lines file, appended to, no output if
+                None
+            batch_size(int): samples of a batch when record is not told,
+                samples/sec is left out when neither is known
+        """
+        self.phase = phase
+        self.batch_size = batch_size
+        self.epoch = -1
+        self.output_path = output_path
+        if output_path:
+            out_dir = os.path.dirname(output_path)
+            if out_dir and not os.path.isdir(out_dir):
+                os.makedirs(out_dir)
+        self._epoch = self._interval = None
+
+    def _new_part(self):
+        return {
+            "begin": time.time(),
+            "batches": 0,
+            "samples": 0,
+            "samples_known": True,
+            "stages": dict((stage, array("d")) for stage in STAGES),
+            "polled": 0,
+            "empty": 0
+        }
+
+    def begin_epoch(self):
+        self.epoch += 1
+        self._epoch = self._new_part()
+        self._interval = self._new_part()
+
+    def record(self, samples=None, queue_size=None, **seconds):
+        """
+        timings of one batch
+        Args:
+            samples(int): samples of the batch, batch_size by default
+            queue_size(int): batches waiting in the reader queue before
+                the batch, to count the starved ones
+            seconds: seconds of the batch by stage name
+        """
+        if samples is None:
+            samples = self.batch_size
+        for part in (self._epoch, self._interval):
+            part["batches"] += 1
+            if samples is None:
+                part["samples_known"] = False
+            else:
+                part["samples"] += samples
+            for stage, value in seconds.items():
+                part["stages"][stage].append(value)
+            if queue_size is not None:
+                part["polled"] += 1
+                part["empty"] += int(queue_size == 0)
+
+    def _summary(self, kind, part, **extra):
+        now = time.time()
+        seconds = now - part["begin"]
+        res = {
+            "type": kind,
+            "phase": self.phase,
+            "epoch": self.epoch,
+            "time": now,
+            "seconds": seconds,
+            "batches": part["batches"],
+            "samples": None
+        }
+        if part["batches"] and part["samples_known"]:
+            res["samples"] = part["samples"]
+        res.update(extra)
+        if seconds > 0:
+            # left out rather than 0 when the loop did not count them, as
+            # in train_from_dataset
+            if res["batches"]:
+                res["batches_per_sec"] = res["batches"] / seconds
+            if res["samples"]:
+                res["samples_per_sec"] = res["samples"] / seconds
+        for stage, values in part["stages"].items():
+            if len(values):
+                res[stage] = percentiles(values)
+        if part["polled"]:
+            res["queue_empty_ratio"] = float(part["empty"]) / part["polled"]
+        self._write(res)
+        return res
+
+    def interval(self, batch_id):
+        """
+        summary of the batches since the last interval
+        """
+        res = self._summary("interval", self._interval, batch_id=batch_id)
+        self._interval = self._new_part()
+        return res
+
+    def end_epoch(self, **extra):
+        """
+        summary of the epoch, extra fields such as samples override the
+        counted ones
+        """
+        return self._summary("epoch", self._epoch, **extra)
+
+    def _write(self, res):
+        # opened per summary, nothing is left open when training fails
+        if self.output_path:
+            with open(self.output_path, "a") as f:
+                f.write(json.dumps(res, sort_keys=True) + "\n")
+
+
+def format_summary(res):
+    """
+    one log line of a summary
+    """
+    title = "{} epoch {}".format(res["phase"], res["epoch"])
+    if "batch_id" in res:
+        title += " batch {}".format(res["batch_id"])
+    if res["batches"]:
+        parts = [
+            "{}: {} batches in {:.2f}s".format(title, res["batches"],
+                                               res["seconds"])
+        ]
+    else:
+        parts = ["{}: {:.2f}s".format(title, res["seconds"])]
+    if "batches_per_sec" in res:
+        parts.append("{:.1f} batches/sec".format(res["batches_per_sec"]))
+    if "samples_per_sec" in res:
+        parts.append("{:.1f} samples/sec".format(res["samples_per_sec"]))
+    for stage in STAGES:
+        if stage in res:
+            parts.append("{} p50/p99: {:.2f}/{:.2f}ms".format(
+                stage, res[stage]["p50"] * 1000, res[stage]["p99"] * 1000))
+    if "queue_empty_ratio" in res:
+        parts.append("reader queue empty: {:.1f}%".format(
+            100 * res["queue_empty_ratio"]))
+    return ", ".join(parts)
@@ -0,0 +1,231 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Parallel vocabulary and feature dictionary building.
+
+The input files are cut into newline aligned byte chunks, a process pool
+counts the tokens of every chunk and the chunk counters are merged, so
+min-count/top-K thresholds apply to the global counts. A vocabulary is
+saved as a compact .npz (utf-8 token bytes, offsets and counts) and can
+be exported as the "token count" / "token id" text files read by the
+model readers.
+"""
+from __future__ import print_function
+
+import io
+import multiprocessing
+import os
+import sys
+from collections import Counter
+from itertools import chain, repeat
+
+import numpy as np
+
+from paddlerec.core.utils.file_shard import iter_lines, split_by_bytes
+
+PY3 = sys.version_info[0] >= 3
+
+CHUNK_BYTES = 64 << 20
+
+if not PY3:
+    from itertools import imap as map
+
+
+def whitespace_tokens(line):
+    return line.split()
+
+
+def column_tokens(line, columns, sep="\t"):
+    """
+    non-empty values of the given columns of a line, use with
+    functools.partial to get a picklable tokenizer
+    """
+    features = line.rstrip("\n").split(sep)
+    return [features[i] for i in columns if features[i] != ""]
+
+
+def plan_chunks(files, chunk_bytes=CHUNK_BYTES, min_chunks=1):
+    """
+    newline aligned (path, start, end) chunks of at most about chunk_bytes,
+    compressed files are whole chunks
+    """
+    total = sum(os.path.getsize(f) for f in files)
+    num = max(min_chunks, (total + chunk_bytes - 1) // chunk_bytes, 1)
+    return [chunk for plan in split_by_bytes(files, num) for chunk in plan]
+
+
+def _count_chunk(task):
+    chunk, tokenize = task
+    return Counter(chain.from_iterable(map(tokenize, iter_lines(chunk))))
+
+
+def count_tokens(files,
+                 tokenize=whitespace_tokens,
+                 workers=None,
+                 chunk_bytes=CHUNK_BYTES):
+    """
+    count the tokens of all lines of files
+    Args:
+        files(list): local text files, gzip/bz2/xz ones are read whole
+        tokenize: line -> list of tokens, picklable (module level function
+            or functools.partial of one) when workers > 1
+        workers(int): processes, all cpus by default
+        chunk_bytes(int): upper bound of the bytes counted by one task
+    Return:
+        Counter
+    """
+    workers = workers or multiprocessing.cpu_count()
+    tasks = [(chunk, tokenize)
+             for chunk in plan_chunks(files, chunk_bytes, workers)]
+    counter = Counter()
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            counter.update(_count_chunk(task))
+        return counter
+
+    pool = multiprocessing.Pool(min(workers, len(tasks)))
+    try:
+        parts = pool.imap_unordered(_count_chunk, tasks)
+        for done, part in enumerate(parts, 1):
+            counter.update(part)
+            print("vocab: {}/{} chunks counted, {} distinct tokens".format(
+                done, len(tasks), len(counter)))
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return counter
+
+
+def build_vocab(counter,
+                min_count=1,
+                max_size=None,
+                order="count",
+                unk_token=None):
+    """
+    Args:
+        counter(dict): token -> count
+        min_count(int): keep tokens counted at least min_count times
+        max_size(int): keep at most max_size tokens, the most frequent ones
+        order(string): "count" for the most frequent first, ties by token,
+            "token" for sorted tokens
+        unk_token: if given, added with the total count of the dropped
+            tokens and ordered like the other tokens
+    Return:
+        Vocab, its oov_count is the total count of the dropped tokens
+    """
+    if order not in ("count", "token"):
+        raise ValueError(
+            "vocab order must be count or token, got {}".format(order))
+    kept = [(token, count) for token, count in counter.items()
+            if count >= min_count]
+    if max_size is not None and len(kept) > max_size:
+        kept.sort(key=lambda item: (-item[1], item[0]))
+        kept = kept[:max_size]
+    oov_count = sum(counter.values()) - sum(count for _, count in kept)
+    if unk_token is not None:
+        kept = [item for item in kept if item[0] != unk_token]
+        kept.append((unk_token, oov_count + counter.get(unk_token, 0)))
+    if order == "count":
+        kept.sort(key=lambda item: (-item[1], item[0]))
+    else:
+        kept.sort()
+    vocab = Vocab([token for token, _ in kept], [count for _, count in kept])
+    vocab.oov_count = oov_count
+    return vocab
+
+
+def _encode(token):
+    return token if isinstance(token, bytes) else token.encode("utf-8")
+
+
+def _decode(data):
+    return data.decode("utf-8")
+
+
+class Vocab(object):
+    """
+    tokens with their counts, the id of a token is its position
+    """
+
+    def __init__(self, tokens, counts=None):
+        self.tokens = list(tokens)
+        if counts is None:
+            self.counts = np.zeros(len(self.tokens), dtype=np.int64)
+        else:
+            self.counts = np.asarray(counts, dtype=np.int64)
+        self.oov_count = 0
+        self._index = None
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, token):
+        return token in self.index
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = dict((t, i) for i, t in enumerate(self.tokens))
+        return self._index
+
+    def lookup(self, tokens, default=-1):
+        """
+        int64 ids of tokens, default for unknown ones
+        """
+        return np.fromiter(
+            map(self.index.get, tokens, repeat(default)), dtype=np.int64)
+
+    def save(self, path):
+        """
+        write the compact binary form
+        """
+        encoded = [_encode(t) for t in self.tokens]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                tokens=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                offsets=offsets,
+                counts=self.counts,
+                oov_count=np.int64(self.oov_count))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        blob = data["tokens"].tobytes()
+        offsets = data["offsets"]
+        tokens = [
+            _decode(blob[offsets[i]:offsets[i + 1]])
+            for i in range(len(offsets) - 1)
+        ]
+        vocab = cls(tokens, data["counts"])
+        vocab.oov_count = int(data["oov_count"])
+        return vocab
+
+    def export_text(self, path, value="count", mode="w"):
+        """
+        write "token count" (value="count") or "token id" (value="id")
+        lines, mode="a" appends to an existing file
+        """
+        if value not in ("count", "id"):
+            raise ValueError(
+                "export value must be count or id, got {}".format(value))
+        values = self.counts if value == "count" else range(len(self.tokens))
+        with io.open(path, mode, encoding="utf-8") as f:
+            for token, v in zip(self.tokens, values):
+                f.write(u"{} {}\n".format(_decode(_encode(token)), v))
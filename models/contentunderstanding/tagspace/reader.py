@@ -14,38 +14,29 @@
 
 import sys
 
-import numpy as np
-
 from paddlerec.core.reader import ReaderBase
+from paddlerec.core.utils.negative_sampler import NegativeSampler
 
 
 class Reader(ReaderBase):
     def init(self):
-        pass
+        self.tag_size = 4
+        self.neg_size = 3
+        if self.tag_size < 2:
+            print("error : only one class")
+            sys.exit(0)
+        self.sampler = NegativeSampler(
+            num_items=self.tag_size, strategy="uniform")
 
     def _process_line(self, l):
-        tag_size = 4
-        neg_size = 3
         l = l.strip().split(",")
         pos_index = int(l[0])
         pos_tag = []
         pos_tag.append(pos_index)
         text_raw = l[1].split()
         text = [int(w) for w in text_raw]
-        neg_tag = []
-        max_iter = 100
-        now_iter = 0
-        sum_n = 0
-        while (sum_n < neg_size):
-            now_iter += 1
-            if now_iter > max_iter:
-                print("error : only one class")
-                sys.exit(0)
-            rand_i = np.random.randint(0, tag_size)
-            if rand_i != pos_index:
-                neg_index = rand_i
-                neg_tag.append(neg_index)
-                sum_n += 1
+        neg_tag = self.sampler.sample(
+            self.neg_size, exclude=[pos_index]).tolist()
         return text, pos_tag, neg_tag
 
     def generate_sample(self, line):
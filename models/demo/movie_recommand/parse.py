@@ -7,6 +7,8 @@ import json
 import numpy as np
 import operator
 
+from paddlerec.core.utils.feature_hash import stable_hash
+
 user_fea = ["userid", "gender", "age", "occupation"]
 movie_fea = ["movieid", "title", "genres"]
 rating_fea = ["userid", "movieid", "rating", "time"]
@@ -48,9 +50,9 @@ def parse_data(file_name, feas):
 
 def to_hash(feas, arr):
     out_str = "%s:%s" % (feas, (arr + arr[::-1] + arr[::-2] + arr[::-3]))
-    hash_id = hash(out_str) % dict_size
+    hash_id = stable_hash(out_str, dict_size)
     if hash_id in hash_dict and hash_dict[hash_id] != out_str:
-        print(hash_id, out_str, hash(out_str), hash_dict[hash_id])
+        print(hash_id, out_str, hash_dict[hash_id])
         print("conflict")
         exit(-1)
     hash_dict[hash_id] = out_str
@@ -14,9 +14,11 @@
 
 import os
 import numpy
-from collections import Counter
 import shutil
 import pickle
+from functools import partial
+
+from paddlerec.core.utils.vocab import build_vocab, column_tokens, count_tokens
 
 
 def get_raw_data():
@@ -62,27 +64,19 @@ def split_data():
 def get_feat_dict():
     freq_ = 10
     dir_feat_dict_ = 'aid_data/feat_dict_' + str(freq_) + '.pkl2'
+    dir_feat_vocab_ = 'aid_data/feat_vocab_' + str(freq_) + '.npz'
     continuous_range_ = range(1, 14)
     categorical_range_ = range(14, 40)
 
     if not os.path.exists(dir_feat_dict_):
-        # print('generate a feature dict')
-        # Count the number of occurrences of discrete features
-        feat_cnt = Counter()
-        with open('train.txt', 'r') as fin:
-            for line_idx, line in enumerate(fin):
-                if line_idx % 100000 == 0:
-                    print('generating feature dict', line_idx / 45000000)
-                features = line.rstrip('\n').split('\t')
-                for idx in categorical_range_:
-                    if features[idx] == '': continue
-                    feat_cnt.update([features[idx]])
-
-        # Only retain discrete features with high frequency 
-        dis_feat_set = set()
-        for feat, ot in feat_cnt.items():
-            if ot >= freq_:
-                dis_feat_set.add(feat)
+        # Count the number of occurrences of discrete features, chunks of
+        # train.txt are counted in parallel
+        tokenize = partial(column_tokens, columns=categorical_range_)
+        feat_cnt = count_tokens(['train.txt'], tokenize)
+
+        # Only retain discrete features with high frequency
+        feat_vocab = build_vocab(feat_cnt, min_count=freq_)
+        feat_vocab.save(dir_feat_vocab_)
 
         # Create a dictionary for continuous and discrete features
         feat_dict = {}
@@ -91,7 +85,7 @@ def get_feat_dict():
         for idx in continuous_range_:
             feat_dict[idx] = tc
             tc += 1
-        for feat in dis_feat_set:
+        for feat in feat_vocab.tokens:
             feat_dict[feat] = tc
             tc += 1
         # Save dictionary
@@ -16,6 +16,8 @@ from __future__ import print_function
 import random
 import pickle
 
+from paddlerec.core.utils.negative_sampler import NegativeSampler
+
 random.seed(1234)
 
 print("read and process data")
@@ -25,18 +27,20 @@ with open('./raw_data/remap.pkl', 'rb') as f:
     cate_list = pickle.load(f)
     user_count, item_count, cate_count, example_count = pickle.load(f)
 
+sampler = NegativeSampler(num_items=item_count, strategy="uniform", seed=1234)
+
 train_set = []
 test_set = []
-for reviewerID, hist in reviews_df.groupby('reviewerID'):
-    pos_list = hist['asin'].tolist()
-
-    def gen_neg():
-        neg = pos_list[0]
-        while neg in pos_list:
-            neg = random.randint(0, item_count - 1)
-        return neg
-
-    neg_list = [gen_neg() for i in range(len(pos_list))]
+users = [(reviewerID, hist['asin'].tolist())
+         for reviewerID, hist in reviews_df.groupby('reviewerID')]
+# one negative per position, none of them clicked by the user, all users
+# drawn together
+pos_lists = [pos_list for _, pos_list in users]
+negs = sampler.sample_rows([len(p) for p in pos_lists], pos_lists).tolist()
+offset = 0
+for reviewerID, pos_list in users:
+    neg_list = negs[offset:offset + len(pos_list)]
+    offset += len(pos_list)
 
     for i in range(1, len(pos_list)):
         hist = pos_list[:i]
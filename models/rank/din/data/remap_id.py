@@ -17,6 +17,8 @@ import random
 import pickle
 import numpy as np
 
+from paddlerec.core.utils.vocab import build_vocab
+
 random.seed(1234)
 
 with open('./raw_data/reviews.pkl', 'rb') as f:
@@ -29,10 +31,11 @@ with open('./raw_data/meta.pkl', 'rb') as f:
 
 
 def build_map(df, col_name):
-    key = sorted(df[col_name].unique().tolist())
-    m = dict(zip(key, range(len(key))))
-    df[col_name] = df[col_name].map(lambda x: m[x])
-    return m, key
+    # ids follow the sorted keys, the map is also kept in binary form
+    vocab = build_vocab(df[col_name].value_counts().to_dict(), order="token")
+    vocab.save('./raw_data/%s_vocab.npz' % col_name)
+    df[col_name] = vocab.lookup(df[col_name].values)
+    return vocab.index, vocab.tokens
 
 
 asin_map, asin_key = build_map(meta_df, 'asin')
@@ -13,9 +13,6 @@
 # limitations under the License.
 from __future__ import print_function
 
-import os
-import random
-
 try:
     import cPickle as pickle
 except ImportError:
@@ -25,6 +22,19 @@ import numpy as np
 
 from paddlerec.core.reader import ReaderBase
 from paddlerec.core.utils import envs
+from paddlerec.core.utils.data_meta import load_meta
+from paddlerec.core.utils.length_bucket import LengthBucketBatcher
+from paddlerec.core.utils.line_index import shuffled_samples
+
+
+def din_fields(line):
+    line = line.strip().split(';')
+    return {
+        "hist": line[0].split(),
+        "cate": line[1].split(),
+        "target_item": [line[2]],
+        "target_cate": [line[3]]
+    }
 
 
 class Reader(ReaderBase):
@@ -32,23 +42,13 @@ class Reader(ReaderBase):
         self.train_data_path = envs.get_global_env(
             "dataset.sample_1.data_path", None)
         self.res = []
-        self.max_len = 0
-
-        data_file_list = os.listdir(self.train_data_path)
-        for i in range(0, len(data_file_list)):
-            train_data_file = os.path.join(self.train_data_path,
-                                           data_file_list[i])
-            with open(train_data_file, "r") as fin:
-                for line in fin:
-                    line = line.strip().split(';')
-                    hist = line[0].split()
-                    self.max_len = max(self.max_len, len(hist))
-        fo = open("tmp.txt", "w")
-        fo.write(str(self.max_len))
-        fo.close()
+        # longest history from the dataset meta sidecar, indexed on first use
+        meta = load_meta(self.train_data_path, parse=din_fields, parser="din")
+        self.max_len = meta.max_len("hist")
         self.batch_size = envs.get_global_env("dataset.sample_1.batch_size",
                                               32, "train.reader")
         self.group_size = self.batch_size * 20
+        self.seed = envs.get_global_env("dataset.sample_1.seed", None)
 
     def _process_line(self, line):
         line = line.strip().split(';')
@@ -97,40 +97,23 @@ class Reader(ReaderBase):
         return res
 
     def batch_reader(self, reader, batch_size, group_size):
+        batcher = LengthBucketBatcher(batch_size, group_size=group_size)
+
         def batch_reader():
-            bg = []
-            for line in reader:
-                bg.append(line)
-                if len(bg) == group_size:
-                    sortb = sorted(bg, key=lambda x: len(x[0]), reverse=False)
-                    bg = []
-                    for i in range(0, group_size, batch_size):
-                        b = sortb[i:i + batch_size]
-                        yield self.make_data(b)
-            len_bg = len(bg)
-            if len_bg != 0:
-                sortb = sorted(bg, key=lambda x: len(x[0]), reverse=False)
-                bg = []
-                remain = len_bg % batch_size
-                for i in range(0, len_bg - remain, batch_size):
-                    b = sortb[i:i + batch_size]
-                    yield self.make_data(b)
+            for b in batcher.bucket(reader()):
+                yield self.make_data(b)
 
         return batch_reader
 
-    def base_read(self, file_dir):
-        res = []
-        for train_file in file_dir:
-            with open(train_file, "r") as fin:
-                for line in fin:
-                    line = line.strip().split(';')
-                    hist = line[0].split()
-                    cate = line[1].split()
-                    res.append([hist, cate, line[2], line[3], float(line[4])])
-        return res
+    def parse_line(self, line):
+        line = line.strip().split(';')
+        hist = line[0].split()
+        cate = line[1].split()
+        return [hist, cate, line[2], line[3], float(line[4])]
 
     def generate_batch_from_trainfiles(self, files):
-        data_set = self.base_read(files)
-        random.shuffle(data_set)
-        return self.batch_reader(data_set, self.batch_size,
+        # a new global order every epoch, lines are read through the line
+        # offset index instead of being held in memory
+        samples = shuffled_samples(files, self.parse_line, self.seed)
+        return self.batch_reader(samples, self.batch_size,
                                  self.batch_size * 20)
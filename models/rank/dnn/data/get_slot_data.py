@@ -12,14 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
 import paddle.fluid.incubate.data_generator as dg
 
+from paddlerec.core.utils.feature_hash import hash_ids, slot_seed
+
 cont_min_ = [0, -3, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
 cont_max_ = [20, 600, 100, 50, 64000, 500, 100, 50, 500, 10, 10, 10, 50]
 cont_diff_ = [20, 603, 100, 50, 64000, 500, 100, 50, 500, 10, 10, 10, 50]
 hash_dim_ = 1000001
 continuous_range_ = range(1, 14)
 categorical_range_ = range(14, 40)
+# stable per-column salts, python's hash() of str changes every process
+categorical_seeds_ = np.array(
+    [slot_seed(str(idx)) for idx in categorical_range_], dtype=np.uint64)
 
 
 class CriteoDataset(dg.MultiSlotDataGenerator):
@@ -47,9 +53,9 @@ class CriteoDataset(dg.MultiSlotDataGenerator):
                     dense_feature.append(
                         (float(features[idx]) - cont_min_[idx - 1]) /
                         cont_diff_[idx - 1])
-            for idx in categorical_range_:
-                sparse_feature.append(
-                    [hash(str(idx) + features[idx]) % hash_dim_])
+            categorical = [features[idx] for idx in categorical_range_]
+            sparse_ids = hash_ids(categorical, categorical_seeds_, hash_dim_)
+            sparse_feature = [[i] for i in sparse_ids.tolist()]
             label = [int(features[0])]
             process_line = dense_feature, sparse_feature, label
             feature_name = ["dense_feature"]
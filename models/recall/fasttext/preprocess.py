@@ -14,14 +14,16 @@
 # limitations under the License.
 
 import io
-import math
 import os
-import random
 import re
 import six
 
 import argparse
 
+from paddlerec.core.utils.corpus_split import resplit
+from paddlerec.core.utils.subsample import keep_probs, subsample_files
+from paddlerec.core.utils.vocab import build_vocab, count_tokens
+
 prog = re.compile("[^a-z ]", flags=0)
 
 
@@ -62,16 +64,38 @@ def parse_args():
     )
     parser.add_argument('--min_n', type=int, default=3, help="min_n of ngrams")
     parser.add_argument('--max_n', type=int, default=5, help="max_n of ngrams")
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help="processes counting words for build_dict or converting files "
+        "for filter_corpus, all cpus by default")
     parser.add_argument(
         '--file_nums',
         type=int,
         default=1024,
         help="re-split input corpus file nums")
+    parser.add_argument(
+        '--split_mode',
+        type=str,
+        default='bytes',
+        help="re-split into contiguous parts of equal size (bytes) or "
+        "line by line (round_robin)")
+    parser.add_argument(
+        '--shuffle_window',
+        type=int,
+        default=0,
+        help="lines shuffled together while re-splitting, 0 to keep order")
     parser.add_argument(
         '--downsample',
         type=float,
         default=0.001,
         help="filter word by downsample")
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help="seed of the downsample draws, random by default")
     parser.add_argument(
         '--filter_corpus',
         action='store_true',
@@ -95,6 +119,11 @@ def text_strip(text):
     return prog.sub("", text.lower())
 
 
+def text_words(line):
+    words = text_strip(native_to_unicode(line)).split()
+    return ['<' + item + '>' for item in words]
+
+
 # Shameless copy from Tensorflow https://github.com/tensorflow/tensor2tensor/blob/master/tensor2tensor/data_generators/text_encoder.py
 # Unicode utility functions that work with Python 2 and 3
 def native_to_unicode(s):
@@ -128,20 +157,16 @@ def filter_corpus(args):
     """
     filter corpus and convert id.
     """
-    word_count = dict()
     word_to_id_ = dict()
-    word_all_count = 0
     id_counts = []
     word_id = 0
-    # read dict
+    # read dict, a word that is also an ngram keeps the id of its word row
     with io.open(args.dict_path, 'r', encoding='utf-8') as f:
         for line in f:
             word, count = line.split()[0], int(line.split()[1])
-            word_count[word] = count
-            word_to_id_[word] = word_id
+            word_to_id_.setdefault(word, word_id)
             word_id += 1
             id_counts.append(count)
-            word_all_count += count
 
     word_ngrams = dict()
     with io.open(args.ngrams_path, 'r', encoding='utf-8') as f:
@@ -160,41 +185,25 @@ def filter_corpus(args):
     with io.open(args.word_id_path, 'w+', encoding='utf-8') as fid:
         for k, v in word_to_id_.items():
             fid.write(k + " " + str(v) + '\n')
-    # filter corpus and convert id
+    # filter corpus and convert id, one process per input file
     if not os.path.exists(args.output_corpus_dir):
         os.makedirs(args.output_corpus_dir)
-    for file in os.listdir(args.input_corpus_dir):
-        with io.open(args.output_corpus_dir + '/convert_' + file + '.csv',
-                     "w") as wf:
-            with io.open(
-                    args.input_corpus_dir + '/' + file,
-                    encoding='utf-8') as rf:
-                print(args.input_corpus_dir + '/' + file)
-                for line in rf:
-                    signal = False
-                    line = text_strip(line)
-                    words = line.split()
-                    write_line = ""
-                    for item in words:
-                        if item in word_count:
-                            idx = word_to_id_[item]
-                        else:
-                            idx = word_to_id_[native_to_unicode('<UNK>')]
-                        count_w = id_counts[idx]
-                        corpus_size = word_all_count
-                        keep_prob = (
-                            math.sqrt(count_w /
-                                      (args.downsample * corpus_size)) + 1
-                        ) * (args.downsample * corpus_size) / count_w
-                        r_value = random.random()
-                        if r_value > keep_prob:
-                            continue
-                        write_line += str(idx)
-                        write_line += " "
-                        signal = True
-                    if signal:
-                        write_line = write_line[:-1] + "\n"
-                        wf.write(_to_unicode(write_line))
+    files = sorted(os.listdir(args.input_corpus_dir))
+    input_files = [os.path.join(args.input_corpus_dir, f) for f in files]
+    output_files = [
+        os.path.join(args.output_corpus_dir, 'convert_' + f + '.csv')
+        for f in files
+    ]
+    unk_id = word_to_id_[native_to_unicode('<UNK>')]
+    subsample_files(
+        input_files,
+        output_files,
+        text_words,
+        word_to_id_,
+        keep_probs(id_counts, args.downsample),
+        unk_id,
+        workers=args.workers,
+        seed=args.seed)
 
 
 def computeSubwords(word, min_n, max_n):
@@ -214,36 +223,21 @@ def build_dict(args):
     :param min_count:
     :return:
     """
-    # word to count
-
-    word_count = dict()
-
-    for file in os.listdir(args.build_dict_corpus_dir):
-        with io.open(
-                args.build_dict_corpus_dir + "/" + file,
-                encoding='utf-8') as f:
-            print("build dict : ", args.build_dict_corpus_dir + "/" + file)
-            for line in f:
-                line = text_strip(line)
-                words = line.split()
-                for item in words:
-                    item = '<' + item + '>'
-                    if item in word_count:
-                        word_count[item] = word_count[item] + 1
-                    else:
-                        word_count[item] = 1
-
-    item_to_remove = []
-    for item in word_count:
-        if word_count[item] <= args.min_count:
-            item_to_remove.append(item)
-
-    unk_sum = 0
-    for item in item_to_remove:
-        unk_sum += word_count[item]
-        del word_count[item]
-    # sort by count
-    word_count[native_to_unicode('<UNK>')] = unk_sum
+    # word to count, chunks of the corpus are counted in parallel
+    corpus_files = [
+        os.path.join(args.build_dict_corpus_dir, f)
+        for f in sorted(os.listdir(args.build_dict_corpus_dir))
+    ]
+    print("build dict : ", corpus_files)
+    counter = count_tokens(corpus_files, text_words, workers=args.workers)
+
+    # words counted at most min_count times are merged into <UNK>
+    vocab = build_vocab(
+        counter,
+        min_count=args.min_count + 1,
+        unk_token=native_to_unicode('<UNK>'))
+    vocab.save(args.dict_path + ".npz")
+    word_count = dict(zip(vocab.tokens, vocab.counts.tolist()))
 
     word_ngrams = dict()
     ngrams_count = dict()
@@ -274,29 +268,18 @@ def build_dict(args):
 
 
 def data_split(args):
-    raw_data_dir = args.input_corpus_dir
-    new_data_dir = args.output_corpus_dir
-    if not os.path.exists(new_data_dir):
-        os.mkdir(new_data_dir)
-    files = os.listdir(raw_data_dir)
+    # streamed line by line, the corpus is never held in memory
+    files = [
+        os.path.join(args.input_corpus_dir, f)
+        for f in sorted(os.listdir(args.input_corpus_dir))
+    ]
     print(files)
-    index = 0
-    contents = []
-    for file_ in files:
-        with open(os.path.join(raw_data_dir, file_), 'r') as f:
-            contents.extend(f.readlines())
-
-    num = int(args.file_nums)
-    lines_per_file = len(contents) / num
-    print("contents: ", str(len(contents)))
-    print("lines_per_file: ", str(lines_per_file))
-
-    for i in range(1, num + 1):
-        with open(os.path.join(new_data_dir, "part_" + str(i)), 'w') as fout:
-            data = contents[(i - 1) * lines_per_file:min(i * lines_per_file,
-                                                         len(contents))]
-            for line in data:
-                fout.write(line)
+    resplit(
+        files,
+        args.output_corpus_dir,
+        args.file_nums,
+        mode=args.split_mode,
+        shuffle_window=args.shuffle_window)
 
 
 if __name__ == "__main__":
@@ -18,24 +18,10 @@ import numpy as np
 
 from paddlerec.core.reader import ReaderBase
 from paddlerec.core.utils import envs
-
-
-class NumpyRandomInt(object):
-    def __init__(self, a, b, buf_size=1000):
-        self.idx = 0
-        self.buffer = np.random.random_integers(a, b, buf_size)
-        self.a = a
-        self.b = b
-
-    def __call__(self):
-        if self.idx == len(self.buffer):
-            self.buffer = np.random.random_integers(self.a, self.b,
-                                                    len(self.buffer))
-            self.idx = 0
-
-        result = self.buffer[self.idx]
-        self.idx += 1
-        return result
+from paddlerec.core.utils.file_shard import iter_shards
+from paddlerec.core.utils.negative_sampler import NegativeSampler, load_counts
+from paddlerec.core.utils.negative_sampler import ProcessRandomState
+from paddlerec.core.utils.skip_gram import SkipGramBatcher, skip_gram_pairs
 
 
 class Reader(ReaderBase):
@@ -44,66 +30,64 @@ class Reader(ReaderBase):
             "dataset.dataset_train.word_count_dict_path")
         word_ngrams_path = envs.get_global_env(
             "dataset.dataset_train.word_ngrams_path")
+        self.batch_size = envs.get_global_env(
+            "dataset.dataset_train.batch_size")
         self.window_size = envs.get_global_env("hyper_parameters.window_size")
         self.neg_num = envs.get_global_env("hyper_parameters.neg_num")
         self.with_shuffle_batch = envs.get_global_env(
             "hyper_parameters.with_shuffle_batch")
-        self.random_generator = NumpyRandomInt(1, self.window_size + 1)
+        seed = envs.get_global_env("dataset.dataset_train.seed", None)
+        # created again in every reader worker, see ProcessRandomState
+        self.rng = ProcessRandomState(seed)
 
+        # word id to the word id followed by the ids of its ngrams
         self.word_ngrams = dict()
         with io.open(word_ngrams_path, 'r', encoding='utf-8') as f:
             for line in f:
-                line = line.rstrip().split()
-                self.word_ngrams[str(line[0])] = map(int, line[1:])
+                line = [int(i) for i in line.split()]
+                self.word_ngrams[line[0]] = line
 
-        self.cs = None
+        self.sampler = None
         if not self.with_shuffle_batch:
-            id_counts = []
-            word_all_count = 0
-            with io.open(dict_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    word, count = line.split()[0], int(line.split()[1])
-                    id_counts.append(count)
-                    word_all_count += count
-            id_frequencys = [
-                float(count) / word_all_count for count in id_counts
-            ]
-            np_power = np.power(np.array(id_frequencys), 0.75)
-            id_frequencys_pow = np_power / np_power.sum()
-            self.cs = np.array(id_frequencys_pow).cumsum()
+            # unigram ** 0.75 over the word counts, alias-table draws
+            self.sampler = NegativeSampler(
+                counts=load_counts(dict_path), alpha=0.75, seed=seed)
 
-    def get_context_words(self, words, idx):
-        """
-        Get the context word list of target word.
-        words: the words of the current line
-        idx: input word index
-        window_size: window size
-        """
-        target_window = self.random_generator()
-        # if (idx - target_window) > 0 else 0
-        start_point = idx - target_window
-        if start_point < 0:
-            start_point = 0
-        end_point = idx + target_window
-        targets = words[start_point:idx] + words[idx + 1:end_point + 1]
-        return targets
+    def input_words(self, centers):
+        return [self.word_ngrams.get(c) or [c] for c in centers.tolist()]
+
+    def generate_batch_from_trainfiles(self, files):
+        # windows, pairs and negatives of blocks of lines in one pass each
+        def reader():
+            # built in the process that reads, which may be a worker
+            batcher = SkipGramBatcher(
+                self.batch_size,
+                self.window_size,
+                sampler=self.sampler,
+                neg_num=self.neg_num,
+                rng=self.rng.get())
+            for columns in batcher.generate(iter_shards(files)):
+                rows = [self.input_words(columns[0])]
+                rows += [c.reshape([len(c), -1]).tolist() for c in columns[1:]]
+                yield list(zip(*rows))
+
+        return reader
 
     def generate_sample(self, line):
         def reader():
-            word_ids = [w for w in line.split()]
-            for idx, target_id in enumerate(word_ids):
-                input_word = [int(target_id)]
-                if target_id in self.word_ngrams:
-                    input_word += self.word_ngrams[target_id]
-                context_word_ids = self.get_context_words(word_ids, idx)
-                for context_id in context_word_ids:
-                    output = [('input_word', input_word),
-                              ('true_label', [int(context_id)])]
-                    if not self.with_shuffle_batch:
-                        neg_array = self.cs.searchsorted(
-                            np.random.sample(self.neg_num))
-                        output += [('neg_label',
-                                    [int(str(i)) for i in neg_array])]
-                    yield output
+            ids = np.array(line.split(), dtype=np.int64)
+            centers, contexts = skip_gram_pairs(
+                ids, self.window_size, rng=self.rng.get())
+            if self.sampler is not None:
+                # negatives of all pairs of the line in one draw
+                size = (len(centers), self.neg_num)
+                neg_arrays = self.sampler.sample(size).tolist()
+            pairs = zip(self.input_words(centers), contexts.tolist())
+            for i, (input_word, context_id) in enumerate(pairs):
+                output = [('input_word', input_word), ('true_label',
+                                                       [context_id])]
+                if self.sampler is not None:
+                    output += [('neg_label', neg_arrays[i])]
+                yield output
 
         return reader
@@ -14,17 +14,16 @@
 
 from __future__ import print_function
 
-import random
-
 from paddlerec.core.reader import ReaderBase
+from paddlerec.core.utils.negative_sampler import ProcessRandomState
 
 
 class Reader(ReaderBase):
     def init(self):
-        pass
+        self.rng = ProcessRandomState()
 
     def sample_neg_from_seq(self, seq):
-        return seq[random.randint(0, len(seq) - 1)]
+        return int(seq[self.rng.get().randint(0, len(seq))])
 
     def generate_sample(self, line):
         """
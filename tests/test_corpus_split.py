@@ -0,0 +1,63 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from paddlerec.core.utils.corpus_split import resplit
+
+
+class ResplitTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        rng = random.Random(7)
+        self.lines = [
+            u"{} {}\n".format(i, u"\u4e2d\u6587 word" * rng.randint(1, 8))
+            for i in range(200)
+        ]
+        self.input = os.path.join(self.dir, "corpus.txt")
+        with io.open(self.input, "w", encoding="utf-8") as f:
+            f.write(u"".join(self.lines))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, paths):
+        lines = []
+        for path in paths:
+            with io.open(path, "r", encoding="utf-8") as f:
+                lines.extend(f.readlines())
+        return lines
+
+    def test_bytes_mode_balances_utf8_shards(self):
+        paths = resplit(
+            [self.input], os.path.join(self.dir, "out"), 4, mode="bytes")
+        self.assertEqual(self.read(paths), self.lines)
+        budget = os.path.getsize(self.input) / 4.0
+        longest = max(len(l.encode("utf-8")) for l in self.lines)
+        for path in paths:
+            self.assertLess(abs(os.path.getsize(path) - budget), longest)
+
+    def test_round_robin_keeps_every_line(self):
+        paths = resplit([self.input], os.path.join(self.dir, "out"), 3)
+        self.assertEqual(sorted(self.read(paths)), sorted(self.lines))
+        self.assertEqual([len(self.read([p])) for p in paths], [67, 67, 66])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import struct
+import unittest
+
+from paddlerec.core.utils.feature_hash import FeatureHasher
+from paddlerec.core.utils.feature_hash import hash64
+from paddlerec.core.utils.feature_hash import hash_ids
+from paddlerec.core.utils.feature_hash import hash_int64
+from paddlerec.core.utils.feature_hash import stable_hash
+
+MASK = (1 << 64) - 1
+M = 0xc6a4a7935bd1e995
+R = 47
+
+
+def murmur64a(data, seed=0):
+    """
+    MurmurHash64A written after the reference C code, byte by byte
+    """
+    h = (seed ^ (len(data) * M)) & MASK
+    nblocks = len(data) // 8
+    for i in range(nblocks):
+        k = struct.unpack("<Q", data[i * 8:i * 8 + 8])[0]
+        k = (k * M) & MASK
+        k ^= k >> R
+        k = (k * M) & MASK
+        h ^= k
+        h = (h * M) & MASK
+    tail = bytearray(data[nblocks * 8:])
+    if tail:
+        for i in reversed(range(len(tail))):
+            h ^= tail[i] << (8 * i)
+        h = (h * M) & MASK
+    h ^= h >> R
+    h = (h * M) & MASK
+    h ^= h >> R
+    return h
+
+
+class FeatureHashTest(unittest.TestCase):
+    def test_matches_reference(self):
+        rng = random.Random(3)
+        chars = u"abc\u00e9\u4e2d0123"
+        values = [u"", u"a", u"criteo", u"\u4e2d\u6587", u"x" * 8, u"y" * 9]
+        for _ in range(200):
+            length = rng.randint(0, 40)
+            values.append(u"".join(rng.choice(chars) for _ in range(length)))
+        for seed in (0, 1, 0xdeadbeef):
+            expected = [murmur64a(v.encode("utf-8"), seed) for v in values]
+            self.assertEqual([int(h) for h in hash64(values, seed)], expected)
+
+    def test_chunks_and_per_value_seeds(self):
+        values = [str(i) * (i % 13) for i in range(70000)]
+        seeds = [i % 5 for i in range(len(values))]
+        hashes = hash64(values, seeds)
+        for i in (0, 12, 65535, 65536, 69999):
+            self.assertEqual(
+                int(hashes[i]), murmur64a(values[i].encode("utf-8"), seeds[i]))
+
+    def test_int64_hashes_the_little_endian_bytes(self):
+        values = [0, 1, -1, 1 << 40, -(1 << 62)]
+        expected = [murmur64a(struct.pack("<q", v), 7) for v in values]
+        self.assertEqual([int(h) for h in hash_int64(values, 7)], expected)
+
+    def test_ids(self):
+        h = murmur64a(b"movie", 0)
+        self.assertEqual(stable_hash("movie"), h >> 1)
+        self.assertEqual(stable_hash("movie", 1000), h % 1000)
+        self.assertEqual(hash_ids(["movie"], 0, 1000).tolist(), [h % 1000])
+
+    def test_hasher_salts_every_slot(self):
+        hasher = FeatureHasher("C1:100:0 C2:100:9")
+        c1 = murmur64a(b"v", 0) % 100
+        c2 = murmur64a(b"v", 9) % 100
+        self.assertEqual(hasher.hash_slot("C1", ["v"]).tolist(), [c1])
+        self.assertEqual(
+            hasher.hash_mixed(["C2", "C1"], ["v", "v"]).tolist(), [c2, c1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import io
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from paddlerec.core.utils.file_shard import iter_lines
+from paddlerec.core.utils.file_shard import split_by_bytes
+
+
+def write_lines(path, lines):
+    with io.open(path, "w", encoding="utf-8") as f:
+        f.write(u"".join(lines))
+
+
+class SplitByBytesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        rng = random.Random(5)
+        self.files = []
+        self.lines = []
+        for i in range(3):
+            lines = [
+                u"{} {}\n".format(i, u"éx" * rng.randint(0, 40))
+                for _ in range(rng.randint(1, 60))
+            ]
+            path = os.path.join(self.dir, "part-{}".format(i))
+            write_lines(path, lines)
+            self.files.append(path)
+            self.lines.extend(lines)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, plan):
+        return [line for shard in plan for line in iter_lines(shard)]
+
+    def test_every_line_read_once_in_order(self):
+        for worker_num in (1, 2, 3, 7, 50):
+            plans = split_by_bytes(self.files, worker_num)
+            self.assertEqual(len(plans), worker_num)
+            lines = [line for plan in plans for line in self.read(plan)]
+            self.assertEqual(lines, self.lines)
+
+    def test_ranges_cover_the_files_evenly(self):
+        total = sum(os.path.getsize(f) for f in self.files)
+        plans = split_by_bytes(self.files, 4)
+        for plan in plans:
+            size = sum(end - start for _, start, end in plan)
+            self.assertIn(size, (total // 4, total // 4 + 1))
+
+    def test_compressed_file_stays_whole(self):
+        path = os.path.join(self.dir, "part-gz.gz")
+        with gzip.open(path, "wb") as f:
+            f.write(u"".join(self.lines).encode("utf-8"))
+        plans = split_by_bytes(self.files + [path], 3)
+        shards = [shard for plan in plans for shard in plan]
+        self.assertEqual(shards.count(path), 1)
+        lines = [line for plan in plans for line in self.read(plan)]
+        self.assertEqual(sorted(lines), sorted(self.lines * 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import paddle.fluid as fluid
+
+from paddlerec.core.utils.dataset_holder import DatasetPipeline
+from paddlerec.core.utils.dataset_holder import TimeSplitDatasetHolder
+from paddlerec.core.utils.dataset_holder import time_windows
+from paddlerec.core.utils.online import OnlineCheckpoints
+
+BEGIN = "202001010000"
+
+
+class LineDataset(object):
+    """
+    the numbers in the files of a window, in place of an InMemoryDataset
+    """
+
+    def __init__(self, file_list):
+        self.file_list = sorted(file_list)
+        self.values = None
+
+    def load_into_memory(self):
+        self.values = []
+        for path in self.file_list:
+            with open(path) as f:
+                self.values.extend(float(v) for v in f.read().split())
+
+    def preload_into_memory(self, thread_num=None):
+        self.load_into_memory()
+
+    def wait_preload_done(self):
+        pass
+
+    def release_memory(self):
+        self.values = None
+
+
+class LineHolder(TimeSplitDatasetHolder):
+    def _alloc_dataset(self, file_list):
+        return LineDataset(file_list)
+
+
+class Job(object):
+    """
+    one run of online training: a fresh scope with w and b, where
+    training a window adds the sum of its numbers to w
+    """
+
+    def __init__(self, data_path, save_path):
+        self.data_path = data_path
+        self.save_path = save_path
+        self.program = fluid.Program()
+        startup = fluid.Program()
+        with fluid.program_guard(self.program, startup):
+            for name in ("w", "b"):
+                fluid.layers.create_global_var(
+                    shape=[3],
+                    value=1.0,
+                    dtype="float32",
+                    persistable=True,
+                    name=name)
+        self.scope = fluid.Scope()
+        self.exe = fluid.Executor(fluid.CPUPlace())
+        with fluid.scope_guard(self.scope):
+            self.exe.run(startup)
+
+    def value(self, name):
+        return np.array(self.scope.find_var(name).get_tensor())
+
+    def run(self, windows):
+        """
+        train windows after the restored ones, as RunnerBase._run_online
+        Return:
+            begin_time of the trained windows
+        """
+        context = {"exe": self.exe}
+        checkpoints = OnlineCheckpoints(self.save_path, base_interval=3)
+        windows = time_windows(BEGIN, 60, windows)
+        if checkpoints.last_done is not None:
+            with fluid.scope_guard(self.scope):
+                checkpoints.restore(context, self.program)
+            last_done = checkpoints.last_done
+            windows = (w for w in windows if w > last_done)
+        holder = LineHolder({
+            "data_path": self.data_path + "/%Y%m%d/%H",
+            "data_donefile": None,
+            "split_interval": 60,
+            "filename_prefix": "part-",
+            "preload_thread": 1
+        })
+        params = {"time_window_min": 60, "node_num": 1, "node_idx": 0}
+        trained = []
+        for begin_time, dataset in DatasetPipeline(
+                holder, windows, params, poll_interval=0.01):
+            value = self.value("w") + sum(dataset.values)
+            self.scope.find_var("w").get_tensor().set(value, fluid.CPUPlace())
+            with fluid.scope_guard(self.scope):
+                checkpoints.save(context, begin_time, self.program)
+            trained.append(begin_time)
+        return trained, checkpoints
+
+
+class OnlineTrainingTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.dir, "data")
+        self.save_path = os.path.join(self.dir, "checkpoints")
+        for hour in range(4):
+            window = os.path.join(self.data_path, "20200101",
+                                  "{:02d}".format(hour))
+            os.makedirs(window)
+            for part in range(2):
+                path = os.path.join(window, "part-{}".format(part))
+                with open(path, "w") as f:
+                    f.write("{} {}\n".format(hour, part))
+            open(os.path.join(window, "to.hadoop.done"), "w").close()
+            # not a data file of the window
+            open(os.path.join(window, "other"), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_save_restore_and_resume(self):
+        first = Job(self.data_path, self.save_path)
+        trained, checkpoints = first.run(2)
+        self.assertEqual(trained, ["202001010000", "202001010100"])
+        # w starts at 1, windows 00 and 01 add 1 and 3
+        np.testing.assert_array_equal(first.value("w"), [5.0] * 3)
+        ckpts = checkpoints.state["checkpoints"]
+        self.assertEqual([c["base"] for c in ckpts], [True, False])
+        self.assertEqual(ckpts[1]["vars"], ["w"])
+        self.assertEqual(os.listdir(ckpts[1]["path"]), ["w"])
+
+        # a restarted job loads the base and the delta, then goes on
+        second = Job(self.data_path, self.save_path)
+        trained, checkpoints = second.run(4)
+        self.assertEqual(trained, ["202001010200", "202001010300"])
+        np.testing.assert_array_equal(second.value("w"), [5.0 + 5 + 7] * 3)
+        np.testing.assert_array_equal(second.value("b"), [1.0] * 3)
+        # the third checkpoint since the base is a new base
+        ckpts = checkpoints.state["checkpoints"]
+        self.assertEqual([c["base"] for c in ckpts], [True])
+        self.assertEqual(checkpoints.last_done, "202001010300")
+
+        third = Job(self.data_path, self.save_path)
+        self.assertEqual(third.run(4)[0], [])
+        np.testing.assert_array_equal(third.value("w"), [17.0] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
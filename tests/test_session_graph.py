@@ -0,0 +1,126 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+
+import numpy as np
+
+from paddlerec.core.utils.session_graph import session_graphs
+
+
+def loop_graphs(cur_batch):
+    """
+    the per-session make_data of the gnn reader that session_graphs
+    replaced
+    """
+    batch_size = len(cur_batch)
+    cur_batch = [[list(e[0]), e[1]] for e in cur_batch]
+    max_seq_len = 0
+    for e in cur_batch:
+        max_seq_len = max(max_seq_len, len(e[0]))
+    last_id = []
+    for e in cur_batch:
+        last_id.append(len(e[0]) - 1)
+        e[0] += [0] * (max_seq_len - len(e[0]))
+
+    max_uniq_len = 0
+    for e in cur_batch:
+        max_uniq_len = max(max_uniq_len, len(np.unique(e[0])))
+
+    items, adj_in, adj_out, seq_index, last_index = [], [], [], [], []
+    mask, label = [], []
+
+    id = 0
+    for e in cur_batch:
+        node = np.unique(e[0])
+        items.append(node.tolist() + (max_uniq_len - len(node)) * [0])
+        adj = np.zeros((max_uniq_len, max_uniq_len))
+
+        for i in np.arange(len(e[0]) - 1):
+            if e[0][i + 1] == 0:
+                break
+            u = np.where(node == e[0][i])[0][0]
+            v = np.where(node == e[0][i + 1])[0][0]
+            adj[u][v] = 1
+
+        u_deg_in = np.sum(adj, 0)
+        u_deg_in[np.where(u_deg_in == 0)] = 1
+        adj_in.append(np.divide(adj, u_deg_in).transpose())
+
+        u_deg_out = np.sum(adj, 1)
+        u_deg_out[np.where(u_deg_out == 0)] = 1
+        adj_out.append(np.divide(adj.transpose(), u_deg_out).transpose())
+
+        seq_index.append([[id, np.where(node == i)[0][0]] for i in e[0]])
+        last_index.append([id, np.where(node == e[0][last_id[id]])[0][0]])
+        label.append(e[1] - 1)
+        mask.append([[1] * (last_id[id] + 1) + [0] *
+                     (max_seq_len - last_id[id] - 1)])
+        id += 1
+
+    items = np.array(items).astype("int64").reshape((batch_size, -1))
+    seq_index = np.array(seq_index).astype("int32")
+    seq_index = seq_index.reshape((batch_size, -1, 2))
+    last_index = np.array(last_index).astype("int32").reshape((batch_size, 2))
+    adj_in = np.array(adj_in).astype("float32").reshape(
+        (batch_size, max_uniq_len, max_uniq_len))
+    adj_out = np.array(adj_out).astype("float32").reshape(
+        (batch_size, max_uniq_len, max_uniq_len))
+    mask = np.array(mask).astype("float32").reshape((batch_size, -1, 1))
+    label = np.array(label).astype("int64").reshape((batch_size, 1))
+    return [items, seq_index, last_index, adj_in, adj_out, mask, label]
+
+
+def random_batch(rng, batch_size, max_len, num_items):
+    batch = []
+    for _ in range(batch_size):
+        length = rng.randint(1, max_len)
+        seq = [rng.randint(1, num_items) for _ in range(length)]
+        batch.append((seq, rng.randint(1, num_items)))
+    return batch
+
+
+class SessionGraphTest(unittest.TestCase):
+    def test_matches_per_session_loops(self):
+        rng = random.Random(11)
+        for _ in range(100):
+            batch = random_batch(rng, rng.randint(1, 8), 12, 6)
+            expected = loop_graphs(batch)
+            got = session_graphs([e[0] for e in batch], [e[1] for e in batch])
+            for old, new in zip(expected, got):
+                self.assertEqual(old.dtype, new.dtype)
+                np.testing.assert_array_equal(old, new)
+
+    def test_repeated_clicks_and_single_click_sessions(self):
+        batch = [([3, 3, 3], 1), ([5], 2), ([1, 2, 1, 2, 1], 4)]
+        expected = loop_graphs(batch)
+        got = session_graphs([e[0] for e in batch], [e[1] for e in batch])
+        for old, new in zip(expected, got):
+            np.testing.assert_array_equal(old, new)
+
+    def test_coo_holds_the_dense_cells(self):
+        batch = random_batch(random.Random(2), 6, 15, 9)
+        seqs, labels = [e[0] for e in batch], [e[1] for e in batch]
+        dense = session_graphs(seqs, labels)
+        coo = session_graphs(seqs, labels, adj_format="coo")
+        for position in (3, 4):
+            index, values = coo[position]
+            adj = np.zeros_like(dense[position])
+            adj[index[:, 0], index[:, 1], index[:, 2]] = values
+            np.testing.assert_array_equal(adj, dense[position])
+
+
+if __name__ == "__main__":
+    unittest.main()
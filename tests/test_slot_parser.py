@@ -0,0 +1,74 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from paddlerec.core.reader import SlotReader
+from paddlerec.core.utils.slot_parser import SlotBatchParser
+
+SPARSE = "click 6001 6002"
+DENSE = "dense:2"
+
+
+def slot_reader_samples(lines):
+    # SlotReader.__init__ loads a yaml config, init is all parsing needs
+    reader = SlotReader.__new__(SlotReader)
+    reader.init(SPARSE, DENSE, 0)
+    samples = []
+    for line in lines:
+        for sample in reader.generate_sample(line)():
+            samples.append([[float(v) for v in values]
+                            for _, values in sample])
+    return samples
+
+
+def parser_samples(lines):
+    parser = SlotBatchParser(SPARSE, DENSE, 0)
+    columns = parser.parse(lines)
+    offsets = parser.column_offsets(columns)
+    samples = []
+    for i in range(len(lines)):
+        batch = parser.slice_batch(columns, i, i + 1, offsets)
+        sample = [batch[0].reshape(-1).tolist()]
+        sample.extend(values.reshape(-1).tolist() for values, _ in batch[1:])
+        samples.append([[float(v) for v in values] for values in sample])
+    return samples
+
+
+class SlotBatchParserTest(unittest.TestCase):
+    def test_well_formed_lines(self):
+        lines = [
+            "click:1 dense:0.5 dense:1.5 6001:5 6001:6 6002:7",
+            "click:0 6002:11",
+        ]
+        self.assertEqual(parser_samples(lines), slot_reader_samples(lines))
+
+    def test_malformed_tokens_are_skipped(self):
+        lines = [
+            "click:1 junk 6001:5 6002:7",
+            "click:0 6001:9 6002:11",
+            "unknown:3 click:1 dense:2.5 dense:1 a:b:c 6002:4:x",
+        ]
+        samples = parser_samples(lines)
+        self.assertEqual(samples, slot_reader_samples(lines))
+        self.assertEqual(samples[0][2:], [[5.0], [7.0]])
+        self.assertEqual(samples[1][2:], [[9.0], [11.0]])
+
+    def test_tokens_without_value_are_skipped(self):
+        samples = parser_samples(["click:1 6001: 6001 6002:3"])
+        self.assertEqual(samples[0][2:], [[0.0], [3.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
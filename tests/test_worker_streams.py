@@ -0,0 +1,60 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from paddlerec.core.utils.multiprocess_reader import MultiProcessReader
+from paddlerec.core.utils.negative_sampler import NegativeSampler
+from paddlerec.core.utils.negative_sampler import ProcessRandomState
+
+
+def read_by_file(sampler, rng, seed):
+    """
+    negatives and window sizes drawn by two reader workers, by file
+    """
+
+    def shard_reader(files):
+        for name in files:
+            yield name, sampler.sample(8).tolist(), rng.get().randint(
+                1, 6, 8).tolist()
+
+    reader = MultiProcessReader(shard_reader, ["a", "b"], 2, seed=seed)
+    return dict((name, draws)
+                for name, draws in ((item[0], item[1:]) for item in reader()))
+
+
+class WorkerStreamTest(unittest.TestCase):
+    def test_workers_draw_different_negatives(self):
+        # created before the workers fork, as Reader.init does
+        sampler = NegativeSampler(
+            num_items=1 << 30, strategy="uniform", seed=1)
+        rng = ProcessRandomState(seed=1)
+        draws = read_by_file(sampler, rng, 1)
+        self.assertNotEqual(draws["a"][0], draws["b"][0])
+        self.assertNotEqual(draws["a"][1], draws["b"][1])
+
+    def test_seeded_workers_repeat(self):
+        first = read_by_file(
+            NegativeSampler(num_items=1 << 30, strategy="uniform", seed=1),
+            ProcessRandomState(seed=1),
+            1)
+        second = read_by_file(
+            NegativeSampler(num_items=1 << 30, strategy="uniform", seed=1),
+            ProcessRandomState(seed=1),
+            1)
+        self.assertEqual(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
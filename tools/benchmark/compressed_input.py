@@ -0,0 +1,91 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+end-to-end samples/sec of SlotBatchParser on compressed input, for every
+decompress mode, against the pre-decompressed files
+
+python -m paddlerec.tools.benchmark.compressed_input \
+    -m paddlerec.models.rank.dnn -d dataloader_train --repeat 1000
+"""
+from __future__ import print_function
+
+import argparse
+import bz2
+import gzip
+import os
+import shutil
+
+from paddlerec.core.utils import envs
+from paddlerec.core.utils.compressed_io import lzma
+from paddlerec.core.utils.compressed_io import MODES
+from paddlerec.core.utils.slot_parser import SlotBatchParser
+from paddlerec.tools.benchmark.slot_reader import build_input
+from paddlerec.tools.benchmark.slot_reader import count_samples
+from paddlerec.tools.benchmark.utils import init_envs, dataset_files, measure
+
+
+def compress(path):
+    """
+    write path.gz, path.bz2 and path.xz, return {compression: path}
+    """
+    openers = [("gzip", ".gz", gzip.open), ("bz2", ".bz2", bz2.BZ2File)]
+    if lzma is not None:
+        openers.append(("xz", ".xz", lzma.LZMAFile))
+    outputs = {}
+    for name, suffix, opener in openers:
+        out_path = path + suffix
+        with open(path, "rb") as src:
+            out = opener(out_path, "wb")
+            try:
+                shutil.copyfileobj(src, out, 1 << 20)
+            finally:
+                out.close()
+        outputs[name] = out_path
+        print("{}: {} -> {} bytes".format(
+            name, os.path.getsize(path), os.path.getsize(out_path)))
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="compressed input benchmark")
+    parser.add_argument("-m", "--model", type=str, required=True)
+    parser.add_argument("-d", "--dataset", type=str, required=True)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--block_size", type=int, default=1024)
+    args = parser.parse_args()
+
+    init_envs(args.model)
+    name = "dataset." + args.dataset + "."
+    sparse = envs.get_global_env(name + "sparse_slots", "#") or "#"
+    dense = envs.get_global_env(name + "dense_slots", "#") or "#"
+    padding = int(envs.get_global_env(name + "padding", 0))
+    batch_size = int(envs.get_global_env(name + "batch_size"))
+
+    tmp_dir, files = build_input(dataset_files(args.dataset), args.repeat)
+    try:
+        batch_parser = SlotBatchParser(sparse, dense, padding)
+        plain = measure("plain",
+                        batch_parser.generate_batches(
+                            files, batch_size, args.block_size), count_samples)
+        for compression, path in sorted(compress(files[0]).items()):
+            for mode in MODES:
+                speed = measure("{} {}".format(compression, mode),
+                                batch_parser.generate_batches(
+                                    [path],
+                                    batch_size,
+                                    args.block_size,
+                                    decompress=mode), count_samples)
+                print("relative to plain: {:.2f}".format(speed / plain))
+    finally:
+        shutil.rmtree(tmp_dir)
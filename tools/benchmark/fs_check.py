@@ -0,0 +1,85 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+donefile checks/sec of a day of 5-minute partitions root/$DAY/$HHMM: the
+shell ls per path LocalFSClient.is_exist ran before, is_exist on
+os.path and exists_many, cold and from the cached listings.
+
+python -m paddlerec.tools.benchmark.fs_check --split_interval 5
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import os
+import shutil
+import tempfile
+import time
+
+from paddlerec.core.utils.fs import LocalFSClient
+
+
+def make_partitions(root, split_interval, missing_last):
+    paths = []
+    day = datetime.datetime(2020, 1, 12)
+    for i in range(24 * 60 // split_interval):
+        data_time = day + datetime.timedelta(minutes=i * split_interval)
+        part = os.path.join(root, data_time.strftime("%Y%m%d/%H%M"))
+        os.makedirs(part)
+        open(os.path.join(part, "part-0"), "w").close()
+        done = os.path.join(part, "to.hadoop.done")
+        if not (missing_last and i == 24 * 60 // split_interval - 1):
+            open(done, "w").close()
+        paths.append(done)
+    return paths
+
+
+def shell_exist(path):
+    # the is_exist before, its ls output silenced
+    return os.system("ls " + path + " > /dev/null 2>&1") == 0
+
+
+def measure(name, check, paths, repeat):
+    begin = time.time()
+    for _ in range(repeat):
+        res = check(paths)
+    cost = time.time() - begin
+    speed = len(paths) * repeat / cost if cost > 0 else float("inf")
+    print("{:<24s} paths: {:<7d} time: {:.3f}s speed: {:.1f} checks/sec".
+          format(name, len(paths) * repeat, cost, speed))
+    return speed, res
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="donefile check benchmark")
+    parser.add_argument("--split_interval", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        paths = make_partitions(root, args.split_interval, True)
+        client = LocalFSClient()
+        old, expected = measure(
+            "shell ls", lambda ps: [shell_exist(p) for p in ps], paths, 1)
+        measure("is_exist", lambda ps: [client.is_exist(p) for p in ps], paths,
+                args.repeat)
+        uncached = LocalFSClient(cache_ttl=0)
+        cold, got = measure("exists_many uncached", uncached.exists_many,
+                            paths, args.repeat)
+        assert got == expected
+        measure("exists_many cached", client.exists_many, paths, args.repeat)
+        print("speedup uncached: {:.2f}".format(cold / old))
+    finally:
+        shutil.rmtree(root)
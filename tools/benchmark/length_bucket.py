@@ -0,0 +1,108 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+padding waste and batch build time of LengthBucketBatcher on the DIN and
+GRU4Rec sample data, against batching in file order. The padded cells of a
+batch are what a padded sequence step computes on, so their total is
+reported as the step cost.
+
+python -m paddlerec.tools.benchmark.length_bucket --repeat 100
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import time
+
+from paddlerec.core.utils.length_bucket import LengthBucketBatcher
+
+MODELS_DIR = os.path.join(
+    os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "models")
+
+
+def din_samples(path):
+    samples = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip().split(';')
+            hist = [int(i) for i in line[0].split()]
+            cate = [int(i) for i in line[1].split()]
+            samples.append(
+                [hist, cate, [int(line[2])], [int(line[3])], [float(line[4])]])
+    return samples
+
+
+def gru4rec_samples(path):
+    samples = []
+    with open(path, "r") as f:
+        for line in f:
+            ids = [int(i) for i in line.split()]
+            samples.append([ids[:-1], ids[1:]])
+    return samples
+
+
+DATASETS = [
+    ("din", din_samples, os.path.join(
+        MODELS_DIR, "rank/din/data/train_data/paddle_train.100.txt"), [0, 1]),
+    ("gru4rec", gru4rec_samples, os.path.join(
+        MODELS_DIR, "recall/gru4rec/data/train/small_train.txt"), [0, 1]),
+]
+
+
+def run(name, batcher, samples):
+    real = 0
+    padded = 0
+    batches = 0
+    begin = time.time()
+    for batch in batcher.generate(samples):
+        mask = batch[-2]
+        real += int(mask.sum())
+        padded += mask.size
+        batches += 1
+    cost = time.time() - begin
+    print("{:<22s} batches: {:<6d} padded cells: {:<9d} waste: {:5.1f}% "
+          "time: {:.3f}s".format(name, batches, padded, 100.0 *
+                                 (padded - real) / max(padded, 1), cost))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="length bucket benchmark")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--boundaries", type=str, default="2 4 8 16 32 64")
+    args = parser.parse_args()
+
+    boundaries = [int(b) for b in args.boundaries.split()]
+    for dataset, load, path, seq_fields in DATASETS:
+        samples = load(path) * args.repeat
+        random.shuffle(samples)
+        print("{}: {} samples".format(dataset, len(samples)))
+        run("file order",
+            LengthBucketBatcher(
+                args.batch_size,
+                group_size=1,
+                seq_fields=seq_fields,
+                with_mask=True), samples)
+        run("group batch_size*20",
+            LengthBucketBatcher(
+                args.batch_size, seq_fields=seq_fields, with_mask=True),
+            samples)
+        run("boundaries",
+            LengthBucketBatcher(
+                args.batch_size,
+                boundaries=boundaries,
+                seq_fields=seq_fields,
+                with_mask=True), samples)
@@ -0,0 +1,149 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+steps/sec of training when the metrics are fetched every batch, only on
+print batches, and accumulated in the program by MetricAccumulator.
+With --thread_num > 1 the program is compiled like the one SingleRunner
+runs on CPU, whose places share the sums, so only the fetch modes run.
+
+python -m paddlerec.tools.benchmark.metric_fetch \
+    -m paddlerec.models.rank.dnn -d dataloader_train --batch_sizes 2 8 32
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import time
+
+import numpy as np
+import paddle.fluid as fluid
+
+from paddlerec.core.utils import envs
+from paddlerec.core.utils.metric_accumulator import MetricAccumulator
+from paddlerec.tools.benchmark.slot_reader import sample_reader
+from paddlerec.tools.benchmark.utils import init_envs, dataset_files
+
+MODES = ["every_batch", "print_batch", "accumulate"]
+
+
+def build(env, model_path, dataset_name):
+    main_program = fluid.Program()
+    startup_program = fluid.Program()
+    scope = fluid.Scope()
+    with fluid.program_guard(main_program, startup_program):
+        with fluid.unique_name.guard():
+            model = envs.lazy_instance_by_fliename(model_path, "Model")(env)
+            model._data_var = model.input_data(dataset_name=dataset_name)
+            model.net(model._data_var, False)
+            model.optimizer().minimize(model._cost)
+    return model, main_program, startup_program, scope
+
+
+def compile_program(program, loss_name, thread_num):
+    """
+    data parallel program over thread_num CPU places, with the strategy
+    RunnerBase._get_strategy picks for thread_num > 1
+    """
+    build_strategy = fluid.BuildStrategy()
+    build_strategy.reduce_strategy = fluid.BuildStrategy.ReduceStrategy.Reduce
+    exec_strategy = fluid.ExecutionStrategy()
+    exec_strategy.num_threads = thread_num
+    os.environ["CPU_NUM"] = str(thread_num)
+    return fluid.compiler.CompiledProgram(program).with_data_parallel(
+        loss_name=loss_name,
+        build_strategy=build_strategy,
+        exec_strategy=exec_strategy)
+
+
+def feeds_of(config, files, dataset_name, data_vars, batch_size, steps):
+    name = "dataset." + dataset_name + "."
+    batches = sample_reader(
+        config, files,
+        envs.get_global_env(name + "sparse_slots", "#") or "#",
+        envs.get_global_env(name + "dense_slots", "#") or "#",
+        int(envs.get_global_env(name + "padding", 0)), batch_size)
+    feeder = fluid.DataFeeder(feed_list=data_vars, place=fluid.CPUPlace())
+    feeds = [feeder.feed(batch) for batch in batches()]
+    if not feeds:
+        raise ValueError(
+            "no batch of {} samples in {}".format(batch_size, files))
+    return [feeds[i % len(feeds)] for i in range(steps)]
+
+
+def run(mode, config, env, model_path, args, batch_size):
+    model, main_program, startup_program, scope = build(
+        env, model_path, args.dataset)
+    exe = fluid.Executor(fluid.CPUPlace())
+    with fluid.scope_guard(scope):
+        exe.run(startup_program)
+    metrics = model.get_metrics()
+    accumulator = None
+    if mode == "accumulate":
+        accumulator = MetricAccumulator(main_program, metrics, exe, scope)
+        fetch_list = []
+    else:
+        fetch_list = [var.name for var in metrics.values()]
+    feeds = feeds_of(config,
+                     dataset_files(args.dataset), args.dataset,
+                     model._data_var, batch_size, args.steps)
+    program = main_program
+    if args.thread_num > 1:
+        program = compile_program(main_program,
+                                  model.get_avg_cost().name, args.thread_num)
+
+    with fluid.scope_guard(scope):
+        begin = time.time()
+        for batch_id, feed in enumerate(feeds):
+            report = batch_id % args.print_interval == 0 and batch_id != 0
+            fetch = fetch_list if report or mode == "every_batch" else []
+            rets = exe.run(
+                program, feed=feed, fetch_list=fetch, return_numpy=False)
+            rets = [np.array(ret) for ret in rets]
+            if report and accumulator is not None:
+                accumulator.pull(batch_id, program)
+        cost = time.time() - begin
+    speed = len(feeds) / cost if cost > 0 else float("inf")
+    print("batch_size: {:<5d} {:<12s} threads: {} steps: {:<8d} time: "
+          "{:.3f}s speed: {:.1f} steps/sec".format(batch_size, mode,
+                                                   args.thread_num,
+                                                   len(feeds), cost, speed))
+    return speed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="metric fetch benchmark")
+    parser.add_argument("-m", "--model", type=str, required=True)
+    parser.add_argument("-d", "--dataset", type=str, required=True)
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[2, 8])
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--print_interval", type=int, default=20)
+    parser.add_argument("--thread_num", type=int, default=1)
+    args = parser.parse_args()
+    modes = MODES
+    if args.thread_num > 1:
+        # the runner fetches accumulate_metrics in this case
+        print("thread_num {}: the places share the sums, accumulate is not "
+              "run".format(args.thread_num))
+        modes = MODES[:2]
+
+    config = init_envs(args.model)
+    env = envs.load_yaml(config)
+    phase = [p for p in env["phase"] if p["dataset_name"] == args.dataset][0]
+    model_path = envs.os_path_adapter(envs.workspace_adapter(phase["model"]))
+    for batch_size in args.batch_sizes:
+        speeds = dict((mode, run(mode, config, env, model_path, args,
+                                 batch_size)) for mode in modes)
+        for mode in modes[1:]:
+            print("batch_size: {} {} speedup: {:.2f}x".format(
+                batch_size, mode, speeds[mode] / speeds["every_batch"]))
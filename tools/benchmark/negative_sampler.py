@@ -0,0 +1,101 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+negative draws/sec of NegativeSampler against the per-sample code it
+replaced in the word2vec reader and the din data preparation
+
+python -m paddlerec.tools.benchmark.negative_sampler --vocab 1000000
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from paddlerec.core.utils.negative_sampler import NegativeSampler
+
+
+def report(name, draws, cost):
+    speed = draws / cost if cost > 0 else float("inf")
+    print("{:<36s} draws: {:<10d} time: {:.3f}s speed: {:.1f} draws/sec".
+          format(name, draws, cost, speed))
+    return speed
+
+
+def searchsorted_per_pair(counts, pairs, neg_num):
+    freq = np.power(counts / counts.sum(), 0.75)
+    cs = (freq / freq.sum()).cumsum()
+    begin = time.time()
+    for _ in range(pairs):
+        [int(str(i)) for i in cs.searchsorted(np.random.sample(neg_num))]
+    return report("searchsorted per pair", pairs * neg_num,
+                  time.time() - begin)
+
+
+def alias_per_line(counts, pairs, neg_num, pairs_per_line):
+    begin = time.time()
+    sampler = NegativeSampler(counts=counts, seed=0)
+    build = time.time() - begin
+    begin = time.time()
+    for _ in range(pairs // pairs_per_line):
+        sampler.sample((pairs_per_line, neg_num)).tolist()
+    cost = time.time() - begin
+    print("alias table build: {:.3f}s".format(build))
+    return report("alias per line of {} pairs".format(pairs_per_line),
+                  pairs // pairs_per_line * pairs_per_line * neg_num, cost)
+
+
+def rejection_per_user(item_count, users, seq_len):
+    histories = [
+        random.sample(range(item_count), seq_len) for _ in range(users)
+    ]
+    begin = time.time()
+    for pos_list in histories:
+        for _ in range(seq_len):
+            neg = pos_list[0]
+            while neg in pos_list:
+                neg = random.randint(0, item_count - 1)
+    old = report("while-loop rejection per draw", users * seq_len,
+                 time.time() - begin)
+    sampler = NegativeSampler(num_items=item_count, strategy="uniform", seed=0)
+    begin = time.time()
+    for pos_list in histories:
+        sampler.sample(seq_len, exclude=pos_list).tolist()
+    report("masked exclusion per user", users * seq_len, time.time() - begin)
+    begin = time.time()
+    sampler.sample_rows([seq_len] * users, histories).tolist()
+    new = report("masked exclusion of all users", users * seq_len,
+                 time.time() - begin)
+    return old, new
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="negative sampler benchmark")
+    parser.add_argument("--vocab", type=int, default=100000)
+    parser.add_argument("--pairs", type=int, default=100000)
+    parser.add_argument("--neg_num", type=int, default=5)
+    parser.add_argument("--pairs_per_line", type=int, default=100)
+    parser.add_argument("--items", type=int, default=60000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--seq_len", type=int, default=20)
+    args = parser.parse_args()
+
+    counts = np.random.RandomState(0).zipf(1.3, args.vocab).astype(np.float64)
+    old = searchsorted_per_pair(counts, args.pairs, args.neg_num)
+    new = alias_per_line(counts, args.pairs, args.neg_num, args.pairs_per_line)
+    print("word2vec speedup: {:.2f}".format(new / old))
+    old, new = rejection_per_user(args.items, args.users, args.seq_len)
+    print("din speedup: {:.2f}".format(new / old))
@@ -0,0 +1,130 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+sessions/sec of the SR-GNN batch builder on the diginetica sample: the
+per-session loops the gnn reader used against session_graphs, dense and
+coo. The outputs of the old and the dense builder are compared first.
+
+python -m paddlerec.tools.benchmark.session_graph --repeat 100
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from paddlerec.core.utils.session_graph import session_graphs
+
+SAMPLE = os.path.join(
+    os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "models/recall/gnn/data/train/train.txt")
+
+
+def read_sessions(path):
+    sessions = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip().split('\t')
+            ids = [int(i) for i in line[0].split(',')]
+            sessions.append((ids, int(line[1])))
+    return sessions
+
+
+def loop_graphs(cur_batch):
+    # the make_data of the gnn reader before session_graphs
+    cur_batch = [[list(e[0]), e[1]] for e in cur_batch]
+    max_seq_len = max(len(e[0]) for e in cur_batch)
+    last_id = []
+    for e in cur_batch:
+        last_id.append(len(e[0]) - 1)
+        e[0] += [0] * (max_seq_len - len(e[0]))
+    max_uniq_len = max(len(np.unique(e[0])) for e in cur_batch)
+
+    items, adj_in, adj_out, seq_index, last_index = [], [], [], [], []
+    mask, label = [], []
+    for id, e in enumerate(cur_batch):
+        node = np.unique(e[0])
+        items.append(node.tolist() + (max_uniq_len - len(node)) * [0])
+        adj = np.zeros((max_uniq_len, max_uniq_len))
+        for i in np.arange(len(e[0]) - 1):
+            if e[0][i + 1] == 0:
+                break
+            u = np.where(node == e[0][i])[0][0]
+            v = np.where(node == e[0][i + 1])[0][0]
+            adj[u][v] = 1
+        u_deg_in = np.sum(adj, 0)
+        u_deg_in[np.where(u_deg_in == 0)] = 1
+        adj_in.append(np.divide(adj, u_deg_in).transpose())
+        u_deg_out = np.sum(adj, 1)
+        u_deg_out[np.where(u_deg_out == 0)] = 1
+        adj_out.append(np.divide(adj.transpose(), u_deg_out).transpose())
+        seq_index.append([[id, np.where(node == i)[0][0]] for i in e[0]])
+        last_index.append([id, np.where(node == e[0][last_id[id]])[0][0]])
+        label.append(e[1] - 1)
+        mask.append([[1] * (last_id[id] + 1) + [0] *
+                     (max_seq_len - last_id[id] - 1)])
+    n = len(cur_batch)
+    return [
+        np.array(items).astype("int64").reshape((n, -1)),
+        np.array(seq_index).astype("int32").reshape((n, -1, 2)),
+        np.array(last_index).astype("int32").reshape((n, 2)),
+        np.array(adj_in).astype("float32"),
+        np.array(adj_out).astype("float32"),
+        np.array(mask).astype("float32").reshape((n, -1, 1)),
+        np.array(label).astype("int64").reshape((n, 1))
+    ]
+
+
+def vector_graphs(adj_format):
+    def build(cur_batch):
+        return session_graphs([e[0] for e in cur_batch],
+                              [e[1] for e in cur_batch], adj_format)
+
+    return build
+
+
+def measure(name, build, batches):
+    begin = time.time()
+    for batch in batches:
+        build(batch)
+    cost = time.time() - begin
+    sessions = sum(len(b) for b in batches)
+    speed = sessions / cost if cost > 0 else float("inf")
+    print("{:<20s} sessions: {:<9d} time: {:.3f}s speed: {:.1f} sessions/sec".
+          format(name, sessions, cost, speed))
+    return speed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="session graph benchmark")
+    parser.add_argument("--data", type=str, default=SAMPLE)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--batch_size", type=int, default=100)
+    args = parser.parse_args()
+
+    sessions = read_sessions(args.data) * args.repeat
+    batches = [
+        sessions[i:i + args.batch_size]
+        for i in range(0, len(sessions), args.batch_size)
+    ]
+    for old, new in zip(
+            loop_graphs(batches[0]), vector_graphs("dense")(batches[0])):
+        np.testing.assert_array_equal(old, new)
+    old = measure("per-session loops", loop_graphs, batches)
+    new = measure("session_graphs dense", vector_graphs("dense"), batches)
+    measure("session_graphs coo", vector_graphs("coo"), batches)
+    print("speedup: {:.2f}".format(new / old))
@@ -0,0 +1,112 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+tokens/sec of the word2vec skip-gram reader: the per-word, per-pair sample
+path against the batches of SkipGramBatcher, both ending in the sample
+lists a DataLoader is fed with
+
+python -m paddlerec.tools.benchmark.skip_gram --lines 20000 --line_len 50
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+import numpy as np
+
+from paddlerec.core.utils.negative_sampler import NegativeSampler
+from paddlerec.core.utils.skip_gram import SkipGramBatcher
+
+
+def report(name, tokens, pairs, cost):
+    speed = tokens / cost if cost > 0 else float("inf")
+    print("{:<24s} tokens: {:<9d} pairs: {:<10d} time: {:.3f}s speed: "
+          "{:.1f} tokens/sec".format(name, tokens, pairs, cost, speed))
+    return speed
+
+
+def build_corpus(vocab, lines, line_len, rng):
+    lengths = rng.randint(1, 2 * line_len, lines)
+    ids = rng.zipf(1.3, int(lengths.sum())) % vocab
+    corpus = []
+    start = 0
+    for n in lengths:
+        corpus.append(" ".join(str(i) for i in ids[start:start + n]) + " ")
+        start += n
+    return corpus, int(lengths.sum())
+
+
+def per_pair(corpus, tokens, sampler, args):
+    windows = np.random.randint(1, args.window_size + 2, 1000)
+    state = {"idx": 0}
+
+    def next_window():
+        if state["idx"] == len(windows):
+            windows[:] = np.random.randint(1, args.window_size + 2, 1000)
+            state["idx"] = 0
+        state["idx"] += 1
+        return windows[state["idx"] - 1]
+
+    begin = time.time()
+    pairs = 0
+    batch = []
+    for line in corpus:
+        words = line.split()
+        line_pairs = []
+        for idx, target_id in enumerate(words):
+            window = next_window()
+            start = max(idx - window, 0)
+            for context_id in words[start:idx] + words[idx + 1:
+                                                       idx + window + 1]:
+                line_pairs.append((target_id, context_id))
+        negs = sampler.sample((len(line_pairs), args.neg_num)).tolist()
+        for i, (target_id, context_id) in enumerate(line_pairs):
+            batch.append(([int(target_id)], [int(context_id)], negs[i]))
+            if len(batch) == args.batch_size:
+                pairs += len(batch)
+                batch = []
+    return report("per pair samples", tokens, pairs, time.time() - begin)
+
+
+def batched(corpus, tokens, sampler, args):
+    batcher = SkipGramBatcher(
+        args.batch_size,
+        args.window_size,
+        sampler=sampler,
+        neg_num=args.neg_num)
+    begin = time.time()
+    pairs = 0
+    for columns in batcher.generate(iter(corpus)):
+        rows = [c.reshape([len(c), -1]).tolist() for c in columns]
+        pairs += len(list(zip(*rows)))
+    return report("SkipGramBatcher", tokens, pairs, time.time() - begin)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="skip-gram reader benchmark")
+    parser.add_argument("--vocab", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--line_len", type=int, default=50)
+    parser.add_argument("--window_size", type=int, default=5)
+    parser.add_argument("--neg_num", type=int, default=5)
+    parser.add_argument("--batch_size", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    corpus, tokens = build_corpus(args.vocab, args.lines, args.line_len, rng)
+    counts = rng.zipf(1.3, args.vocab).astype(np.float64)
+    sampler = NegativeSampler(counts=counts, seed=0)
+    old = per_pair(corpus, tokens, sampler, args)
+    new = batched(corpus, tokens, sampler, args)
+    print("speedup: {:.2f}".format(new / old))
@@ -0,0 +1,88 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+per-file startup time and lines/sec of the QueueDataset pipe commands,
+dataset_instance.py (pipe_mode: default) against fast_slot_pipe.py
+(pipe_mode: fast)
+
+python -m paddlerec.tools.benchmark.slot_pipe \
+    -m paddlerec.models.rank.dnn -d dataset_train --repeat 1000
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import subprocess
+import time
+
+from paddlerec.core.utils import envs
+from paddlerec.tools.benchmark.slot_reader import build_input
+from paddlerec.tools.benchmark.utils import init_envs, dataset_files
+
+UTILS_DIR = os.path.join(
+    os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "core",
+    "utils")
+
+
+def pipe_commands(config, sparse, dense, padding):
+    sparse = sparse.replace(" ", "?")
+    dense = dense.replace(" ", "?")
+    default = "python {} slot slot {} fake {} {} {}".format(
+        os.path.join(UTILS_DIR, "dataset_instance.py"), config, sparse, dense,
+        padding)
+    fast = "python {} {} {} {}".format(
+        os.path.join(UTILS_DIR, "fast_slot_pipe.py"), sparse, dense, padding)
+    return [("default", default), ("fast", fast)]
+
+
+def run_pipe(command, path):
+    """
+    run the pipe the way the data feed does, return (seconds, output lines)
+    """
+    begin = time.time()
+    output = subprocess.check_output(
+        "( {} ) < \"{}\"".format(command, path), shell=True)
+    return time.time() - begin, output.count(b"\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="slot pipe benchmark")
+    parser.add_argument("-m", "--model", type=str, required=True)
+    parser.add_argument("-d", "--dataset", type=str, required=True)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--startup_runs", type=int, default=5)
+    args = parser.parse_args()
+
+    config = init_envs(args.model)
+    name = "dataset." + args.dataset + "."
+    sparse = envs.get_global_env(name + "sparse_slots", "").strip() or "?"
+    dense = envs.get_global_env(name + "dense_slots", "").strip() or "?"
+    padding = envs.get_global_env(name + "padding", 0)
+
+    tmp_dir, files = build_input(dataset_files(args.dataset), args.repeat)
+    empty = os.path.join(tmp_dir, "empty")
+    open(empty, "w").close()
+    try:
+        for mode, command in pipe_commands(config, sparse, dense, padding):
+            startup = min(
+                run_pipe(command, empty)[0] for _ in range(args.startup_runs))
+            cost, lines = run_pipe(command, files[0])
+            speed = lines / max(cost - startup, 1e-6)
+            print("{:<8s} startup: {:.3f}s lines: {} time: {:.3f}s "
+                  "speed: {:.1f} lines/sec".format(mode, startup, lines, cost,
+                                                   speed))
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,105 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+samples/sec of SlotReader (per sample) against SlotBatchParser (columnar)
+and the memory-mapped SlotDataCache
+
+python -m paddlerec.tools.benchmark.slot_reader \
+    -m paddlerec.models.rank.dnn -d dataloader_train --repeat 1000
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+
+from paddlerec.core.reader import SlotReader
+from paddlerec.core.utils import envs
+from paddlerec.core.utils.slot_cache import SlotDataCache
+from paddlerec.core.utils.slot_parser import SlotBatchParser
+from paddlerec.tools.benchmark.utils import init_envs, dataset_files, measure
+
+
+def build_input(files, repeat):
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, "part-0")
+    with open(path, "w") as out:
+        for _ in range(repeat):
+            for file in files:
+                with open(file, "r") as f:
+                    shutil.copyfileobj(f, out)
+    return tmp_dir, [path]
+
+
+def sample_reader(config, files, sparse, dense, padding, batch_size):
+    reader = SlotReader(config)
+    reader.init(sparse, dense, padding)
+
+    def gen_batch():
+        batch = []
+        for file in files:
+            with open(file, "r") as f:
+                for line in f:
+                    line = line.rstrip('\n')
+                    for parsed_line in reader.generate_sample(line)():
+                        batch.append([pased[1] for pased in parsed_line])
+                        if len(batch) == batch_size:
+                            yield batch
+                            batch = []
+
+    return gen_batch
+
+
+def count_samples(batch):
+    column = batch[0]
+    if isinstance(column, tuple):
+        return len(column[1])
+    return len(column)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="slot reader benchmark")
+    parser.add_argument("-m", "--model", type=str, required=True)
+    parser.add_argument("-d", "--dataset", type=str, required=True)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--block_size", type=int, default=1024)
+    args = parser.parse_args()
+
+    config = init_envs(args.model)
+    name = "dataset." + args.dataset + "."
+    sparse = envs.get_global_env(name + "sparse_slots", "#") or "#"
+    dense = envs.get_global_env(name + "dense_slots", "#") or "#"
+    padding = int(envs.get_global_env(name + "padding", 0))
+    batch_size = int(envs.get_global_env(name + "batch_size"))
+
+    tmp_dir, files = build_input(dataset_files(args.dataset), args.repeat)
+    try:
+        before = measure("SlotReader.generate_sample",
+                         sample_reader(config, files, sparse, dense, padding,
+                                       batch_size), len)
+        batch_parser = SlotBatchParser(sparse, dense, padding)
+        after = measure("SlotBatchParser",
+                        batch_parser.generate_batches(
+                            files, batch_size, args.block_size), count_samples)
+        print("speedup: {:.2f}x".format(after / before))
+
+        cache = SlotDataCache(
+            os.path.join(tmp_dir, "cache"), files, sparse, dense, padding)
+        cache.build()
+        cached = measure("SlotDataCache",
+                         cache.generate_batches(batch_size), count_samples)
+        print("speedup: {:.2f}x".format(cached / before))
+    finally:
+        shutil.rmtree(tmp_dir)
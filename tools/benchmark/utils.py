@@ -0,0 +1,70 @@
+# Copyright (c) 2020 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+shared helpers of the benchmark scripts
+"""
+from __future__ import print_function
+
+import os
+import time
+
+from paddlerec.core.utils import envs
+
+
+def init_envs(model):
+    """
+    load a model config the same way as paddlerec.run
+    Args:
+        model(string): config.yaml path or paddlerec.models.{direction}.{model}
+    Return:
+        absolute path of the config.yaml
+    """
+    package_base = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    envs.set_runtime_environs({"PACKAGE_BASE": package_base})
+    if model.startswith("paddlerec."):
+        model = os.path.join(envs.paddlerec_adapter(model), "config.yaml")
+    if not os.path.isfile(model):
+        raise IOError("model config: {} invalid".format(model))
+    envs.set_global_envs(envs.load_yaml(model))
+    return model
+
+
+def dataset_files(dataset_name):
+    """
+    list the data files of a configured dataset
+    """
+    data_path = envs.get_global_env("dataset." + dataset_name + ".data_path")
+    return [os.path.join(data_path, x) for x in sorted(os.listdir(data_path))]
+
+
+def measure(name, func, samples_of):
+    """
+    run func() to exhaustion and print samples/sec
+    Args:
+        name(string): label printed in the report
+        func: callable returning an iterable
+        samples_of: callable counting the samples of one item
+    Return:
+        samples per second
+    """
+    samples = 0
+    begin = time.time()
+    for item in func():
+        samples += samples_of(item)
+    cost = time.time() - begin
+    speed = samples / cost if cost > 0 else float("inf")
+    print("{:<30s} samples: {:<10d} time: {:.3f}s speed: {:.1f} samples/sec".
+          format(name, samples, cost, speed))
+    return speed